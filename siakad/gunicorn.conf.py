@@ -0,0 +1,32 @@
+"""Gunicorn settings: ``gunicorn -c gunicorn.conf.py``.
+
+The app is loaded once in the master (``preload_app``), warmed and frozen
+before the workers are forked (``siakad_app.utils.warmup``), so the code,
+metadata and reference-data caches are shared copy-on-write instead of
+being built once per worker.
+"""
+import multiprocessing
+import os
+
+wsgi_app = 'run:app'
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+# Threads keep SSE streams (/events/stream) from occupying whole workers
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 8))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60))
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 0))
+max_requests_jitter = max_requests // 10
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'true').lower() == 'true'
+
+
+def when_ready(server):
+    if server.cfg.preload_app:
+        from siakad_app.utils.warmup import prefork
+        prefork(server.app.wsgi())
+
+
+def post_fork(server, worker):
+    if server.cfg.preload_app:
+        from siakad_app.utils.warmup import postfork
+        postfork(server.app.wsgi())
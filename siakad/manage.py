@@ -1,7 +1,26 @@
+import json
+import os
+import time
+import tracemalloc
+from datetime import date
+
 import click
+from sqlalchemy import insert, select
 from siakad_app import create_app
 from siakad_app.extensions import db
-from siakad_app.models import User, Student, Teacher, Subject
+from siakad_app.models import User, Student, Teacher, Subject, Grade
+from siakad_app.schemas import StudentSchema
+from siakad_app.utils.archive import archive_term, term_grades
+from siakad_app.utils import export as exporter
+from siakad_app.utils import index_advisor
+from siakad_app.utils import replay
+from siakad_app.utils import reports
+from siakad_app.utils import validation
+from siakad_app.utils.grade_matrix import GradeMatrix
+from siakad_app.utils.revocation import revocations
+from siakad_app.utils.scoring import scoring_policy
+from siakad_app.utils.tenancy import current_tenant, tenant_context
+from siakad_app.utils.terms import current_term
 
 app = create_app()
 
@@ -9,9 +28,10 @@ app = create_app()
 @app.cli.command('create-admin')
 @click.option('--username', default='admin', show_default=True)
 @click.option('--password', default='admin123', show_default=True)
-def create_admin(username, password):
+@click.option('--tenant', default=None, help='School (tenant) id in multi-tenant mode')
+def create_admin(username, password, tenant):
     """Create an initial ADMIN user."""
-    with app.app_context():
+    with app.app_context(), tenant_context(tenant or current_tenant()):
         if User.query.filter_by(username=username).first():
             click.echo(f"User '{username}' already exists")
             return
@@ -23,9 +43,10 @@ def create_admin(username, password):
 
 
 @app.cli.command('seed-sample')
-def seed_sample():
+@click.option('--tenant', default=None, help='School (tenant) id in multi-tenant mode')
+def seed_sample(tenant):
     """Seed sample teachers, subjects, and students."""
-    with app.app_context():
+    with app.app_context(), tenant_context(tenant or current_tenant()):
         # Teachers
         t1 = Teacher(nip='12345678', name='Budi', phone='0812345678')
         t2 = Teacher(nip='87654321', name='Sari', phone='0812345679')
@@ -47,5 +68,319 @@ def seed_sample():
         click.echo('Sample data seeded')
 
 
+@app.cli.command('archive-term')
+@click.option('--term', required=True, help="Closed term to archive, e.g. 2023/2024-2")
+def archive_term_command(term):
+    """Move grades of a closed term into the grades_archive table."""
+    with app.app_context():
+        try:
+            moved = archive_term(term)
+        except ValueError as e:
+            raise click.ClickException(str(e))
+        click.echo(f"Archived {moved} grades for term {term}")
+
+
+@app.cli.command('index-advisor')
+@click.option('--show-plans', is_flag=True, help='Print the EXPLAIN output of every flagged query')
+@click.option('--tenant', default=None, help='School (tenant) id in multi-tenant mode')
+def index_advisor_command(show_plans, tenant):
+    """Exercise every GET endpoint, EXPLAIN its queries and report missing indexes."""
+    with app.app_context(), tenant_context(tenant or current_tenant()):
+        with index_advisor.QueryCapture(db.engine) as capture:
+            try:
+                visited = index_advisor.exercise_routes(app, capture)
+            except ValueError as e:
+                raise click.ClickException(str(e))
+        findings, suggestions = index_advisor.analyze(capture)
+
+    click.echo(f"Exercised {len(visited)} requests, captured {len(capture.queries)} distinct queries")
+    for f in findings:
+        click.echo(f"\n[{f['endpoint']}] {f['statement'][:160]}")
+        for note in f['notes']:
+            click.echo(f"  - {note}")
+        if show_plans:
+            for step in f['plan']:
+                click.echo(f"    {step}")
+    if not suggestions:
+        click.echo('\nNo missing indexes found')
+        return
+    click.echo('\nSuggested indexes:')
+    for (table, cols), endpoints in suggestions.items():
+        click.echo(f"  {index_advisor.create_index_sql(table, cols)}  -- {', '.join(sorted(e or '-' for e in endpoints))}")
+
+
+@app.cli.command('export')
+@click.option('--out', 'out_dir', required=True, type=click.Path(file_okay=False), help='Output directory')
+@click.option('--format', 'fmt', type=click.Choice(exporter.FORMATS), default='auto', show_default=True,
+              help='auto = parquet when pyarrow is installed, else csv')
+@click.option('--full', is_flag=True, help='Ignore the stored change marker and export everything')
+@click.option('--since', type=click.DateTime(), default=None, help='Export rows changed since this UTC time')
+@click.option('--table', 'tables', multiple=True, type=click.Choice(list(exporter.TABLES)), help='Limit to these tables')
+@click.option('--include-pii', is_flag=True, help='Include addresses and phone numbers')
+@click.option('--batch-size', default=5000, show_default=True)
+def export_command(out_dir, fmt, full, since, tables, include_pii, batch_size):
+    """Stream tables into compressed columnar files for offline analytics."""
+    with app.app_context():
+        try:
+            summary = exporter.export_tables(out_dir, fmt=fmt, since=since, incremental=not full,
+                                             tables=tables or None, include_pii=include_pii,
+                                             batch_size=batch_size)
+        except ValueError as e:
+            raise click.ClickException(str(e))
+    for name, rows in summary.items():
+        click.echo(f"{name}: {rows} rows")
+
+
+@app.cli.command('prune-revocations')
+def prune_revocations_command():
+    """Delete revocation rows of tokens that have expired."""
+    with app.app_context():
+        click.echo(f"Pruned {revocations.prune()} expired token revocations")
+
+
+@app.cli.command('bench-validation')
+@click.option('--rows', 'count', default=5000, show_default=True)
+@click.option('--repeat', default=3, show_default=True, help='Best of this many runs')
+def bench_validation_command(count, repeat):
+    """Per-row validation cost: schema + model per row vs. column-wise batch (no database)."""
+    rows = [{'nis': f'{2023000000 + i}', 'name': f'Siswa {i}', 'birth_date': '2010-01-01',
+             'address': 'Jl. Merdeka 1', 'gender': 'LP'[i % 2], 'parent_phone': '0812 3456 7890',
+             'class_name': f'{7 + i % 3}A'} for i in range(count)]
+    bad = [dict(r) for r in rows]
+    bad[-1]['nis'] = '123'
+
+    def single():
+        for row in rows:
+            payload = StudentSchema().load(row)
+            Student(payload['nis'], payload['name'], payload['birth_date'], payload.get('address') or '',
+                    payload['gender'], payload.get('parent_phone') or '', payload['class_name'])
+
+    def best(fn):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            fn()
+            timings.append(time.perf_counter() - started)
+        return min(timings) / count * 1e6
+
+    with app.app_context():
+        results = [
+            ('single (schema + model)', best(single)),
+            ('batch, column-wise', best(lambda: validation.validate_rows(rows, validation.STUDENT_COLUMNS))),
+            ('batch, one invalid row', best(lambda: validation.validate_rows(bad, validation.STUDENT_COLUMNS))),
+        ]
+    for name, per_row in results:
+        click.echo(f"{name:<26} {per_row:8.2f} us/row")
+
+
+def _seed_bench_class(students, classes, subjects, class_name='7A'):
+    """Seed ``classes`` classes of ``students`` each, all graded in ``subjects`` subjects this term."""
+    term = current_term()
+    db.session.execute(insert(Subject), [{'code': f'BM{i:03d}', 'name': f'Bench {i}', 'sks': 2}
+                                         for i in range(subjects)])
+    db.session.execute(insert(Student), [
+        {'nis': f'{9000000000 + i}', 'name': f'Siswa {i:05d}', 'birth_date': date(2010, 1, 1), 'address': '',
+         'gender': 'L', 'parent_phone': '', 'class_name': f'{7 + i % classes}A' if i % classes else class_name}
+        for i in range(students * classes)])
+    student_ids = db.session.scalars(select(Student.id).where(Student.class_name == class_name)).all()
+    subject_ids = db.session.scalars(select(Subject.id)).all()
+    db.session.execute(insert(Grade), [
+        {'student_id': st, 'subject_id': sj, 'term': term, 'tugas': 70 + st % 30, 'uts': 60 + sj % 40, 'uas': 80}
+        for st in student_ids for sj in subject_ids])
+    db.session.commit()
+    click.echo(f"Class {class_name}: {len(student_ids)} students x {len(subject_ids)} subjects")
+    return class_name, term
+
+
+def _drop_bench_rows():
+    for model in (Grade, Student, Subject):
+        model.query.delete(synchronize_session=False)
+    db.session.commit()
+
+
+@app.cli.command('bench-class-report')
+@click.option('--students', default=2000, show_default=True, help='Students in the reported class')
+@click.option('--classes', default=4, show_default=True, help='The report covers one of these classes')
+@click.option('--subjects', default=12, show_default=True)
+def bench_class_report_command(students, classes, subjects):
+    """Time to first byte and peak memory of the HTML class report, streamed vs. buffered.
+
+    Seeds a throwaway tenant in the configured database and removes it afterwards.
+    """
+    with app.app_context(), tenant_context(f'bench-{os.getpid()}'):
+        class_name, term = _seed_bench_class(students, classes, subjects)
+
+        def measure(stream: bool):
+            with app.test_request_context():
+                started = time.perf_counter()
+                body = reports.class_report_html(class_name, term, stream=stream)
+                chunks = iter(body) if stream else iter([body])
+                first = next(chunks)
+                ttfb = time.perf_counter() - started
+                size = len(first) + sum(len(c) for c in chunks)
+                return ttfb, time.perf_counter() - started, size
+
+        def peak(stream: bool):
+            tracemalloc.start()
+            measure(stream)
+            peak_bytes = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            return peak_bytes
+
+        try:
+            for name, stream in (('buffered', False), ('streamed', True)):
+                measure(stream)  # warm up caches
+                ttfb, total, size = measure(stream)
+                click.echo(f"{name:<9} ttfb {ttfb * 1000:8.1f} ms  total {total * 1000:8.1f} ms  "
+                           f"peak {peak(stream) / 1e6:6.1f} MB  ({size / 1e6:.1f} MB html)")
+        finally:
+            _drop_bench_rows()
+
+
+@app.cli.command('bench-grade-matrix')
+@click.option('--students', default=40, show_default=True, help='Students in the class')
+@click.option('--subjects', default=12, show_default=True)
+def bench_grade_matrix_command(students, subjects):
+    """Memory and time of one class's grades as ORM objects vs. a GradeMatrix.
+
+    Seeds a throwaway tenant in the configured database and removes it afterwards.
+    """
+    with app.app_context(), tenant_context(f'bench-{os.getpid()}'):
+        class_name, term = _seed_bench_class(students, 1, subjects)
+
+        def orm():
+            ids = db.session.scalars(select(Student.id).where(Student.class_name == class_name)).all()
+            grades = term_grades(term, student_ids=ids)
+            finals = scoring_policy().evaluate_grades(grades)
+            averages = {}
+            for g, final in zip(grades, finals):
+                averages.setdefault(g.student_id, []).append(final)
+            return grades, {sid: sum(v) / len(v) for sid, v in averages.items()}
+
+        def matrix():
+            m = GradeMatrix.build(class_name, term)
+            return m, m.student_averages()
+
+        def measure(fn):
+            db.session.expunge_all()
+            started = time.perf_counter()
+            fn()
+            elapsed = time.perf_counter() - started
+            db.session.expunge_all()
+            tracemalloc.start()
+            result = fn()
+            retained, peak_bytes = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            del result
+            return elapsed, retained, peak_bytes
+
+        try:
+            for name, fn in (('orm', orm), ('matrix', matrix)):
+                fn()  # warm up caches
+                elapsed, retained, peak_bytes = measure(fn)
+                click.echo(f"{name:<7} {elapsed * 1000:8.2f} ms  retained {retained / 1e3:8.1f} KB  "
+                           f"peak {peak_bytes / 1e3:8.1f} KB")
+        finally:
+            _drop_bench_rows()
+
+
+@app.cli.command('replay-prepare')
+@click.argument('inputs', nargs=-1, required=True, type=click.Path(exists=True, dir_okay=False))
+@click.option('--out', required=True, type=click.Path(dir_okay=False), help='Anonymized replay log (JSON lines)')
+@click.option('--salt', envvar='REPLAY_SALT', required=True, help='Secret for the pseudonyms (env REPLAY_SALT)')
+def replay_prepare_command(inputs, out, salt):
+    """Merge and anonymize request captures and/or access logs into one replay log."""
+    lines = []
+    for path in inputs:
+        with open(path, encoding='utf-8') as f:
+            lines.extend(f)
+    entries, dropped = replay.prepare(lines, salt)
+    with open(out, 'w', encoding='utf-8') as f:
+        for entry in entries:
+            f.write(json.dumps(entry, separators=(',', ':')) + '\n')
+    span = entries[-1]['ts'] - entries[0]['ts'] if entries else 0
+    click.echo(f"{len(entries)} requests over {span:.0f}s written to {out}; dropped: {dropped or 'none'}")
+
+
+def _read_replay_log(path, limit=None):
+    with open(path, encoding='utf-8') as f:
+        entries = [json.loads(line) for line in f if line.strip()]
+    return entries[:limit] if limit else entries
+
+
+@app.cli.command('replay-seed')
+@click.argument('log', type=click.Path(exists=True, dir_okay=False))
+@click.option('--tenant', default=None, help='School (tenant) id in multi-tenant mode')
+@click.option('--students', default=200, show_default=True, help='Minimum number of students')
+@click.option('--density', default=0.8, show_default=True, help='Share of student/subject pairs with a grade')
+@click.option('--seed', default=1, show_default=True, help='Random seed; same seed, same data')
+def replay_seed_command(log, tenant, students, density, seed):
+    """Fill an empty database with synthetic data matching a replay log."""
+    plan = replay.seed_plan(_read_replay_log(log), min_students=students)
+    with app.app_context(), tenant_context(tenant or current_tenant()):
+        try:
+            counts = replay.seed(plan, current_term(), density=density, seed=seed)
+        except ValueError as e:
+            raise click.ClickException(str(e))
+    click.echo(f"Seeded {counts} (password for every user: {replay.REPLAY_PASSWORD})")
+
+
+@app.cli.command('replay-run')
+@click.argument('log', type=click.Path(exists=True, dir_okay=False))
+@click.option('--base-url', default='http://127.0.0.1:5000', show_default=True)
+@click.option('--out', required=True, type=click.Path(dir_okay=False), help='Results (JSON lines)')
+@click.option('--speed', default=1.0, show_default=True, help='Time compression; 10 = ten times faster, 0 = no pauses')
+@click.option('--concurrency', default=8, show_default=True, help='Maximum requests in flight')
+@click.option('--limit', default=None, type=int, help='Replay only the first N requests')
+@click.option('--timeout', default=30.0, show_default=True, help='Seconds per request')
+@click.option('--tenant', default=None, help='School (tenant) id in multi-tenant mode')
+def replay_run_command(log, base_url, out, speed, concurrency, limit, timeout, tenant):
+    """Replay a log against a running instance seeded with replay-seed."""
+    entries = _read_replay_log(log, limit)
+    span = (entries[-1]['ts'] - entries[0]['ts']) / speed if entries and speed > 0 else 0
+    with app.app_context(), tenant_context(tenant or current_tenant()):
+        tokens = replay.mint_tokens({e['user'] for e in entries if e.get('user')}, hours=span / 3600 + 1)
+    click.echo(f"Replaying {len(entries)} requests against {base_url} (speed {speed}, concurrency {concurrency})")
+    started = time.perf_counter()
+    results = replay.run(entries, base_url, tokens, speed=speed, concurrency=concurrency, timeout=timeout)
+    elapsed = time.perf_counter() - started
+    with open(out, 'w', encoding='utf-8') as f:
+        for r in results:
+            f.write(json.dumps(r, separators=(',', ':')) + '\n')
+    ms = [r['ms'] for r in results]
+    mismatched = sum(1 for r in results if r['expected'] and r['status'] != r['expected'])
+    click.echo(f"{len(results)} requests in {elapsed:.1f}s; p50 {replay._percentile(ms, 50)} ms, "
+               f"p95 {replay._percentile(ms, 95)} ms, p99 {replay._percentile(ms, 99)} ms; "
+               f"max lag {max((r['lag_ms'] for r in results), default=0):.0f} ms; "
+               f"{mismatched} statuses differ from the capture")
+
+
+@app.cli.command('replay-compare')
+@click.argument('baseline', type=click.Path(exists=True, dir_okay=False))
+@click.argument('candidate', type=click.Path(exists=True, dir_okay=False))
+@click.option('--threshold', default=0.10, show_default=True, help='Allowed relative latency increase')
+@click.option('--min-ms', default=5.0, show_default=True, help='Ignore increases smaller than this')
+@click.option('--min-count', default=20, show_default=True, help='Ignore routes with fewer requests')
+def replay_compare_command(baseline, candidate, threshold, min_ms, min_count):
+    """Per-route latency and error comparison of two replay-run results; exits 1 on regressions."""
+    rows = replay.compare(_read_replay_log(baseline), _read_replay_log(candidate), threshold, min_ms, min_count)
+
+    def fmt(s):
+        if s is None:
+            return f"{'-':>6} {'':>8} {'':>8} {'':>8} {'':>6}"
+        return f"{s['count']:>6} {s['p50']:>8.1f} {s['p95']:>8.1f} {s['p99']:>8.1f} {s['errors']:>6.1%}"
+
+    click.echo(f"{'route':<44} {'count':>6} {'p50':>8} {'p95':>8} {'p99':>8} {'err':>6} | candidate")
+    regressions = 0
+    for method, route, old, new, reasons in rows:
+        click.echo(f"{method + ' ' + route:<44} {fmt(old)} | {fmt(new)}")
+        for reason in reasons:
+            click.echo(f"    REGRESSION {reason}")
+        regressions += bool(reasons)
+    click.echo(f"{regressions} regressed route(s)")
+    if regressions:
+        raise SystemExit(1)
+
+
 if __name__ == '__main__':
     app.run(debug=True)
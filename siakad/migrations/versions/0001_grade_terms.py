@@ -0,0 +1,93 @@
+"""Scope grades by academic term and add grades_archive
+
+Revision ID: 0001_grade_terms
+Revises:
+Create Date: 2026-10-19 09:00:00
+
+Tables are bootstrapped by ``db.create_all()`` on app start, so every step
+checks the live schema first and only applies what is missing.
+"""
+from datetime import date
+
+from alembic import op
+import sqlalchemy as sa
+from flask import current_app
+
+
+# revision identifiers, used by Alembic.
+revision = '0001_grade_terms'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def _inspector():
+    return sa.inspect(op.get_bind())
+
+
+def _columns(table):
+    return {c['name'] for c in _inspector().get_columns(table)}
+
+
+def _indexes(table):
+    insp = _inspector()
+    names = {i['name'] for i in insp.get_indexes(table)}
+    names.update(u['name'] for u in insp.get_unique_constraints(table))
+    return names
+
+
+def _default_term():
+    configured = current_app.config.get('CURRENT_TERM')
+    if configured:
+        return configured
+    today = date.today()
+    if today.month >= 7:
+        return f'{today.year}/{today.year + 1}-1'
+    return f'{today.year - 1}/{today.year}-2'
+
+
+def upgrade():
+    if 'term' not in _columns('grades'):
+        op.add_column('grades', sa.Column('term', sa.String(length=12), nullable=True))
+        op.execute(sa.text('UPDATE grades SET term = :term').bindparams(term=_default_term()))
+        with op.batch_alter_table('grades') as batch_op:
+            batch_op.alter_column('term', existing_type=sa.String(length=12), nullable=False)
+
+    existing = _indexes('grades')
+    with op.batch_alter_table('grades') as batch_op:
+        if 'uq_student_subject' in existing:
+            batch_op.drop_constraint('uq_student_subject', type_='unique')
+        if 'uq_student_subject_term' not in existing:
+            batch_op.create_unique_constraint('uq_student_subject_term', ['student_id', 'subject_id', 'term'])
+        if 'ix_grades_term_student' not in existing:
+            batch_op.create_index('ix_grades_term_student', ['term', 'student_id'])
+        if 'ix_grades_term_subject' not in existing:
+            batch_op.create_index('ix_grades_term_subject', ['term', 'subject_id'])
+
+    if not _inspector().has_table('grades_archive'):
+        op.create_table(
+            'grades_archive',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('student_id', sa.Integer(), sa.ForeignKey('students.id'), nullable=False),
+            sa.Column('subject_id', sa.Integer(), sa.ForeignKey('subjects.id'), nullable=False),
+            sa.Column('term', sa.String(length=12), nullable=False),
+            sa.Column('tugas', sa.Float(), nullable=False),
+            sa.Column('uts', sa.Float(), nullable=False),
+            sa.Column('uas', sa.Float(), nullable=False),
+            sa.Column('archived_at', sa.DateTime(), nullable=False),
+            sa.UniqueConstraint('student_id', 'subject_id', 'term', name='uq_archive_student_subject_term'),
+        )
+        op.create_index('ix_grades_archive_student_id', 'grades_archive', ['student_id'])
+        op.create_index('ix_grades_archive_subject_id', 'grades_archive', ['subject_id'])
+        op.create_index('ix_grades_archive_term_student', 'grades_archive', ['term', 'student_id'])
+        op.create_index('ix_grades_archive_term_subject', 'grades_archive', ['term', 'subject_id'])
+
+
+def downgrade():
+    op.drop_table('grades_archive')
+    with op.batch_alter_table('grades') as batch_op:
+        batch_op.drop_index('ix_grades_term_subject')
+        batch_op.drop_index('ix_grades_term_student')
+        batch_op.drop_constraint('uq_student_subject_term', type_='unique')
+        batch_op.create_unique_constraint('uq_student_subject', ['student_id', 'subject_id'])
+        batch_op.drop_column('term')
@@ -0,0 +1,45 @@
+"""Add append-only grade_history table
+
+Revision ID: 0002_grade_history
+Revises: 0001_grade_terms
+Create Date: 2026-10-19 10:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002_grade_history'
+down_revision = '0001_grade_terms'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if sa.inspect(op.get_bind()).has_table('grade_history'):
+        return
+    op.create_table(
+        'grade_history',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('grade_id', sa.Integer(), nullable=True),
+        sa.Column('student_id', sa.Integer(), nullable=False),
+        sa.Column('subject_id', sa.Integer(), nullable=False),
+        sa.Column('term', sa.String(length=12), nullable=False),
+        sa.Column('action', sa.String(length=10), nullable=False),
+        sa.Column('tugas', sa.Float(), nullable=True),
+        sa.Column('uts', sa.Float(), nullable=True),
+        sa.Column('uas', sa.Float(), nullable=True),
+        sa.Column('prev_tugas', sa.Float(), nullable=True),
+        sa.Column('prev_uts', sa.Float(), nullable=True),
+        sa.Column('prev_uas', sa.Float(), nullable=True),
+        sa.Column('changed_by', sa.Integer(), nullable=True),
+        sa.Column('changed_at', sa.DateTime(), nullable=False),
+    )
+    op.create_index('ix_grade_history_grade_id', 'grade_history', ['grade_id'])
+    op.create_index('ix_grade_history_student', 'grade_history', ['student_id', 'id'])
+    op.create_index('ix_grade_history_subject', 'grade_history', ['subject_id', 'id'])
+
+
+def downgrade():
+    op.drop_table('grade_history')
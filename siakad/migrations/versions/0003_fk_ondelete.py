@@ -0,0 +1,56 @@
+"""Enforce deletes with ON DELETE CASCADE / SET NULL foreign keys
+
+Revision ID: 0003_fk_ondelete
+Revises: 0002_grade_history
+Create Date: 2026-10-19 11:00:00
+
+Bulk and single deletes no longer load dependent rows through ORM cascades,
+so the database has to remove grades and unlink subjects/users itself.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003_fk_ondelete'
+down_revision = '0002_grade_history'
+branch_labels = None
+depends_on = None
+
+# Names for foreign keys that were created unnamed (SQLite)
+NAMING = {'fk': 'fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s'}
+
+FOREIGN_KEYS = [
+    ('grades', 'student_id', 'students', 'CASCADE'),
+    ('grades', 'subject_id', 'subjects', 'CASCADE'),
+    ('grades_archive', 'student_id', 'students', 'CASCADE'),
+    ('grades_archive', 'subject_id', 'subjects', 'CASCADE'),
+    ('subjects', 'teacher_id', 'teachers', 'SET NULL'),
+    ('users', 'student_id', 'students', 'SET NULL'),
+    ('users', 'teacher_id', 'teachers', 'SET NULL'),
+]
+
+
+def _set_ondelete(table, column, referred, ondelete):
+    insp = sa.inspect(op.get_bind())
+    for fk in insp.get_foreign_keys(table):
+        if fk['constrained_columns'] != [column]:
+            continue
+        if (fk.get('options') or {}).get('ondelete', '').upper() == (ondelete or ''):
+            return
+        name = fk['name'] or NAMING['fk'] % {'table_name': table, 'column_0_name': column,
+                                             'referred_table_name': referred}
+        with op.batch_alter_table(table, naming_convention=NAMING) as batch_op:
+            batch_op.drop_constraint(name, type_='foreignkey')
+            batch_op.create_foreign_key(name, referred, [column], ['id'], ondelete=ondelete)
+        return
+
+
+def upgrade():
+    for table, column, referred, ondelete in FOREIGN_KEYS:
+        _set_ondelete(table, column, referred, ondelete)
+
+
+def downgrade():
+    for table, column, referred, _ in FOREIGN_KEYS:
+        _set_ondelete(table, column, referred, None)
@@ -0,0 +1,37 @@
+"""Add indexes for class filters and name-sorted listings
+
+Revision ID: 0004_listing_indexes
+Revises: 0003_fk_ondelete
+Create Date: 2026-10-19 12:00:00
+
+Recommended by ``manage.py index-advisor``.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004_listing_indexes'
+down_revision = '0003_fk_ondelete'
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ('ix_students_class_name_name', 'students', ['class_name', 'name']),
+    ('ix_students_name', 'students', ['name']),
+    ('ix_teachers_name', 'teachers', ['name']),
+    ('ix_subjects_name', 'subjects', ['name']),
+    ('ix_subjects_teacher_id', 'subjects', ['teacher_id']),
+]
+
+
+def upgrade():
+    insp = sa.inspect(op.get_bind())
+    for name, table, columns in INDEXES:
+        if name not in {i['name'] for i in insp.get_indexes(table)}:
+            op.create_index(name, table, columns)
+
+
+def downgrade():
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,36 @@
+"""Add updated_at change markers for incremental exports
+
+Revision ID: 0005_updated_at
+Revises: 0004_listing_indexes
+Create Date: 2026-10-19 13:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005_updated_at'
+down_revision = '0004_listing_indexes'
+branch_labels = None
+depends_on = None
+
+TABLES = ['students', 'teachers', 'subjects', 'grades']
+
+
+def upgrade():
+    insp = sa.inspect(op.get_bind())
+    for table in TABLES:
+        if 'updated_at' in {c['name'] for c in insp.get_columns(table)}:
+            continue
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=False,
+                                          server_default=sa.func.current_timestamp()))
+            batch_op.create_index(f'ix_{table}_updated_at', ['updated_at'])
+
+
+def downgrade():
+    for table in reversed(TABLES):
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_index(f'ix_{table}_updated_at')
+            batch_op.drop_column('updated_at')
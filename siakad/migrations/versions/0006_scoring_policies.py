@@ -0,0 +1,37 @@
+"""Add scoring_policies for configurable final-score weights
+
+Revision ID: 0006_scoring_policies
+Revises: 0005_updated_at
+Create Date: 2026-10-19 14:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0006_scoring_policies'
+down_revision = '0005_updated_at'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    insp = sa.inspect(op.get_bind())
+    if 'scoring_policies' in insp.get_table_names():
+        return
+    op.create_table(
+        'scoring_policies',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('subject_id', sa.Integer(), sa.ForeignKey('subjects.id', ondelete='CASCADE'), nullable=True),
+        sa.Column('term', sa.String(length=12), nullable=True),
+        sa.Column('w_tugas', sa.Float(), nullable=False),
+        sa.Column('w_uts', sa.Float(), nullable=False),
+        sa.Column('w_uas', sa.Float(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False, server_default=sa.func.current_timestamp()),
+        sa.UniqueConstraint('subject_id', 'term', name='uq_scoring_subject_term'),
+    )
+
+
+def downgrade():
+    op.drop_table('scoring_policies')
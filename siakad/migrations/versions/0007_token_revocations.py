@@ -0,0 +1,36 @@
+"""Add token_revocations for JWT logout and forced logout
+
+Revision ID: 0007_token_revocations
+Revises: 0006_scoring_policies
+Create Date: 2026-10-19 15:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0007_token_revocations'
+down_revision = '0006_scoring_policies'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if sa.inspect(op.get_bind()).has_table('token_revocations'):
+        return
+    op.create_table(
+        'token_revocations',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('jti', sa.String(length=36), nullable=True, unique=True),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('revoked_before', sa.Integer(), nullable=True),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+    )
+    op.create_index('ix_token_revocations_user_id', 'token_revocations', ['user_id'])
+    op.create_index('ix_token_revocations_expires_at', 'token_revocations', ['expires_at'])
+
+
+def downgrade():
+    op.drop_table('token_revocations')
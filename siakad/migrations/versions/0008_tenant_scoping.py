@@ -0,0 +1,101 @@
+"""Add tenant_id to school-owned tables with tenant-leading indexes
+
+Revision ID: 0008_tenant_scoping
+Revises: 0007_token_revocations
+Create Date: 2026-10-19 16:00:00
+
+Existing rows belong to the 'default' tenant. Unique business keys (NIS, NIP,
+subject code, username) become unique per tenant.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0008_tenant_scoping'
+down_revision = '0007_token_revocations'
+branch_labels = None
+depends_on = None
+
+# table -> (old indexes to drop, new indexes (name, columns), new unique constraints (name, columns))
+CHANGES = {
+    'students': (
+        [('ix_students_nis', ['nis'], True), ('ix_students_name', ['name'], False),
+         ('ix_students_class_name_name', ['class_name', 'name'], False)],
+        [('ix_students_tenant_class_name', ['tenant_id', 'class_name', 'name']),
+         ('ix_students_tenant_name', ['tenant_id', 'name'])],
+        [('uq_students_tenant_nis', ['tenant_id', 'nis'])],
+    ),
+    'teachers': (
+        [('ix_teachers_nip', ['nip'], True), ('ix_teachers_name', ['name'], False)],
+        [('ix_teachers_tenant_name', ['tenant_id', 'name'])],
+        [('uq_teachers_tenant_nip', ['tenant_id', 'nip'])],
+    ),
+    'subjects': (
+        [('ix_subjects_code', ['code'], True), ('ix_subjects_name', ['name'], False)],
+        [('ix_subjects_tenant_name', ['tenant_id', 'name'])],
+        [('uq_subjects_tenant_code', ['tenant_id', 'code'])],
+    ),
+    'users': (
+        [('ix_users_username', ['username'], True)],
+        [],
+        [('uq_users_tenant_username', ['tenant_id', 'username'])],
+    ),
+    'grades': (
+        [('ix_grades_term_student', ['term', 'student_id'], False),
+         ('ix_grades_term_subject', ['term', 'subject_id'], False)],
+        [('ix_grades_tenant_term_student', ['tenant_id', 'term', 'student_id']),
+         ('ix_grades_tenant_term_subject', ['tenant_id', 'term', 'subject_id'])],
+        [],
+    ),
+    'grades_archive': (
+        [('ix_grades_archive_term_student', ['term', 'student_id'], False),
+         ('ix_grades_archive_term_subject', ['term', 'subject_id'], False)],
+        [('ix_grades_archive_tenant_term_student', ['tenant_id', 'term', 'student_id']),
+         ('ix_grades_archive_tenant_term_subject', ['tenant_id', 'term', 'subject_id'])],
+        [],
+    ),
+    'grade_history': ([], [], []),
+    'scoring_policies': (
+        [],
+        [('ix_scoring_policies_subject_id', ['subject_id'])],
+        [('uq_scoring_tenant_subject_term', ['tenant_id', 'subject_id', 'term'])],
+    ),
+}
+
+
+def upgrade():
+    insp = sa.inspect(op.get_bind())
+    for table, (old, new, uniques) in CHANGES.items():
+        if 'tenant_id' in {c['name'] for c in insp.get_columns(table)}:
+            continue
+        existing = {i['name'] for i in insp.get_indexes(table)}
+        existing_uq = {u['name'] for u in insp.get_unique_constraints(table)}
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.add_column(sa.Column('tenant_id', sa.String(length=32), nullable=False, server_default='default'))
+            for name, _, _ in old:
+                if name in existing:
+                    batch_op.drop_index(name)
+            if table == 'scoring_policies' and 'uq_scoring_subject_term' in existing_uq | existing:
+                # Added before dropping the old unique key, which MySQL uses for the foreign key
+                batch_op.create_index('ix_scoring_policies_subject_id', ['subject_id'])
+                batch_op.drop_constraint('uq_scoring_subject_term', type_='unique')
+                new = []
+            for name, columns in new:
+                batch_op.create_index(name, columns)
+            for name, columns in uniques:
+                batch_op.create_unique_constraint(name, columns)
+
+
+def downgrade():
+    for table, (old, new, uniques) in reversed(list(CHANGES.items())):
+        with op.batch_alter_table(table) as batch_op:
+            for name, _ in uniques:
+                batch_op.drop_constraint(name, type_='unique')
+            if table == 'scoring_policies':
+                batch_op.create_unique_constraint('uq_scoring_subject_term', ['subject_id', 'term'])
+            for name, _ in new:
+                batch_op.drop_index(name)
+            for name, columns, unique in old:
+                batch_op.create_index(name, columns, unique=unique)
+            batch_op.drop_column('tenant_id')
@@ -0,0 +1,32 @@
+"""Give grades_archive its own ids and keep the source grade id in grade_id
+
+Revision ID: 0009_archive_grade_id
+Revises: 0008_tenant_scoping
+Create Date: 2026-10-20 09:00:00
+
+grades_archive.id used to be copied from grades.id. Those ids are reused once
+the archived rows are deleted from grades, so a later archive run could collide.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0009_archive_grade_id'
+down_revision = '0008_tenant_scoping'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    columns = {c['name'] for c in sa.inspect(op.get_bind()).get_columns('grades_archive')}
+    if 'grade_id' in columns:
+        return
+    op.add_column('grades_archive', sa.Column('grade_id', sa.Integer(), nullable=True))
+    op.execute('UPDATE grades_archive SET grade_id = id')
+    op.create_index('ix_grades_archive_grade_id', 'grades_archive', ['grade_id'])
+
+
+def downgrade():
+    op.drop_index('ix_grades_archive_grade_id', 'grades_archive')
+    op.drop_column('grades_archive', 'grade_id')
@@ -0,0 +1,33 @@
+"""Add cache_versions change counters for per-worker caches
+
+Revision ID: 0010_cache_versions
+Revises: 0009_archive_grade_id
+Create Date: 2026-10-20 10:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0010_cache_versions'
+down_revision = '0009_archive_grade_id'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if sa.inspect(op.get_bind()).has_table('cache_versions'):
+        return
+    op.create_table(
+        'cache_versions',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('tenant_id', sa.String(length=32), nullable=False, server_default='default'),
+        sa.Column('name', sa.String(length=32), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.UniqueConstraint('tenant_id', 'name', name='uq_cache_versions_tenant_name'),
+    )
+
+
+def downgrade():
+    op.drop_table('cache_versions')
@@ -0,0 +1,41 @@
+"""Store forced-logout cutoffs in epoch milliseconds
+
+Revision ID: 0011_revocation_ms
+Revises: 0010_cache_versions
+Create Date: 2026-10-21 09:00:00
+
+JWT iat has whole-second resolution, so a cutoff in seconds could not revoke
+a token issued earlier in the same second as the forced logout. Tokens now
+carry an iat_ms claim and cutoffs are compared in milliseconds.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0011_revocation_ms'
+down_revision = '0010_cache_versions'
+branch_labels = None
+depends_on = None
+
+# Any cutoff below this is still in seconds (it is the year 5138 in seconds)
+_SECONDS_LIMIT = 10 ** 11
+
+
+def upgrade():
+    column = next(c for c in sa.inspect(op.get_bind()).get_columns('token_revocations')
+                  if c['name'] == 'revoked_before')
+    if not isinstance(column['type'], sa.BigInteger):
+        with op.batch_alter_table('token_revocations') as batch:
+            batch.alter_column('revoked_before', existing_type=sa.Integer(), type_=sa.BigInteger(),
+                               existing_nullable=True)
+    op.execute(f'UPDATE token_revocations SET revoked_before = revoked_before * 1000 '
+               f'WHERE revoked_before < {_SECONDS_LIMIT}')
+
+
+def downgrade():
+    op.execute(f'UPDATE token_revocations SET revoked_before = revoked_before / 1000 '
+               f'WHERE revoked_before >= {_SECONDS_LIMIT}')
+    with op.batch_alter_table('token_revocations') as batch:
+        batch.alter_column('revoked_before', existing_type=sa.BigInteger(), type_=sa.Integer(),
+                           existing_nullable=True)
@@ -1,6 +1,7 @@
 import logging
 from flask import Flask, jsonify, render_template
-from sqlalchemy.engine import url as sa_url
+from sqlalchemy import event
+from sqlalchemy.engine import Engine, url as sa_url
 import pymysql
 
 from config import Config
@@ -23,6 +24,15 @@ def ensure_database_exists(db_uri: str):
         logging.getLogger(__name__).warning(f"Could not ensure database exists: {e}")
 
 
+@event.listens_for(Engine, 'connect')
+def _enable_sqlite_foreign_keys(dbapi_conn, conn_record):
+    # ON DELETE CASCADE / SET NULL is enforced by the database; SQLite needs it switched on
+    if type(dbapi_conn).__module__.startswith('sqlite3'):
+        cur = dbapi_conn.cursor()
+        cur.execute('PRAGMA foreign_keys=ON')
+        cur.close()
+
+
 def register_blueprints(app: Flask):
     from .routes.auth_routes import auth_bp
     from .routes.student_routes import student_bp
@@ -30,6 +40,12 @@ def register_blueprints(app: Flask):
     from .routes.subject_routes import subject_bp
     from .routes.grade_routes import grade_bp
     from .routes.dashboard_routes import dashboard_bp
+    from .routes.events_routes import events_bp
+    from .routes.scoring_routes import scoring_bp
+    from .routes.reference_routes import reference_bp
+    from .routes.health_routes import health_bp
+    from .routes.profiling_routes import profiling_bp
+    from .routes.batch_routes import batch_bp
 
     app.register_blueprint(auth_bp, url_prefix='/auth')
     app.register_blueprint(student_bp, url_prefix='/students')
@@ -37,6 +53,12 @@ def register_blueprints(app: Flask):
     app.register_blueprint(subject_bp, url_prefix='/subjects')
     app.register_blueprint(grade_bp, url_prefix='/grades')
     app.register_blueprint(dashboard_bp, url_prefix='/dashboard')
+    app.register_blueprint(events_bp, url_prefix='/events')
+    app.register_blueprint(scoring_bp, url_prefix='/scoring')
+    app.register_blueprint(reference_bp, url_prefix='/reference')
+    app.register_blueprint(health_bp)
+    app.register_blueprint(profiling_bp, url_prefix='/profiling')
+    app.register_blueprint(batch_bp)
 
 
 def create_app() -> Flask:
@@ -59,6 +81,33 @@ def create_app() -> Flask:
     jwt.init_app(app)
     bcrypt.init_app(app)
 
+    from .utils.audit import grade_audit
+    from .utils.events import bus
+    from .utils.grade_writes import grade_writes
+    from .utils.health import health
+    from .utils.idempotency import idempotency
+    from .utils.profiling import profiler
+    from .utils.ratelimit import limiter
+    from .utils.refdata import reference_data
+    from .utils.request_log import request_log
+    from .utils.revocation import revocations
+    from .utils.tenancy import tenancy
+    from .utils.versions import cache_versions
+    from .utils.workload import workload_cache
+    tenancy.init_app(app)
+    cache_versions.init_app(app)
+    grade_audit.init_app(app)
+    limiter.init_app(app)
+    bus.init_app(app)
+    revocations.init_app(app)
+    reference_data.init_app(app)
+    health.init_app(app)
+    idempotency.init_app(app)
+    profiler.init_app(app)
+    workload_cache.init_app(app)
+    grade_writes.init_app(app)
+    request_log.init_app(app)
+
     # Register error handlers and blueprints
     register_error_handlers(app)
     register_blueprints(app)
@@ -1,10 +1,25 @@
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session
 from flask_migrate import Migrate
 from flask_jwt_extended import JWTManager
 from flask_bcrypt import Bcrypt
 
 
-db = SQLAlchemy()
+class RoutingSession(Session):
+    """Session whose default bind can be redirected, e.g. to a tenant's own database.
+
+    ``bind_resolver`` is installed by ``utils.tenancy``; it returns an engine
+    or None for the configured SQLALCHEMY_DATABASE_URI.
+    """
+    bind_resolver = None
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and RoutingSession.bind_resolver is not None:
+            bind = RoutingSession.bind_resolver()
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 migrate = Migrate()
 jwt = JWTManager()
 bcrypt = Bcrypt()
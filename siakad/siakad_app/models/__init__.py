@@ -2,4 +2,9 @@ from .student import Student
 from .teacher import Teacher
 from .subject import Subject
 from .grade import Grade
+from .grade_archive import GradeArchive
+from .grade_history import GradeHistory
+from .scoring_policy import ScoringPolicy
+from .token_revocation import TokenRevocation
+from .cache_version import CacheVersion
 from .user import User, ROLES
@@ -0,0 +1,15 @@
+from siakad_app.extensions import db
+from siakad_app.utils.tenancy import TenantScoped
+from sqlalchemy import UniqueConstraint
+
+
+class CacheVersion(TenantScoped, db.Model):
+    """Change counter of a per-worker cache, bumped by every writing transaction (see ``utils.versions``)."""
+    __tablename__ = 'cache_versions'
+    __table_args__ = (
+        UniqueConstraint('tenant_id', 'name', name='uq_cache_versions_tenant_name'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(32), nullable=False)
+    version = db.Column(db.Integer, nullable=False, default=0)
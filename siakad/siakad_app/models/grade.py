@@ -1,51 +1,55 @@
+from datetime import datetime
 from siakad_app.extensions import db
-from sqlalchemy import UniqueConstraint
+from siakad_app.utils.scoring import scoring_policy
+from siakad_app.utils.tenancy import TenantScoped
+from siakad_app.utils.terms import current_term, validate_term
+from siakad_app.utils.validation import SCORE
+from sqlalchemy import Index, UniqueConstraint
 
 
-class Grade(db.Model):
+class Grade(TenantScoped, db.Model):
     __tablename__ = 'grades'
     __table_args__ = (
-        UniqueConstraint('student_id', 'subject_id', name='uq_student_subject'),
+        UniqueConstraint('student_id', 'subject_id', 'term', name='uq_student_subject_term'),
+        Index('ix_grades_tenant_term_student', 'tenant_id', 'term', 'student_id'),
+        Index('ix_grades_tenant_term_subject', 'tenant_id', 'term', 'subject_id'),
     )
 
     id = db.Column(db.Integer, primary_key=True)
-    student_id = db.Column(db.Integer, db.ForeignKey('students.id'), nullable=False, index=True)
-    subject_id = db.Column(db.Integer, db.ForeignKey('subjects.id'), nullable=False, index=True)
+    student_id = db.Column(db.Integer, db.ForeignKey('students.id', ondelete='CASCADE'), nullable=False, index=True)
+    subject_id = db.Column(db.Integer, db.ForeignKey('subjects.id', ondelete='CASCADE'), nullable=False, index=True)
+    term = db.Column(db.String(12), nullable=False)  # e.g. '2024/2025-1'
 
     tugas = db.Column(db.Float, nullable=False, default=0.0)
     uts = db.Column(db.Float, nullable=False, default=0.0)
     uas = db.Column(db.Float, nullable=False, default=0.0)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
 
-    def __init__(self, student_id: int, subject_id: int, tugas: float = 0.0, uts: float = 0.0, uas: float = 0.0):
+    def __init__(self, student_id: int, subject_id: int, tugas: float = 0.0, uts: float = 0.0, uas: float = 0.0,
+                 term: str = None):
         self.student_id = student_id
         self.subject_id = subject_id
+        self.term = validate_term(term) if term else current_term()
         self.tugas = self._score(tugas)
         self.uts = self._score(uts)
         self.uas = self._score(uas)
 
-    @staticmethod
-    def _score(val: float) -> float:
-        try:
-            v = float(val)
-        except Exception:
-            raise ValueError('Nilai harus berupa angka')
-        if v < 0 or v > 100:
-            raise ValueError('Nilai harus di antara 0 dan 100')
-        return round(v, 2)
+    _score = staticmethod(SCORE)
 
     @property
     def final_score(self) -> float:
-        return round((float(self.tugas) + float(self.uts) + float(self.uas)) / 3.0, 2)
+        return scoring_policy().score(self.subject_id, self.term, self.tugas, self.uts, self.uas)
 
-    def to_dict(self, include_student=False, include_subject=False):
+    def to_dict(self, include_student=False, include_subject=False, final: float = None):
         data = {
             'id': self.id,
             'student_id': self.student_id,
             'subject_id': self.subject_id,
+            'term': self.term,
             'tugas': self.tugas,
             'uts': self.uts,
             'uas': self.uas,
-            'final': self.final_score,
+            'final': self.final_score if final is None else final,
         }
         if include_student and self.student:
             data['student'] = {'id': self.student.id, 'name': self.student.name, 'nis': self.student.nis, 'class_name': self.student.class_name}
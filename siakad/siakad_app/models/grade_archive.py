@@ -0,0 +1,51 @@
+from datetime import datetime
+from siakad_app.extensions import db
+from siakad_app.utils.scoring import scoring_policy
+from siakad_app.utils.tenancy import TenantScoped
+from sqlalchemy import Index, UniqueConstraint
+
+
+class GradeArchive(TenantScoped, db.Model):
+    """Grades of closed terms, moved out of ``grades`` by ``manage.py archive-term``."""
+    __tablename__ = 'grades_archive'
+    __table_args__ = (
+        UniqueConstraint('student_id', 'subject_id', 'term', name='uq_archive_student_subject_term'),
+        Index('ix_grades_archive_tenant_term_student', 'tenant_id', 'term', 'student_id'),
+        Index('ix_grades_archive_tenant_term_subject', 'tenant_id', 'term', 'subject_id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    grade_id = db.Column(db.Integer, nullable=True, index=True)  # grades.id the row was archived from
+    student_id = db.Column(db.Integer, db.ForeignKey('students.id', ondelete='CASCADE'), nullable=False, index=True)
+    subject_id = db.Column(db.Integer, db.ForeignKey('subjects.id', ondelete='CASCADE'), nullable=False, index=True)
+    term = db.Column(db.String(12), nullable=False)
+
+    tugas = db.Column(db.Float, nullable=False, default=0.0)
+    uts = db.Column(db.Float, nullable=False, default=0.0)
+    uas = db.Column(db.Float, nullable=False, default=0.0)
+    archived_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    student = db.relationship('Student', backref=db.backref('archived_grades', lazy=True, cascade='all, delete-orphan', passive_deletes=True))
+    subject = db.relationship('Subject', backref=db.backref('archived_grades', lazy=True, cascade='all, delete-orphan', passive_deletes=True))
+
+    @property
+    def final_score(self) -> float:
+        return scoring_policy().score(self.subject_id, self.term, self.tugas, self.uts, self.uas)
+
+    def to_dict(self, include_student=False, include_subject=False, final: float = None):
+        data = {
+            'id': self.grade_id,
+            'student_id': self.student_id,
+            'subject_id': self.subject_id,
+            'term': self.term,
+            'tugas': self.tugas,
+            'uts': self.uts,
+            'uas': self.uas,
+            'final': self.final_score if final is None else final,
+            'archived': True,
+        }
+        if include_student and self.student:
+            data['student'] = {'id': self.student.id, 'name': self.student.name, 'nis': self.student.nis, 'class_name': self.student.class_name}
+        if include_subject and self.subject:
+            data['subject'] = {'id': self.subject.id, 'code': self.subject.code, 'name': self.subject.name}
+        return data
@@ -0,0 +1,50 @@
+from datetime import datetime
+from siakad_app.extensions import db
+from siakad_app.utils.tenancy import TenantScoped
+from sqlalchemy import Index
+
+
+class GradeHistory(TenantScoped, db.Model):
+    """Append-only log of grade changes, written in batches by ``utils.audit``.
+
+    Rows carry no foreign keys on purpose: history outlives deleted students,
+    subjects and grades.
+    """
+    __tablename__ = 'grade_history'
+    __table_args__ = (
+        Index('ix_grade_history_student', 'student_id', 'id'),
+        Index('ix_grade_history_subject', 'subject_id', 'id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    grade_id = db.Column(db.Integer, nullable=True, index=True)
+    student_id = db.Column(db.Integer, nullable=False)
+    subject_id = db.Column(db.Integer, nullable=False)
+    term = db.Column(db.String(12), nullable=False)
+    action = db.Column(db.String(10), nullable=False)  # CREATE, UPDATE, DELETE
+
+    tugas = db.Column(db.Float, nullable=True)
+    uts = db.Column(db.Float, nullable=True)
+    uas = db.Column(db.Float, nullable=True)
+    prev_tugas = db.Column(db.Float, nullable=True)
+    prev_uts = db.Column(db.Float, nullable=True)
+    prev_uas = db.Column(db.Float, nullable=True)
+
+    changed_by = db.Column(db.Integer, nullable=True)  # users.id
+    changed_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'grade_id': self.grade_id,
+            'student_id': self.student_id,
+            'subject_id': self.subject_id,
+            'term': self.term,
+            'action': self.action,
+            'tugas': self.tugas,
+            'uts': self.uts,
+            'uas': self.uas,
+            'prev': {'tugas': self.prev_tugas, 'uts': self.prev_uts, 'uas': self.prev_uas},
+            'changed_by': self.changed_by,
+            'changed_at': self.changed_at.isoformat(),
+        }
@@ -0,0 +1,55 @@
+from datetime import datetime
+from siakad_app.extensions import db
+from siakad_app.utils.tenancy import TenantScoped
+from siakad_app.utils.terms import validate_term
+from sqlalchemy import UniqueConstraint
+
+
+class ScoringPolicy(TenantScoped, db.Model):
+    """Weights of tugas/UTS/UAS in the final score.
+
+    A policy applies to one subject, one term, one subject in one term, or
+    (both empty) to everything; the most specific match wins.
+    """
+    __tablename__ = 'scoring_policies'
+    __table_args__ = (
+        UniqueConstraint('tenant_id', 'subject_id', 'term', name='uq_scoring_tenant_subject_term'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    subject_id = db.Column(db.Integer, db.ForeignKey('subjects.id', ondelete='CASCADE'), nullable=True, index=True)
+    term = db.Column(db.String(12), nullable=True)
+    w_tugas = db.Column(db.Float, nullable=False)
+    w_uts = db.Column(db.Float, nullable=False)
+    w_uas = db.Column(db.Float, nullable=False)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __init__(self, w_tugas: float, w_uts: float, w_uas: float, subject_id: int = None, term: str = None):
+        self.subject_id = subject_id
+        self.term = validate_term(term) if term else None
+        self.set_weights(w_tugas, w_uts, w_uas)
+
+    def set_weights(self, w_tugas: float, w_uts: float, w_uas: float):
+        self.w_tugas, self.w_uts, self.w_uas = self._validate_weights(w_tugas, w_uts, w_uas)
+
+    @staticmethod
+    def _validate_weights(*weights):
+        try:
+            weights = tuple(float(w) for w in weights)
+        except Exception:
+            raise ValueError('Bobot nilai harus berupa angka')
+        if any(w < 0 for w in weights):
+            raise ValueError('Bobot nilai tidak boleh negatif')
+        if sum(weights) <= 0:
+            raise ValueError('Total bobot nilai harus lebih dari 0')
+        return weights
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'subject_id': self.subject_id,
+            'term': self.term,
+            'tugas': self.w_tugas,
+            'uts': self.w_uts,
+            'uas': self.w_uas,
+        }
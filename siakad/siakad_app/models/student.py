@@ -1,21 +1,30 @@
-import re
-from datetime import date
+from datetime import date, datetime
 from siakad_app.extensions import db
+from siakad_app.utils.tenancy import TenantScoped
+from siakad_app.utils.validation import CLASS_NAME, GENDER, NIS, PARENT_PHONE, PERSON_NAME
+from sqlalchemy import Index, UniqueConstraint
 
 
-class Student(db.Model):
+class Student(TenantScoped, db.Model):
     __tablename__ = 'students'
+    __table_args__ = (
+        UniqueConstraint('tenant_id', 'nis', name='uq_students_tenant_nis'),
+        # class_report / list_students filter by class and sort by name
+        Index('ix_students_tenant_class_name', 'tenant_id', 'class_name', 'name'),
+        Index('ix_students_tenant_name', 'tenant_id', 'name'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
-    nis = db.Column(db.String(20), unique=True, nullable=False, index=True)
+    nis = db.Column(db.String(20), nullable=False)
     name = db.Column(db.String(100), nullable=False)
     birth_date = db.Column(db.Date, nullable=False)
     address = db.Column(db.String(255), nullable=True)
     gender = db.Column(db.String(1), nullable=False)  # 'L' or 'P'
     parent_phone = db.Column(db.String(20), nullable=True)
     class_name = db.Column(db.String(20), nullable=False)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
 
-    grades = db.relationship('Grade', backref='student', lazy=True, cascade='all, delete-orphan')
+    grades = db.relationship('Grade', backref='student', lazy=True, cascade='all, delete-orphan', passive_deletes=True)
 
     def __init__(self, nis: str, name: str, birth_date: date, address: str, gender: str,
                  parent_phone: str, class_name: str):
@@ -27,43 +36,12 @@ class Student(db.Model):
         self.parent_phone = self._validate_phone(parent_phone)
         self.class_name = self._validate_class_name(class_name)
 
-    @staticmethod
-    def _validate_nis(nis: str) -> str:
-        if not re.fullmatch(r'\d{10}', str(nis).strip()):
-            raise ValueError('NIS harus 10 digit angka')
-        return str(nis).strip()
-
-    @staticmethod
-    def _validate_name(name: str) -> str:
-        name = (name or '').strip()
-        if len(name) < 3:
-            raise ValueError('Nama minimal 3 karakter')
-        return name
-
-    @staticmethod
-    def _validate_gender(gender: str) -> str:
-        gender = (gender or '').strip().upper()
-        if gender not in {'L', 'P'}:
-            raise ValueError("Gender harus 'L' (Laki-laki) atau 'P' (Perempuan)")
-        return gender
-
-    @staticmethod
-    def _validate_phone(phone: str) -> str:
-        if phone is None:
-            return ''
-        phone = re.sub(r'\s+', '', str(phone))
-        if not re.fullmatch(r'\d{8,15}', phone):
-            raise ValueError('Nomor telepon orang tua harus 8-15 digit')
-        return phone
-
-    @staticmethod
-    def _validate_class_name(cname: str) -> str:
-        cname = (cname or '').strip()
-        if not cname:
-            raise ValueError('Kelas harus diisi')
-        if len(cname) > 20:
-            raise ValueError('Nama kelas maksimal 20 karakter')
-        return cname
+    # Shared with the schemas and bulk imports (utils.validation)
+    _validate_nis = staticmethod(NIS)
+    _validate_name = staticmethod(PERSON_NAME)
+    _validate_gender = staticmethod(GENDER)
+    _validate_phone = staticmethod(PARENT_PHONE)
+    _validate_class_name = staticmethod(CLASS_NAME)
 
     def to_dict(self):
         return {
@@ -1,17 +1,25 @@
-import re
+from datetime import datetime
 from siakad_app.extensions import db
+from siakad_app.utils.tenancy import TenantScoped
+from siakad_app.utils.validation import SKS, SUBJECT_CODE, SUBJECT_NAME
+from sqlalchemy import Index, UniqueConstraint
 
 
-class Subject(db.Model):
+class Subject(TenantScoped, db.Model):
     __tablename__ = 'subjects'
+    __table_args__ = (
+        UniqueConstraint('tenant_id', 'code', name='uq_subjects_tenant_code'),
+        Index('ix_subjects_tenant_name', 'tenant_id', 'name'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
-    code = db.Column(db.String(20), unique=True, nullable=False, index=True)
+    code = db.Column(db.String(20), nullable=False)
     name = db.Column(db.String(120), nullable=False)
     sks = db.Column(db.Integer, nullable=False)
-    teacher_id = db.Column(db.Integer, db.ForeignKey('teachers.id'), nullable=True)
+    teacher_id = db.Column(db.Integer, db.ForeignKey('teachers.id', ondelete='SET NULL'), nullable=True, index=True)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
 
-    grades = db.relationship('Grade', backref='subject', lazy=True, cascade='all, delete-orphan')
+    grades = db.relationship('Grade', backref='subject', lazy=True, cascade='all, delete-orphan', passive_deletes=True)
 
     def __init__(self, code: str, name: str, sks: int, teacher_id: int = None):
         self.code = self._validate_code(code)
@@ -19,29 +27,10 @@ class Subject(db.Model):
         self.sks = self._validate_sks(sks)
         self.teacher_id = teacher_id
 
-    @staticmethod
-    def _validate_code(code: str) -> str:
-        code = (code or '').strip().upper()
-        if not re.fullmatch(r'[A-Z0-9_\-]{2,12}', code):
-            raise ValueError('Kode mata pelajaran harus 2-12 karakter (A-Z, 0-9, _ atau -)')
-        return code
-
-    @staticmethod
-    def _validate_name(name: str) -> str:
-        name = (name or '').strip()
-        if len(name) < 2:
-            raise ValueError('Nama mata pelajaran minimal 2 karakter')
-        return name
-
-    @staticmethod
-    def _validate_sks(sks: int) -> int:
-        try:
-            sks = int(sks)
-        except Exception:
-            raise ValueError('SKS harus berupa angka')
-        if sks < 1 or sks > 6:
-            raise ValueError('SKS harus antara 1 sampai 6')
-        return sks
+    # Shared with the schemas and bulk imports (utils.validation)
+    _validate_code = staticmethod(SUBJECT_CODE)
+    _validate_name = staticmethod(SUBJECT_NAME)
+    _validate_sks = staticmethod(SKS)
 
     def to_dict(self, include_teacher: bool = True):
         data = {
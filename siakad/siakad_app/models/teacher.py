@@ -1,17 +1,25 @@
-import re
+from datetime import datetime
 from siakad_app.extensions import db
+from siakad_app.utils.tenancy import TenantScoped
+from siakad_app.utils.validation import NIP, PERSON_NAME, PHONE
+from sqlalchemy import Index, UniqueConstraint
 
 
-class Teacher(db.Model):
+class Teacher(TenantScoped, db.Model):
     __tablename__ = 'teachers'
+    __table_args__ = (
+        UniqueConstraint('tenant_id', 'nip', name='uq_teachers_tenant_nip'),
+        Index('ix_teachers_tenant_name', 'tenant_id', 'name'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
-    nip = db.Column(db.String(30), unique=True, nullable=False, index=True)
+    nip = db.Column(db.String(30), nullable=False)
     name = db.Column(db.String(100), nullable=False)
     phone = db.Column(db.String(20), nullable=True)
     address = db.Column(db.String(255), nullable=True)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
 
-    subjects = db.relationship('Subject', backref='teacher', lazy=True)
+    subjects = db.relationship('Subject', backref='teacher', lazy=True, passive_deletes=True)
 
     def __init__(self, nip: str, name: str, phone: str = None, address: str = None):
         self.nip = self._validate_nip(nip)
@@ -19,28 +27,10 @@ class Teacher(db.Model):
         self.phone = self._validate_phone(phone)
         self.address = (address or '').strip()
 
-    @staticmethod
-    def _validate_nip(nip: str) -> str:
-        nip = str(nip).strip()
-        if not re.fullmatch(r'\d{8,18}', nip):  # typical NIP length; flexible 8-18
-            raise ValueError('NIP harus 8-18 digit angka')
-        return nip
-
-    @staticmethod
-    def _validate_name(name: str) -> str:
-        name = (name or '').strip()
-        if len(name) < 3:
-            raise ValueError('Nama minimal 3 karakter')
-        return name
-
-    @staticmethod
-    def _validate_phone(phone: str) -> str:
-        if not phone:
-            return ''
-        phone = re.sub(r'\s+', '', str(phone))
-        if not re.fullmatch(r'\d{8,15}', phone):
-            raise ValueError('Nomor telepon harus 8-15 digit')
-        return phone
+    # Shared with the schemas and bulk imports (utils.validation)
+    _validate_nip = staticmethod(NIP)
+    _validate_name = staticmethod(PERSON_NAME)
+    _validate_phone = staticmethod(PHONE)
 
     def to_dict(self, include_subjects: bool = True):
         data = {
@@ -0,0 +1,20 @@
+from datetime import datetime
+from siakad_app.extensions import db
+
+
+class TokenRevocation(db.Model):
+    """Revoked JWTs, loaded incrementally by ``utils.revocation``.
+
+    A row either revokes one token (``jti``) or every token of a user issued
+    up to ``revoked_before`` (forced logout, epoch milliseconds like the
+    ``iat_ms`` claim). Rows are useless once ``expires_at`` has passed and can be
+    pruned; the autoincrement ``id`` is the refresh cursor.
+    """
+    __tablename__ = 'token_revocations'
+
+    id = db.Column(db.Integer, primary_key=True)
+    jti = db.Column(db.String(36), nullable=True, unique=True)
+    user_id = db.Column(db.Integer, nullable=True, index=True)  # users.id
+    revoked_before = db.Column(db.BigInteger, nullable=True)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
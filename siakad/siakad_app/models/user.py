@@ -1,22 +1,27 @@
 from siakad_app.extensions import db, bcrypt
+from siakad_app.utils.tenancy import TenantScoped
+from sqlalchemy import UniqueConstraint
 
 
 ROLES = {'ADMIN', 'TEACHER', 'STUDENT'}
 
 
-class User(db.Model):
+class User(TenantScoped, db.Model):
     __tablename__ = 'users'
+    __table_args__ = (
+        UniqueConstraint('tenant_id', 'username', name='uq_users_tenant_username'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
-    username = db.Column(db.String(80), unique=True, nullable=False, index=True)
+    username = db.Column(db.String(80), nullable=False)
     password_hash = db.Column(db.String(128), nullable=False)
     role = db.Column(db.String(20), nullable=False, index=True)
 
-    student_id = db.Column(db.Integer, db.ForeignKey('students.id'), nullable=True)
-    teacher_id = db.Column(db.Integer, db.ForeignKey('teachers.id'), nullable=True)
+    student_id = db.Column(db.Integer, db.ForeignKey('students.id', ondelete='SET NULL'), nullable=True)
+    teacher_id = db.Column(db.Integer, db.ForeignKey('teachers.id', ondelete='SET NULL'), nullable=True)
 
-    student = db.relationship('Student', backref=db.backref('user', uselist=False))
-    teacher = db.relationship('Teacher', backref=db.backref('user', uselist=False))
+    student = db.relationship('Student', backref=db.backref('user', uselist=False, passive_deletes=True))
+    teacher = db.relationship('Teacher', backref=db.backref('user', uselist=False, passive_deletes=True))
 
     def __init__(self, username: str, role: str, student_id=None, teacher_id=None):
         self.username = username.strip()
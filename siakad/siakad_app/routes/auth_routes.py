@@ -1,37 +1,91 @@
 import logging
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import create_access_token, jwt_required
+from flask_jwt_extended import create_access_token, create_refresh_token, decode_token, get_jwt, get_jwt_identity, jwt_required
+from flask_jwt_extended.exceptions import JWTExtendedException
+from jwt.exceptions import PyJWTError
 from sqlalchemy.exc import IntegrityError
 
 from siakad_app.extensions import db
 from siakad_app.models import User, Student, Teacher
 from siakad_app.schemas import LoginSchema, RegisterUserSchema
-from siakad_app.utils.decorators import roles_required, current_user
+from siakad_app.utils.decorators import login_required, roles_required, current_user
+from siakad_app.utils.idempotency import idempotent
+from siakad_app.utils.ratelimit import rate_limited
+from siakad_app.utils.revocation import revocations
 
 logger = logging.getLogger(__name__)
 
 auth_bp = Blueprint('auth', __name__)
 
 
+def _issue_tokens(user: User) -> dict:
+    claims = {
+        'role': user.role,
+        'student_id': user.student_id,
+        'teacher_id': user.teacher_id,
+        'tenant': user.tenant_id,
+    }
+    return {
+        'access_token': create_access_token(identity=user.id, additional_claims=claims),
+        'refresh_token': create_refresh_token(identity=user.id, additional_claims=claims),
+    }
+
+
 @auth_bp.post('/login')
+@rate_limited('10/minute')
 def login():
     data = LoginSchema().load(request.get_json() or {})
     user = User.query.filter_by(username=data['username'].strip()).first()
     if not user or not user.check_password(data['password']):
         return jsonify({'error': 'Invalid credentials'}), 401
 
-    claims = {
-        'role': user.role,
-        'student_id': user.student_id,
-        'teacher_id': user.teacher_id,
-    }
-    token = create_access_token(identity=user.id, additional_claims=claims)
     logger.info(f"User logged in: {user.username} ({user.role})")
-    return jsonify({'access_token': token, 'user': user.to_dict()})
+    return jsonify({**_issue_tokens(user), 'user': user.to_dict()})
+
+
+@auth_bp.post('/refresh')
+@jwt_required(refresh=True)
+def refresh():
+    # Rotation: the presented refresh token is revoked and replaced
+    user = db.session.get(User, get_jwt_identity())
+    if not user:
+        return jsonify({'error': 'Unauthorized'}), 401
+    revocations.revoke_token(get_jwt())
+    return jsonify({**_issue_tokens(user), 'user': user.to_dict()})
+
+
+@auth_bp.post('/logout')
+@jwt_required(verify_type=False)
+def logout():
+    # Revokes the presented token and, when given in the body, the matching refresh token
+    payload = get_jwt()
+    revocations.revoke_token(payload)
+    refresh_token = (request.get_json(silent=True) or {}).get('refresh_token')
+    if refresh_token:
+        try:
+            other = decode_token(refresh_token)
+        except (JWTExtendedException, PyJWTError):
+            other = None
+        if other and other.get('sub') == payload.get('sub'):
+            revocations.revoke_token(other)
+    logger.info(f"User logged out: id={payload.get('sub')}")
+    return jsonify({'message': 'Logged out'})
+
+
+@auth_bp.post('/users/<int:user_id>/logout')
+@roles_required('ADMIN')
+def force_logout(user_id: int):
+    user = db.session.get(User, user_id)
+    if not user:
+        return jsonify({'error': 'Not found'}), 404
+    revocations.revoke_user(user.id)
+    logger.info(f"Sessions revoked for user: {user.username}")
+    return jsonify({'message': f'Semua sesi {user.username} telah dicabut'})
 
 
 @auth_bp.post('/register')
 @roles_required('ADMIN')
+@idempotent
 def register():
     try:
         data = RegisterUserSchema().load(request.get_json() or {})
@@ -61,7 +115,7 @@ def register():
 
 
 @auth_bp.get('/me')
-@jwt_required()
+@login_required
 def me():
     user = current_user()
     if not user:
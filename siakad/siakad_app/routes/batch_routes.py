@@ -0,0 +1,84 @@
+import logging
+from flask import Blueprint, current_app, g, jsonify, request
+from werkzeug.test import EnvironBuilder
+
+from siakad_app.utils.decorators import roles_required, current_user
+from siakad_app.utils.tenancy import current_tenant, tenant_context
+
+logger = logging.getLogger(__name__)
+
+batch_bp = Blueprint('batch', __name__)
+
+# Streams, profiler downloads and nested batches make no sense inside a batch
+_EXCLUDED_BLUEPRINTS = {'batch', 'events', 'profiling', 'health'}
+_DROPPED_HEADERS = {'content-type', 'content-length', 'idempotency-key'}
+
+
+def _run(app, path: str):
+    """Dispatch one GET sub-request in-process and return (status, body)."""
+    headers = [(k, v) for k, v in request.headers if k.lower() not in _DROPPED_HEADERS]
+    builder = EnvironBuilder(path=path, base_url=request.root_url, method='GET', headers=headers,
+                             environ_overrides={'REMOTE_ADDR': request.remote_addr})
+    # Shares the batch's app context: same ``g`` (verified token, principal) and same DB session.
+    # App-wide request hooks (tenant, request log, error window) already ran for the batch itself;
+    # the caller runs this as the batch's tenant.
+    with app.request_context(builder.get_environ()) as ctx:
+        if ctx.request.blueprint in _EXCLUDED_BLUEPRINTS:
+            return 400, {'error': 'Path tidak dapat dijalankan dalam batch'}
+        try:
+            rv = app.dispatch_request()
+        except Exception as e:
+            rv = app.handle_user_exception(e)
+        response = app.make_response(rv)
+        try:
+            if response.is_json:
+                return response.status_code, response.get_json()
+            return response.status_code, response.get_data(as_text=True)
+        finally:
+            # Runs call_on_close callbacks, e.g. the admission gate of a streamed body
+            response.close()
+
+
+@batch_bp.post('/batch')
+@roles_required('ADMIN', 'TEACHER', 'STUDENT')
+def batch():
+    """Run several GET requests with one token verification, one user lookup and one DB session.
+
+    Body: ``{"requests": [{"path": "/students/me"}, {"path": "/grades/me?term=2024/2025-1"}]}``.
+    Returns ``{"responses": [{"path", "status", "body"}]}`` in request order; each
+    sub-request goes through its own endpoint's role checks and rate limits.
+    """
+    data = request.get_json(silent=True) or {}
+    items = data.get('requests')
+    if not isinstance(items, list) or not items:
+        return jsonify({'error': 'requests wajib berupa list yang tidak kosong'}), 400
+    limit = current_app.config.get('BATCH_MAX_REQUESTS', 20)
+    if len(items) > limit:
+        return jsonify({'error': f'Maksimal {limit} request per batch'}), 400
+    errors = {}
+    for i, item in enumerate(items):
+        if not isinstance(item, dict) or not isinstance(item.get('path'), str) or not item['path'].startswith('/'):
+            errors[i] = 'path wajib diawali /'
+        elif item.get('method', 'GET').upper() != 'GET':
+            errors[i] = 'Hanya request GET yang didukung'
+    if errors:
+        return jsonify({'error': 'Validation error', 'messages': errors}), 400
+
+    if current_user() is None:
+        return jsonify({'error': 'Unauthorized'}), 401
+    g.batch_verified = True
+    app = current_app._get_current_object()
+    tenant = current_tenant()
+    # The sub-requests' teardown would reset the tenant the batch resolved; it is restored for the batch's own
+    tenant_token = g.pop('tenant_token', None)
+    responses = []
+    try:
+        for item in items:
+            with tenant_context(tenant):
+                status, body = _run(app, item['path'])
+            responses.append({'path': item['path'], 'status': status, 'body': body})
+    finally:
+        if tenant_token is not None:
+            g.tenant_token = tenant_token
+    logger.debug(f"Batch of {len(items)} requests")
+    return jsonify({'responses': responses})
@@ -1,10 +1,14 @@
 import logging
 from flask import Blueprint, jsonify
-from sqlalchemy import func
+from flask_jwt_extended import get_jwt
+from sqlalchemy import distinct, func, literal, null, select, union_all
 
 from siakad_app.extensions import db
-from siakad_app.models import Student, Teacher, Subject, Grade
+from siakad_app.models import Student, Teacher, Subject
+from siakad_app.utils.archive import term_source
 from siakad_app.utils.decorators import roles_required
+from siakad_app.utils.scoring import scoring_policy
+from siakad_app.utils.terms import requested_term
 
 logger = logging.getLogger(__name__)
 
@@ -22,16 +26,22 @@ def stats():
 
 
 @dashboard_bp.get('/avg-by-subject')
-@roles_required('ADMIN', 'TEACHER')
+@roles_required('ADMIN', 'TEACHER', max_concurrent=8)
 def avg_by_subject():
-    # average of final score = (tugas + uts + uas)/3, aggregated per subject
-    rows = (
+    # average of the weighted final score (scoring policies), aggregated per subject (active term by default);
+    # archived terms are read from grades_archive as well
+    source = term_source(requested_term())
+    final = scoring_policy().sql_final(source.c)
+    query = (
         db.session.query(
             Subject.code,
             Subject.name,
-            func.round(func.avg((Grade.tugas + Grade.uts + Grade.uas) / 3.0), 2).label('avg_final')
+            func.round(func.avg(final), 2).label('avg_final')
         )
-        .join(Grade, Grade.subject_id == Subject.id)
+        .join(source, source.c.subject_id == Subject.id)
+    )
+    rows = (
+        query
         .group_by(Subject.id)
         .order_by(Subject.name.asc())
         .all()
@@ -40,3 +50,62 @@ def avg_by_subject():
         {'code': code, 'name': name, 'average': float(avg) if avg is not None else 0.0}
         for code, name, avg in rows
     ])
+
+
+def _summary_statement(term: str, teacher_id: int = None):
+    """Counts and per-subject averages as one UNION ALL of (kind, code, name, value) rows."""
+    source = term_source(term)
+
+    def count_row(kind, expr):
+        return select(literal(kind).label('kind'), null().label('code'), null().label('name'),
+                      func.count(expr).label('value'))
+
+    teachers = count_row('teachers', Teacher.id)
+    if teacher_id is None:
+        students = count_row('students', Student.id)
+        subjects = count_row('subjects', Subject.id)
+    else:
+        # A teacher sees their own subjects and the students graded in them
+        students = (count_row('students', distinct(source.c.student_id))
+                    .select_from(source)
+                    .join(Subject, Subject.id == source.c.subject_id)
+                    .where(Subject.teacher_id == teacher_id))
+        subjects = count_row('subjects', Subject.id).where(Subject.teacher_id == teacher_id)
+
+    averages = (
+        select(literal('average'), Subject.code, Subject.name,
+               func.round(func.avg(scoring_policy().sql_final(source.c)), 2))
+        .join(source, source.c.subject_id == Subject.id)
+        .group_by(Subject.id)
+    )
+    if teacher_id is not None:
+        averages = averages.where(Subject.teacher_id == teacher_id)
+    return union_all(students, teachers, subjects, averages)
+
+
+@dashboard_bp.get('/summary')
+@roles_required('ADMIN', 'TEACHER', max_concurrent=8)
+def summary():
+    """Stats and averages by subject in one response and one query; teachers only see their subjects."""
+    claims = get_jwt()
+    teacher = claims.get('role') == 'TEACHER'
+    teacher_id = claims.get('teacher_id') if teacher else None
+    term = requested_term()
+
+    stats = {'students': 0, 'teachers': 0, 'subjects': 0}
+    averages = []
+    if teacher and teacher_id is None:
+        # A teacher account without a teacher profile owns nothing; never fall back to the school-wide scope
+        return jsonify({'term': term, 'scope': 'teacher', 'stats': stats, 'averages': averages})
+    for kind, code, name, value in db.session.execute(_summary_statement(term, teacher_id)):
+        if kind == 'average':
+            averages.append({'code': code, 'name': name, 'average': float(value) if value is not None else 0.0})
+        else:
+            stats[kind] = int(value or 0)
+    averages.sort(key=lambda a: a['name'])
+    return jsonify({
+        'term': term,
+        'scope': 'teacher' if teacher else 'all',
+        'stats': stats,
+        'averages': averages,
+    })
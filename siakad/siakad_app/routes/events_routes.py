@@ -0,0 +1,45 @@
+import logging
+from flask import Blueprint, Response, request, jsonify
+
+from siakad_app.extensions import db
+from siakad_app.utils.decorators import roles_required, current_user
+from siakad_app.utils.events import BusFull, bus, class_topic, subject_topic, ALL
+from siakad_app.utils.refdata import owned_subjects
+
+logger = logging.getLogger(__name__)
+
+events_bp = Blueprint('events', __name__)
+
+
+@events_bp.get('/stream')
+@roles_required('ADMIN', 'TEACHER')
+def stream():
+    """Server-sent change events, filtered by ?subject_id= and/or ?class_name=.
+
+    Without filters an ADMIN receives every event and a TEACHER receives the
+    events of the subjects they teach.
+    """
+    user = current_user()
+    subject_ids = request.args.getlist('subject_id', type=int)
+    class_names = [c.strip() for c in request.args.getlist('class_name') if c.strip()]
+
+    if user.role == 'TEACHER':
+        owned = {s.id for s in owned_subjects(user.teacher_id)}
+        if any(sid not in owned for sid in subject_ids):
+            return jsonify({'error': 'Forbidden'}), 403
+        if not subject_ids and not class_names:
+            subject_ids = sorted(owned)
+        if not subject_ids and not class_names:
+            return jsonify({'error': 'Tidak ada mata pelajaran yang diampu'}), 404
+
+    topics = [subject_topic(s) for s in subject_ids] + [class_topic(c) for c in class_names]
+    try:
+        sub = bus.subscribe(topics or [ALL])
+    except BusFull:
+        logger.warning(f"Event stream rejected: {bus.max_subscribers} subscribers on this worker")
+        return jsonify({'error': 'Too many subscribers'}), 503, {'Retry-After': '30'}
+
+    # Release the DB connection; the stream itself never touches the database
+    db.session.remove()
+    headers = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    return Response(bus.stream(sub), mimetype='text/event-stream', headers=headers)
@@ -1,13 +1,28 @@
 import logging
-from flask import Blueprint, request, jsonify, render_template
-from flask_jwt_extended import jwt_required
-from sqlalchemy import func
+from datetime import datetime
+from flask import Blueprint, Response, request, jsonify
+from flask_jwt_extended import get_jwt_identity, jwt_required
+from sqlalchemy import func, select
 from sqlalchemy.exc import IntegrityError
 
 from siakad_app.extensions import db
 from siakad_app.models import Grade, Student, Subject
 from siakad_app.schemas import GradeSchema
 from siakad_app.utils.decorators import roles_required, current_user
+from siakad_app.utils.archive import term_grades
+from siakad_app.utils.audit import audit_event, grade_audit, grade_history
+from siakad_app.utils import gradebook
+from siakad_app.utils.bulk import MAX_IMPORT_ROWS
+from siakad_app.utils.events import bus, publish_grade, subject_topic
+from siakad_app.utils.grade_matrix import GradeMatrix
+from siakad_app.utils.grade_writes import PendingGrade, grade_writes
+from siakad_app.utils.idempotency import idempotent
+from siakad_app.utils.reports import class_report_html
+from siakad_app.utils.scoring import grade_point, scoring_policy
+from siakad_app.utils.tenancy import current_tenant
+from siakad_app.utils.terms import current_term, requested_term, validate_term
+from siakad_app.utils.upsert import upsert
+from siakad_app.utils.workload import workload_cache
 
 logger = logging.getLogger(__name__)
 
@@ -18,20 +33,23 @@ def _teacher_can_access_subject(user, subject_id: int) -> bool:
     if user.role == 'ADMIN':
         return True
     if user.role == 'TEACHER':
-        subj = db.session.get(Subject, subject_id)
-        return subj is not None and subj.teacher_id == user.teacher_id
+        # Live query, not the refdata snapshot: a reassignment must apply at once
+        return user.teacher_id is not None and db.session.query(
+            db.session.query(Subject.id).filter_by(id=subject_id, teacher_id=user.teacher_id).exists()).scalar()
     return False
 
 
 @grade_bp.post('/')
 @roles_required('ADMIN', 'TEACHER')
+@idempotent
 def upsert_grade():
     # Create or update grade for a student-subject pair
     try:
         payload = GradeSchema().load(request.get_json() or {})
         user = current_user()
 
-        if not db.session.get(Student, payload['student_id']):
+        student = db.session.get(Student, payload['student_id'])
+        if not student:
             return jsonify({'error': 'student_id tidak ditemukan'}), 400
         if not db.session.get(Subject, payload['subject_id']):
             return jsonify({'error': 'subject_id tidak ditemukan'}), 400
@@ -39,21 +57,24 @@ def upsert_grade():
         if not _teacher_can_access_subject(user, payload['subject_id']):
             return jsonify({'error': 'Forbidden'}), 403
 
-        grade = Grade.query.filter_by(student_id=payload['student_id'], subject_id=payload['subject_id']).first()
-        if grade is None:
-            grade = Grade(
-                student_id=payload['student_id'],
-                subject_id=payload['subject_id'],
-                tugas=payload['tugas'], uts=payload['uts'], uas=payload['uas']
-            )
-            db.session.add(grade)
-        else:
-            grade.tugas = Grade._score(payload['tugas'])
-            grade.uts = Grade._score(payload['uts'])
-            grade.uas = Grade._score(payload['uas'])
+        key = {'student_id': payload['student_id'], 'subject_id': payload['subject_id'],
+               'term': validate_term(payload['term']) if payload.get('term') else current_term()}
+        scores = {name: Grade._score(payload[name]) for name in ('tugas', 'uts', 'uas')}
+        prev = db.session.execute(select(Grade.tugas, Grade.uts, Grade.uas).filter_by(**key)).first()
+        changed = prev is None or tuple(prev) != tuple(scores.values())
+        if changed:
+            # One atomic statement: concurrent upserts of the same pair cannot collide
+            upsert(Grade.__table__, [{**key, **scores, 'tenant_id': current_tenant(), 'updated_at': datetime.utcnow()}],
+                   keys=('student_id', 'subject_id', 'term'), update=('tugas', 'uts', 'uas', 'updated_at'))
+            workload_cache.touch(key['subject_id'])
+        grade = db.session.scalars(
+            select(Grade).filter_by(**key).execution_options(populate_existing=True)).one()
+        if changed:
+            grade_audit.record([audit_event(grade, 'UPDATE', prev._asdict()) if prev else audit_event(grade, 'CREATE')])
 
         db.session.commit()
-        logger.info(f"Grade upserted: student={grade.student_id} subject={grade.subject_id}")
+        logger.info(f"Grade upserted: student={grade.student_id} subject={grade.subject_id} term={grade.term}")
+        publish_grade(grade, student.class_name)
         return jsonify(grade.to_dict()), 201
     except IntegrityError:
         db.session.rollback()
@@ -65,7 +86,10 @@ def upsert_grade():
 @grade_bp.put('/<int:grade_id>')
 @grade_bp.patch('/<int:grade_id>')
 @roles_required('ADMIN', 'TEACHER')
+@idempotent
 def update_grade(grade_id: int):
+    if request.method == 'PATCH' and grade_writes.enabled:
+        return _buffer_update(grade_id)
     g = db.session.get(Grade, grade_id)
     if not g:
         return jsonify({'error': 'Not found'}), 404
@@ -84,12 +108,41 @@ def update_grade(grade_id: int):
             g.uas = Grade._score(data['uas'])
         db.session.commit()
         logger.info(f"Grade updated: id={g.id}")
+        publish_grade(g, g.student.class_name)
         return jsonify(g.to_dict())
     except ValueError as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 400
 
 
+def _buffer_update(grade_id: int):
+    # GRADE_COALESCE_WINDOW: merged into this worker's buffer and written later (utils.grade_writes)
+    grade = grade_writes.get(grade_id)
+    if grade is None:
+        g = db.session.get(Grade, grade_id)
+        if not g:
+            return jsonify({'error': 'Not found'}), 404
+        grade = PendingGrade.of(g)
+
+    user = current_user()
+    if not _teacher_can_access_subject(user, grade.subject_id):
+        return jsonify({'error': 'Forbidden'}), 403
+
+    data = request.get_json() or {}
+    try:
+        values = {name: Grade._score(data[name]) for name in ('tugas', 'uts', 'uas') if name in data}
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(grade_writes.edit(grade, values, get_jwt_identity()).to_dict())
+
+
+@grade_bp.get('/write-buffer')
+@roles_required('ADMIN')
+def write_buffer_stats():
+    """Coalesced grade edits of this worker: edits, rows and commits written, commits saved."""
+    return jsonify(grade_writes.stats())
+
+
 @grade_bp.get('/student/<int:student_id>')
 @roles_required('ADMIN', 'TEACHER', 'STUDENT')
 def list_grades_for_student(student_id: int):
@@ -97,7 +150,7 @@ def list_grades_for_student(student_id: int):
     if user.role == 'STUDENT' and user.student_id != student_id:
         return jsonify({'error': 'Forbidden'}), 403
 
-    grades = Grade.query.filter_by(student_id=student_id).all()
+    grades = term_grades(requested_term(), student_id=student_id)
     return jsonify([g.to_dict(include_subject=True) for g in grades])
 
 
@@ -105,7 +158,7 @@ def list_grades_for_student(student_id: int):
 @roles_required('STUDENT')
 def my_grades():
     user = current_user()
-    grades = Grade.query.filter_by(student_id=user.student_id).all()
+    grades = term_grades(requested_term(), student_id=user.student_id)
     return jsonify([g.to_dict(include_subject=True) for g in grades])
 
 
@@ -115,12 +168,56 @@ def list_grades_for_subject(subject_id: int):
     user = current_user()
     if not _teacher_can_access_subject(user, subject_id):
         return jsonify({'error': 'Forbidden'}), 403
-    grades = Grade.query.filter_by(subject_id=subject_id).all()
+    grades = term_grades(requested_term(), subject_id=subject_id)
     return jsonify([g.to_dict(include_student=True) for g in grades])
 
 
+@grade_bp.post('/subject/<int:subject_id>/sync')
+@roles_required('ADMIN', 'TEACHER', max_concurrent=4)
+@idempotent
+def sync_subject_grades(subject_id: int):
+    # Whole-sheet upload: {"term"?, "rows": [{"nis", "tugas", "uts", "uas"}], "delete_missing"?}
+    # Only changed rows are written, in one transaction; ?dry_run=1 returns the diff without writing
+    user = current_user()
+    if not db.session.get(Subject, subject_id):
+        return jsonify({'error': 'Not found'}), 404
+    if not _teacher_can_access_subject(user, subject_id):
+        return jsonify({'error': 'Forbidden'}), 403
+
+    data = request.get_json() or {}
+    rows = data.get('rows')
+    if not isinstance(rows, list) or not 0 < len(rows) <= MAX_IMPORT_ROWS:
+        return jsonify({'error': f'rows harus berupa list berisi 1-{MAX_IMPORT_ROWS} nilai'}), 400
+    dry_run = request.args.get('dry_run', '').lower() in ('1', 'true', 'yes')
+    try:
+        term = validate_term(data['term']) if data.get('term') else current_term()
+        delete_missing = bool(data.get('delete_missing'))
+        changes, unchanged = gradebook.diff_sheet(subject_id, term, rows, delete_missing=delete_missing)
+        if changes and not dry_run:
+            gradebook.apply_changes(subject_id, term, changes)
+            db.session.commit()
+    except gradebook.SheetError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e), 'errors': e.details}), 400
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({'error': 'Integrity error'}), 409
+
+    applied = bool(changes) and not dry_run
+    summary = gradebook.summarize(subject_id, term, len(rows), changes, unchanged, applied)
+    if applied:
+        logger.info(f"Grades synced: subject={subject_id} term={term} created={summary['created']} "
+                    f"updated={summary['updated']} deleted={summary['deleted']} unchanged={unchanged}")
+        counts = {k: summary[k] for k in ('subject_id', 'term', 'created', 'updated', 'deleted')}
+        bus.publish('grade', {'op': 'sync', **counts}, [subject_topic(subject_id)])
+    return jsonify(summary)
+
+
 @grade_bp.get('/transcript/<int:student_id>')
-@roles_required('ADMIN', 'TEACHER', 'STUDENT')
+@roles_required('ADMIN', 'TEACHER', 'STUDENT', max_concurrent=8)
 def transcript(student_id: int):
     user = current_user()
     if user.role == 'STUDENT' and user.student_id != student_id:
@@ -130,41 +227,114 @@ def transcript(student_id: int):
     if not student:
         return jsonify({'error': 'Student not found'}), 404
 
-    items = [g.to_dict(include_subject=True) for g in Grade.query.filter_by(student_id=student_id).all()]
-    avg = round(sum(i['final'] for i in items) / len(items), 2) if items else 0.0
-    return jsonify({'student': student.to_dict(), 'grades': items, 'average': avg})
+    term = requested_term()
+    grades = term_grades(term, student_id=student_id)
+    finals = scoring_policy().evaluate_grades(grades)
+    items = []
+    credits = weighted = points = 0.0
+    for g, final in zip(grades, finals):
+        item = g.to_dict(include_subject=True, final=final)
+        item['letter'], item['grade_point'] = grade_point(final)
+        sks = g.subject.sks if g.subject else 0
+        credits += sks
+        weighted += final * sks
+        points += item['grade_point'] * sks
+        items.append(item)
+    avg = round(sum(finals) / len(finals), 2) if finals else 0.0
+    return jsonify({
+        'student': student.to_dict(),
+        'term': term,
+        'grades': items,
+        'average': avg,
+        'weighted_average': round(weighted / credits, 2) if credits else 0.0,
+        'gpa': round(points / credits, 2) if credits else 0.0,
+        'credits': int(credits),
+    })
+
+
+@grade_bp.get('/history')
+@roles_required('ADMIN', 'TEACHER', 'STUDENT')
+def list_grade_history():
+    user = current_user()
+    student_id = request.args.get('student_id', type=int)
+    subject_id = request.args.get('subject_id', type=int)
+    if user.role == 'STUDENT':
+        if student_id is not None and student_id != user.student_id:
+            return jsonify({'error': 'Forbidden'}), 403
+        student_id = user.student_id
+    if user.role == 'TEACHER' and (subject_id is None or not _teacher_can_access_subject(user, subject_id)):
+        return jsonify({'error': 'Forbidden'}), 403
+
+    limit = min(request.args.get('limit', 100, type=int), 500)
+    before_id = request.args.get('before_id', type=int)
+    term = (request.args.get('term') or '').strip() or None
+    rows = grade_history(student_id=student_id, subject_id=subject_id, term=term, limit=limit, before_id=before_id)
+    return jsonify({
+        'items': [r.to_dict() for r in rows],
+        'next_before_id': rows[-1].id if len(rows) == limit else None,
+    })
 
 
 @grade_bp.get('/class-report')
-@roles_required('ADMIN', 'TEACHER')
+@roles_required('ADMIN', 'TEACHER', rate={'ADMIN': '60/minute', 'TEACHER': '30/minute'}, max_concurrent=4)
 def class_report():
     class_name = (request.args.get('class_name') or '').strip()
     if not class_name:
         return jsonify({'error': 'class_name is required'}), 400
+    term = requested_term()
+
+    # HTML is streamed straight from one ordered query (utils.reports)
+    if 'text/html' in (request.headers.get('Accept') or ''):
+        return Response(class_report_html(class_name, term), mimetype='text/html')
 
     # Aggregate grades by student and subject in the class
     students = Student.query.filter_by(class_name=class_name).order_by(Student.name.asc()).all()
-    student_ids = [s.id for s in students]
+    matrix = GradeMatrix.build(class_name, term, students=[(s.id, s.nis, s.name) for s in students])
 
-    grades = Grade.query.filter(Grade.student_id.in_(student_ids)).all() if student_ids else []
+    # JSON response; grades: {student_id: {subject_code: final}}
+    return jsonify({
+        'class_name': class_name,
+        'term': term,
+        'students': [s.to_dict() for s in students],
+        'grades': matrix.as_table(matrix.labels(term)),
+    })
 
-    # Structure: {student_id: {subject_code: final}}
-    subjects = {s.id: s for s in Subject.query.all()}
-    subject_codes = {sid: subjects[sid].code for sid in subjects}
 
-    table = {}
-    for g in grades:
-        table.setdefault(g.student_id, {})[subject_codes.get(g.subject_id, str(g.subject_id))] = g.final_score
+@grade_bp.get('/class-ranking')
+@roles_required('ADMIN', 'TEACHER', rate={'ADMIN': '60/minute', 'TEACHER': '30/minute'}, max_concurrent=4)
+def class_ranking():
+    class_name = (request.args.get('class_name') or '').strip()
+    if not class_name:
+        return jsonify({'error': 'class_name is required'}), 400
+    term = requested_term()
+    matrix = GradeMatrix.build(class_name, term)
+    counts = [sum(v is not None for v in matrix.row(i)) for i in range(len(matrix.students))]
+    return jsonify({
+        'class_name': class_name,
+        'term': term,
+        'ranking': [
+            {'rank': rank, 'student': matrix.students[i]._asdict(), 'average': average, 'subjects': counts[i]}
+            for rank, i, average in matrix.ranking()
+        ],
+    })
 
-    # If HTML requested explicitly
-    if 'text/html' in (request.headers.get('Accept') or ''):
-        # Build a sorted set of subject codes present
-        all_codes = sorted({code for row in table.values() for code in row.keys()})
-        return render_template('reports/class_report.html', class_name=class_name, students=students, table=table, subjects=all_codes)
 
-    # JSON response
+@grade_bp.get('/class-stats')
+@roles_required('ADMIN', 'TEACHER', rate={'ADMIN': '60/minute', 'TEACHER': '30/minute'}, max_concurrent=4)
+def class_stats():
+    class_name = (request.args.get('class_name') or '').strip()
+    if not class_name:
+        return jsonify({'error': 'class_name is required'}), 400
+    term = requested_term()
+    matrix = GradeMatrix.build(class_name, term)
+    averages = [a for a in matrix.student_averages() if a is not None]
     return jsonify({
         'class_name': class_name,
-        'students': [s.to_dict() for s in students],
-        'grades': table,
+        'term': term,
+        'students': len(matrix.students),
+        'class_average': round(sum(averages) / len(averages), 2) if averages else None,
+        'subjects': [
+            {'subject_id': subject_id, 'term': t, 'label': label, **stats}
+            for (subject_id, t), label, stats in zip(matrix.columns, matrix.labels(term), matrix.column_stats())
+        ],
     })
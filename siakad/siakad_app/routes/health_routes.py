@@ -0,0 +1,23 @@
+import math
+from flask import Blueprint, jsonify
+
+from siakad_app.utils.health import health
+
+health_bp = Blueprint('health', __name__)
+
+
+@health_bp.get('/healthz')
+def healthz():
+    """Liveness: the process answers requests. No I/O, no auth."""
+    return jsonify({'status': 'ok'})
+
+
+@health_bp.get('/readyz')
+def readyz():
+    """Readiness for the load balancer: 200 when this worker should get traffic, else 503."""
+    ready, report = health.readiness()
+    headers = {'Cache-Control': 'no-store'}
+    if ready:
+        return jsonify(report), 200, headers
+    headers['Retry-After'] = str(max(1, math.ceil(health.retry_after())))
+    return jsonify(report), 503, headers
@@ -0,0 +1,85 @@
+import logging
+from flask import Blueprint, Response, jsonify, request
+
+from siakad_app.utils.decorators import roles_required
+from siakad_app.utils.profiling import profiler
+
+logger = logging.getLogger(__name__)
+
+profiling_bp = Blueprint('profiling', __name__)
+
+_SORT_KEYS = {'cumulative', 'tottime', 'calls', 'ncalls', 'time'}
+
+
+@profiling_bp.before_request
+def _profiling_enabled():
+    if not profiler.enabled:
+        return jsonify({'error': 'Profiling tidak aktif'}), 404
+
+
+@profiling_bp.get('/requests')
+@roles_required('ADMIN')
+def list_profiles():
+    """Recent per-request profiles of this worker, newest first."""
+    return jsonify([p.to_dict() for p in reversed(profiler.profiles)])
+
+
+@profiling_bp.get('/requests/<int:profile_id>')
+@roles_required('ADMIN')
+def get_profile(profile_id: int):
+    """pstats report as text (``sort``, ``limit``) or, with ``format=pstats``, the binary dump."""
+    entry = profiler.get_profile(profile_id)
+    if entry is None:
+        return jsonify({'error': 'Not found'}), 404
+    if request.args.get('format') == 'pstats':
+        return Response(entry.dump(), mimetype='application/octet-stream',
+                        headers={'Content-Disposition': f'attachment; filename=request-{entry.id}.pstats'})
+    sort = request.args.get('sort', 'cumulative')
+    if sort not in _SORT_KEYS:
+        return jsonify({'error': f"sort harus salah satu dari: {', '.join(sorted(_SORT_KEYS))}"}), 400
+    limit = min(max(request.args.get('limit', 60, type=int), 1), 500)
+    return Response(entry.report(sort, limit), mimetype='text/plain')
+
+
+@profiling_bp.post('/sampler')
+@roles_required('ADMIN')
+def start_sampler():
+    """Sample every thread of this worker for ``seconds`` (at most PROFILE_MAX_SECONDS)."""
+    data = request.get_json(silent=True) or {}
+    try:
+        sampler = profiler.start_sampler(data.get('seconds', 10), data.get('interval'))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'seconds dan interval harus berupa angka'}), 400
+    except RuntimeError as e:
+        return jsonify({'error': str(e)}), 409
+    return jsonify(sampler.to_dict()), 202
+
+
+@profiling_bp.get('/sampler')
+@roles_required('ADMIN')
+def sampler_status():
+    sampler = profiler.sampler
+    if sampler is None:
+        return jsonify({'error': 'Sampler belum pernah dijalankan'}), 404
+    return jsonify(sampler.to_dict())
+
+
+@profiling_bp.delete('/sampler')
+@roles_required('ADMIN')
+def stop_sampler():
+    sampler = profiler.stop_sampler()
+    if sampler is None:
+        return jsonify({'error': 'Sampler belum pernah dijalankan'}), 404
+    return jsonify(sampler.to_dict())
+
+
+@profiling_bp.get('/sampler/stacks')
+@roles_required('ADMIN')
+def sampler_stacks():
+    """Collapsed stacks of the last finished run, ready for flamegraph.pl or speedscope."""
+    sampler = profiler.sampler
+    if sampler is None:
+        return jsonify({'error': 'Sampler belum pernah dijalankan'}), 404
+    if sampler.running:
+        return jsonify({'error': 'Sampler masih berjalan', **sampler.to_dict()}), 409
+    return Response(sampler.collapsed(), mimetype='text/plain')
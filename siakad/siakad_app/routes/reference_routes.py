@@ -0,0 +1,20 @@
+import logging
+from flask import Blueprint, Response, request
+
+from siakad_app.utils.decorators import roles_required
+from siakad_app.utils.refdata import refdata
+
+logger = logging.getLogger(__name__)
+
+reference_bp = Blueprint('reference', __name__)
+
+
+@reference_bp.get('/')
+@roles_required('ADMIN', 'TEACHER')
+def reference():
+    """Subjects, teachers (id, nip, name) and distinct class names in one cached document."""
+    data = refdata()
+    headers = {'ETag': f'"{data.etag}"', 'Cache-Control': 'private, no-cache'}
+    if request.if_none_match.contains(data.etag):
+        return Response(status=304, headers=headers)
+    return Response(data.body, mimetype='application/json', headers=headers)
@@ -0,0 +1,82 @@
+import logging
+from flask import Blueprint, request, jsonify
+from sqlalchemy.exc import IntegrityError
+
+from siakad_app.extensions import db
+from siakad_app.models import ScoringPolicy, Subject
+from siakad_app.schemas import ScoringPolicySchema
+from siakad_app.utils.decorators import roles_required
+from siakad_app.utils.events import bus, subject_topic
+from siakad_app.utils.idempotency import idempotent
+from siakad_app.utils.scoring import invalidate_scoring_policy, scoring_policy
+
+logger = logging.getLogger(__name__)
+
+scoring_bp = Blueprint('scoring', __name__)
+
+
+def _policy_changed(policy_dict: dict, op: str):
+    invalidate_scoring_policy()
+    topics = [subject_topic(policy_dict['subject_id'])] if policy_dict.get('subject_id') else []
+    # Finals of every matching grade change at once; clients simply reload
+    bus.publish('scoring', {'op': op, **policy_dict}, topics)
+
+
+@scoring_bp.get('/policies')
+@roles_required('ADMIN', 'TEACHER')
+def list_policies():
+    subject_id = request.args.get('subject_id', type=int)
+    query = ScoringPolicy.query
+    if subject_id is not None:
+        query = query.filter(ScoringPolicy.subject_id == subject_id)
+    policies = query.order_by(ScoringPolicy.subject_id, ScoringPolicy.term).all()
+    default = scoring_policy().default
+    return jsonify({
+        'default': {'tugas': default.tugas, 'uts': default.uts, 'uas': default.uas},
+        'items': [p.to_dict() for p in policies],
+    })
+
+
+@scoring_bp.put('/policies')
+@roles_required('ADMIN')
+@idempotent
+def upsert_policy():
+    # Create or replace the weights for a (subject_id, term) scope; both empty = global default
+    try:
+        payload = ScoringPolicySchema().load(request.get_json() or {})
+        subject_id = payload.get('subject_id')
+        term = payload.get('term') or None
+        if subject_id is not None and not db.session.get(Subject, subject_id):
+            return jsonify({'error': 'subject_id tidak ditemukan'}), 400
+
+        policy = ScoringPolicy.query.filter_by(subject_id=subject_id, term=term).first()
+        created = policy is None
+        if created:
+            policy = ScoringPolicy(payload['tugas'], payload['uts'], payload['uas'], subject_id=subject_id, term=term)
+            db.session.add(policy)
+        else:
+            policy.set_weights(payload['tugas'], payload['uts'], payload['uas'])
+        db.session.commit()
+        logger.info(f"Scoring policy saved: subject={subject_id} term={term}")
+        _policy_changed(policy.to_dict(), 'upsert')
+        return jsonify(policy.to_dict()), 201 if created else 200
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({'error': 'Kebijakan penilaian sudah ada'}), 409
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+
+
+@scoring_bp.delete('/policies/<int:policy_id>')
+@roles_required('ADMIN')
+def delete_policy(policy_id: int):
+    policy = db.session.get(ScoringPolicy, policy_id)
+    if not policy:
+        return jsonify({'error': 'Not found'}), 404
+    data = policy.to_dict()
+    db.session.delete(policy)
+    db.session.commit()
+    logger.info(f"Scoring policy deleted: id={policy_id}")
+    _policy_changed(data, 'delete')
+    return jsonify({'message': 'Deleted'})
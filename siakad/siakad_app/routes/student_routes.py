@@ -3,17 +3,32 @@ from datetime import date
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy import or_
+from sqlalchemy import insert, or_, select
 
 from siakad_app.extensions import db
-from siakad_app.models import Student
+from siakad_app.models import Grade, Student
 from siakad_app.schemas import StudentSchema
+from siakad_app.utils.audit import record_cascade_deletes
 from siakad_app.utils.decorators import roles_required, current_user
+from siakad_app.utils.bulk import MAX_IMPORT_ROWS, bulk_criteria, bulk_delete, bulk_update, bulk_values
+from siakad_app.utils.events import bus, class_topic
+from siakad_app.utils.idempotency import idempotent
+from siakad_app.utils.validation import ADDRESS, BIRTH_DATE, STUDENT_COLUMNS, validate_rows
 
 logger = logging.getLogger(__name__)
 
 student_bp = Blueprint('students', __name__)
 
+BULK_FILTERS = {'class_name': Student.class_name, 'gender': Student.gender}
+BULK_FIELDS = {
+    'name': Student._validate_name,
+    'birth_date': BIRTH_DATE,
+    'address': ADDRESS,
+    'gender': Student._validate_gender,
+    'parent_phone': Student._validate_phone,
+    'class_name': Student._validate_class_name,
+}
+
 
 @student_bp.get('/')
 @roles_required('ADMIN', 'TEACHER')
@@ -50,6 +65,7 @@ def get_my_profile():
 
 @student_bp.post('/')
 @roles_required('ADMIN')
+@idempotent
 def create_student():
     try:
         payload = StudentSchema().load(request.get_json() or {})
@@ -65,6 +81,8 @@ def create_student():
         db.session.add(student)
         db.session.commit()
         logger.info(f"Student created: {student.nis}")
+        bus.publish('student', {'op': 'create', 'id': student.id, 'class_name': student.class_name},
+                    [class_topic(student.class_name)])
         return jsonify(student.to_dict()), 201
     except IntegrityError:
         db.session.rollback()
@@ -73,6 +91,40 @@ def create_student():
         return jsonify({'error': str(e)}), 400
 
 
+@student_bp.post('/import')
+@roles_required('ADMIN', max_concurrent=2)
+@idempotent
+def import_students():
+    # All-or-nothing import: {"rows": [{"nis": ..., "name": ..., ...}, ...]}, validated column by column
+    rows = (request.get_json() or {}).get('rows')
+    if not isinstance(rows, list) or not 0 < len(rows) <= MAX_IMPORT_ROWS:
+        return jsonify({'error': f'rows harus berupa list berisi 1-{MAX_IMPORT_ROWS} siswa'}), 400
+    try:
+        values, errors = validate_rows(rows, STUDENT_COLUMNS)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if errors:
+        return jsonify({'error': 'Validation error', 'errors': errors}), 400
+
+    nis = [v['nis'] for v in values]
+    if len(set(nis)) != len(nis):
+        return jsonify({'error': 'NIS ganda di dalam rows'}), 400
+    existing = db.session.scalars(select(Student.nis).where(Student.nis.in_(nis))).all()
+    if existing:
+        return jsonify({'error': 'NIS already exists', 'nis': sorted(existing)[:100]}), 409
+    try:
+        db.session.execute(insert(Student), values)
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({'error': 'NIS already exists'}), 409
+    logger.info(f"Students imported: {len(values)} rows")
+    classes = {v['class_name'] for v in values}
+    bus.publish('student', {'op': 'import', 'count': len(values), 'class_names': sorted(classes)},
+                {class_topic(c) for c in classes})
+    return jsonify({'imported': len(values)}), 201
+
+
 @student_bp.get('/<int:student_id>')
 @roles_required('ADMIN', 'TEACHER', 'STUDENT')
 def get_student(student_id: int):
@@ -90,12 +142,14 @@ def get_student(student_id: int):
 @student_bp.put('/<int:student_id>')
 @student_bp.patch('/<int:student_id>')
 @roles_required('ADMIN')
+@idempotent
 def update_student(student_id: int):
     s = db.session.get(Student, student_id)
     if not s:
         return jsonify({'error': 'Not found'}), 404
 
     data = request.get_json() or {}
+    old_class = s.class_name
     try:
         # partial validation
         if 'nis' in data:
@@ -117,6 +171,8 @@ def update_student(student_id: int):
             s.class_name = Student._validate_class_name(data['class_name'])
         db.session.commit()
         logger.info(f"Student updated: {s.nis}")
+        bus.publish('student', {'op': 'update', 'id': s.id, 'class_name': s.class_name},
+                    {class_topic(old_class), class_topic(s.class_name)})
         return jsonify(s.to_dict())
     except IntegrityError:
         db.session.rollback()
@@ -132,7 +188,48 @@ def delete_student(student_id: int):
     s = db.session.get(Student, student_id)
     if not s:
         return jsonify({'error': 'Not found'}), 404
+    record_cascade_deletes(Grade.student_id == student_id)
     db.session.delete(s)
     db.session.commit()
     logger.info(f"Student deleted: {s.nis}")
+    bus.publish('student', {'op': 'delete', 'id': student_id, 'class_name': s.class_name}, [class_topic(s.class_name)])
     return jsonify({'message': 'Deleted'})
+
+
+@student_bp.post('/bulk-update')
+@roles_required('ADMIN')
+@idempotent
+def bulk_update_students():
+    # Set-based UPDATE, e.g. promote a class: {"filter": {"class_name": "7A"}, "set": {"class_name": "8A"}}
+    data = request.get_json() or {}
+    try:
+        criteria = bulk_criteria(Student, data.get('filter'), BULK_FILTERS)
+        values = bulk_values(data.get('set'), BULK_FIELDS)
+        updated = bulk_update(Student, criteria, values)
+        db.session.commit()
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+    logger.info(f"Students bulk updated: {updated} rows, fields={sorted(values)}")
+    topics = {class_topic(c) for c in (data['filter'].get('class_name'), values.get('class_name')) if c}
+    bus.publish('student', {'op': 'bulk-update', 'count': updated, 'filter': data['filter'], 'set': values}, topics)
+    return jsonify({'updated': updated})
+
+
+@student_bp.post('/bulk-delete')
+@roles_required('ADMIN')
+@idempotent
+def bulk_delete_students():
+    data = request.get_json() or {}
+    try:
+        criteria = bulk_criteria(Student, data.get('filter'), BULK_FILTERS)
+        record_cascade_deletes(Grade.student_id.in_(select(Student.id).where(*criteria)))
+        deleted = bulk_delete(Student, criteria)
+        db.session.commit()
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+    logger.info(f"Students bulk deleted: {deleted} rows")
+    topics = [class_topic(data['filter']['class_name'])] if data['filter'].get('class_name') else []
+    bus.publish('student', {'op': 'bulk-delete', 'count': deleted, 'filter': data['filter']}, topics)
+    return jsonify({'deleted': deleted})
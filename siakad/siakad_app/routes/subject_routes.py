@@ -1,17 +1,38 @@
 import logging
 from flask import Blueprint, request, jsonify
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy import or_
+from sqlalchemy import or_, select
 
 from siakad_app.extensions import db
-from siakad_app.models import Subject, Teacher
+from siakad_app.models import Grade, Subject, Teacher
 from siakad_app.schemas import SubjectSchema
+from siakad_app.utils.audit import record_cascade_deletes
 from siakad_app.utils.decorators import roles_required
+from siakad_app.utils.bulk import bulk_criteria, bulk_delete, bulk_update, bulk_values
+from siakad_app.utils.events import bus, subject_topic
+from siakad_app.utils.idempotency import idempotent
 
 logger = logging.getLogger(__name__)
 
 subject_bp = Blueprint('subjects', __name__)
 
+BULK_FILTERS = {'teacher_id': Subject.teacher_id, 'sks': Subject.sks}
+
+
+def _validate_teacher_id(tid):
+    if tid is None or tid == '':
+        return None
+    if not db.session.get(Teacher, tid):
+        raise ValueError('teacher_id tidak ditemukan')
+    return tid
+
+
+BULK_FIELDS = {
+    'name': Subject._validate_name,
+    'sks': Subject._validate_sks,
+    'teacher_id': _validate_teacher_id,
+}
+
 
 @subject_bp.get('/')
 @roles_required('ADMIN', 'TEACHER')
@@ -36,6 +57,7 @@ def list_subjects():
 
 @subject_bp.post('/')
 @roles_required('ADMIN')
+@idempotent
 def create_subject():
     try:
         payload = SubjectSchema().load(request.get_json() or {})
@@ -45,6 +67,7 @@ def create_subject():
         db.session.add(sub)
         db.session.commit()
         logger.info(f"Subject created: {sub.code}")
+        bus.publish('subject', {'op': 'create', **sub.to_dict(include_teacher=False)}, [subject_topic(sub.id)])
         return jsonify(sub.to_dict()), 201
     except IntegrityError:
         db.session.rollback()
@@ -65,6 +88,7 @@ def get_subject(subject_id: int):
 @subject_bp.put('/<int:subject_id>')
 @subject_bp.patch('/<int:subject_id>')
 @roles_required('ADMIN')
+@idempotent
 def update_subject(subject_id: int):
     s = db.session.get(Subject, subject_id)
     if not s:
@@ -88,6 +112,7 @@ def update_subject(subject_id: int):
                 s.teacher_id = None
         db.session.commit()
         logger.info(f"Subject updated: {s.code}")
+        bus.publish('subject', {'op': 'update', **s.to_dict(include_teacher=False)}, [subject_topic(s.id)])
         return jsonify(s.to_dict())
     except IntegrityError:
         db.session.rollback()
@@ -103,7 +128,47 @@ def delete_subject(subject_id: int):
     s = db.session.get(Subject, subject_id)
     if not s:
         return jsonify({'error': 'Not found'}), 404
+    record_cascade_deletes(Grade.subject_id == subject_id)
     db.session.delete(s)
     db.session.commit()
     logger.info(f"Subject deleted: {s.code}")
+    bus.publish('subject', {'op': 'delete', 'id': subject_id, 'code': s.code}, [subject_topic(subject_id)])
     return jsonify({'message': 'Deleted'})
+
+
+@subject_bp.post('/bulk-update')
+@roles_required('ADMIN')
+@idempotent
+def bulk_update_subjects():
+    data = request.get_json() or {}
+    try:
+        criteria = bulk_criteria(Subject, data.get('filter'), BULK_FILTERS)
+        values = bulk_values(data.get('set'), BULK_FIELDS)
+        updated = bulk_update(Subject, criteria, values)
+        db.session.commit()
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+    logger.info(f"Subjects bulk updated: {updated} rows, fields={sorted(values)}")
+    topics = [subject_topic(i) for i in data['filter'].get('ids', [])]
+    bus.publish('subject', {'op': 'bulk-update', 'count': updated, 'filter': data['filter'], 'set': values}, topics)
+    return jsonify({'updated': updated})
+
+
+@subject_bp.post('/bulk-delete')
+@roles_required('ADMIN')
+@idempotent
+def bulk_delete_subjects():
+    data = request.get_json() or {}
+    try:
+        criteria = bulk_criteria(Subject, data.get('filter'), BULK_FILTERS)
+        record_cascade_deletes(Grade.subject_id.in_(select(Subject.id).where(*criteria)))
+        deleted = bulk_delete(Subject, criteria)
+        db.session.commit()
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+    logger.info(f"Subjects bulk deleted: {deleted} rows")
+    topics = [subject_topic(i) for i in data['filter'].get('ids', [])]
+    bus.publish('subject', {'op': 'bulk-delete', 'count': deleted, 'filter': data['filter']}, topics)
+    return jsonify({'deleted': deleted})
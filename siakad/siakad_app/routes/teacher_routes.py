@@ -1,5 +1,6 @@
 import logging
 from flask import Blueprint, request, jsonify
+from flask_jwt_extended import get_jwt
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy import or_
 
@@ -7,11 +8,24 @@ from siakad_app.extensions import db
 from siakad_app.models import Teacher
 from siakad_app.schemas import TeacherSchema
 from siakad_app.utils.decorators import roles_required, current_user
+from siakad_app.utils.bulk import bulk_criteria, bulk_delete, bulk_update, bulk_values
+from siakad_app.utils.idempotency import idempotent
+from siakad_app.utils.refdata import owned_subjects
+from siakad_app.utils.terms import requested_term
+from siakad_app.utils.validation import ADDRESS
+from siakad_app.utils.workload import teacher_workload
 
 logger = logging.getLogger(__name__)
 
 teacher_bp = Blueprint('teachers', __name__)
 
+BULK_FILTERS = {}
+BULK_FIELDS = {
+    'name': Teacher._validate_name,
+    'phone': Teacher._validate_phone,
+    'address': ADDRESS,
+}
+
 
 @teacher_bp.get('/')
 @roles_required('ADMIN')
@@ -40,11 +54,25 @@ def get_my_profile():
     user = current_user()
     if not user or not user.teacher:
         return jsonify({'error': 'Teacher profile not found'}), 404
-    return jsonify(user.teacher.to_dict())
+    data = user.teacher.to_dict(include_subjects=False)
+    # One column query instead of the lazy Teacher.subjects load
+    data['subjects'] = [s._asdict() for s in owned_subjects(user.teacher_id)]
+    return jsonify(data)
+
+
+@teacher_bp.get('/me/workload')
+@roles_required('TEACHER', max_concurrent=8)
+def my_workload():
+    """Completeness and averages of every subject the teacher owns, for ?term= (default: active term)."""
+    teacher_id = get_jwt().get('teacher_id')
+    if teacher_id is None:
+        return jsonify({'error': 'Teacher profile not found'}), 404
+    return jsonify(teacher_workload(teacher_id, requested_term()))
 
 
 @teacher_bp.post('/')
 @roles_required('ADMIN')
+@idempotent
 def create_teacher():
     try:
         payload = TeacherSchema().load(request.get_json() or {})
@@ -75,6 +103,7 @@ def get_teacher(teacher_id: int):
 @teacher_bp.put('/<int:teacher_id>')
 @teacher_bp.patch('/<int:teacher_id>')
 @roles_required('ADMIN')
+@idempotent
 def update_teacher(teacher_id: int):
     t = db.session.get(Teacher, teacher_id)
     if not t:
@@ -111,3 +140,37 @@ def delete_teacher(teacher_id: int):
     db.session.commit()
     logger.info(f"Teacher deleted: {t.nip}")
     return jsonify({'message': 'Deleted'})
+
+
+@teacher_bp.post('/bulk-update')
+@roles_required('ADMIN')
+@idempotent
+def bulk_update_teachers():
+    data = request.get_json() or {}
+    try:
+        criteria = bulk_criteria(Teacher, data.get('filter'), BULK_FILTERS)
+        values = bulk_values(data.get('set'), BULK_FIELDS)
+        updated = bulk_update(Teacher, criteria, values)
+        db.session.commit()
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+    logger.info(f"Teachers bulk updated: {updated} rows, fields={sorted(values)}")
+    return jsonify({'updated': updated})
+
+
+@teacher_bp.post('/bulk-delete')
+@roles_required('ADMIN')
+@idempotent
+def bulk_delete_teachers():
+    # Subjects taught by deleted teachers keep existing with teacher_id set to NULL
+    data = request.get_json() or {}
+    try:
+        criteria = bulk_criteria(Teacher, data.get('filter'), BULK_FILTERS)
+        deleted = bulk_delete(Teacher, criteria)
+        db.session.commit()
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+    logger.info(f"Teachers bulk deleted: {deleted} rows")
+    return jsonify({'deleted': deleted})
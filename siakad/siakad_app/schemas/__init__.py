@@ -3,3 +3,4 @@ from .teacher import TeacherSchema
 from .subject import SubjectSchema
 from .grade import GradeSchema
 from .user import LoginSchema, RegisterUserSchema
+from .scoring import ScoringPolicySchema
@@ -0,0 +1,15 @@
+from marshmallow import ValidationError, fields
+
+
+class Validated(fields.Field):
+    """Deserialize with a ``utils.validation`` validator, the same one the model uses."""
+
+    def __init__(self, validator, **kwargs):
+        super().__init__(**kwargs)
+        self.validator = validator
+
+    def _deserialize(self, value, attr, data, **kwargs):
+        try:
+            return self.validator(value)
+        except ValueError as e:
+            raise ValidationError(str(e))
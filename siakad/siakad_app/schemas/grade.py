@@ -1,10 +1,15 @@
 from marshmallow import Schema, fields, validate
 
+from siakad_app.schemas.fields import Validated
+from siakad_app.utils.terms import TERM_PATTERN
+from siakad_app.utils.validation import SCORE
+
 
 class GradeSchema(Schema):
     id = fields.Int(dump_only=True)
     student_id = fields.Int(required=True)
     subject_id = fields.Int(required=True)
-    tugas = fields.Float(required=True, validate=validate.Range(min=0, max=100))
-    uts = fields.Float(required=True, validate=validate.Range(min=0, max=100))
-    uas = fields.Float(required=True, validate=validate.Range(min=0, max=100))
+    term = fields.Str(required=False, validate=validate.Regexp(TERM_PATTERN, error='Format semester tidak valid'))
+    tugas = Validated(SCORE, required=True)
+    uts = Validated(SCORE, required=True)
+    uas = Validated(SCORE, required=True)
@@ -0,0 +1,12 @@
+from marshmallow import Schema, fields, validate
+from siakad_app.utils.terms import TERM_PATTERN
+
+
+class ScoringPolicySchema(Schema):
+    id = fields.Int(dump_only=True)
+    subject_id = fields.Int(required=False, allow_none=True)
+    term = fields.Str(required=False, allow_none=True,
+                      validate=validate.Regexp(TERM_PATTERN, error='Format semester tidak valid'))
+    tugas = fields.Float(required=True, validate=validate.Range(min=0))
+    uts = fields.Float(required=True, validate=validate.Range(min=0))
+    uas = fields.Float(required=True, validate=validate.Range(min=0))
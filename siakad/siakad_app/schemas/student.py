@@ -1,12 +1,15 @@
-from marshmallow import Schema, fields, validate
+from marshmallow import Schema, fields
+
+from siakad_app.schemas.fields import Validated
+from siakad_app.utils import validation
 
 
 class StudentSchema(Schema):
     id = fields.Int(dump_only=True)
-    nis = fields.Str(required=True, validate=validate.Regexp(r'^\d{10}$', error='NIS harus 10 digit angka'))
-    name = fields.Str(required=True, validate=validate.Length(min=3))
+    nis = Validated(validation.NIS, required=True)
+    name = Validated(validation.PERSON_NAME, required=True)
     birth_date = fields.Date(required=True)
     address = fields.Str(required=False, allow_none=True)
-    gender = fields.Str(required=True, validate=validate.OneOf(['L', 'P']))
-    parent_phone = fields.Str(required=False, allow_none=True, validate=validate.Regexp(r'^\d{8,15}$'))
-    class_name = fields.Str(required=True, validate=validate.Length(min=1, max=20))
+    gender = Validated(validation.GENDER, required=True)
+    parent_phone = Validated(validation.PARENT_PHONE, required=False, allow_none=True)
+    class_name = Validated(validation.CLASS_NAME, required=True)
@@ -1,9 +1,12 @@
-from marshmallow import Schema, fields, validate
+from marshmallow import Schema, fields
+
+from siakad_app.schemas.fields import Validated
+from siakad_app.utils import validation
 
 
 class SubjectSchema(Schema):
     id = fields.Int(dump_only=True)
-    code = fields.Str(required=True, validate=validate.Regexp(r'^[A-Z0-9_\-]{2,12}$'))
-    name = fields.Str(required=True, validate=validate.Length(min=2))
-    sks = fields.Int(required=True, validate=validate.Range(min=1, max=6))
+    code = Validated(validation.SUBJECT_CODE, required=True)
+    name = Validated(validation.SUBJECT_NAME, required=True)
+    sks = Validated(validation.SKS, required=True)
     teacher_id = fields.Int(required=False, allow_none=True)
@@ -1,9 +1,12 @@
-from marshmallow import Schema, fields, validate
+from marshmallow import Schema, fields
+
+from siakad_app.schemas.fields import Validated
+from siakad_app.utils import validation
 
 
 class TeacherSchema(Schema):
     id = fields.Int(dump_only=True)
-    nip = fields.Str(required=True, validate=validate.Regexp(r'^\d{8,18}$'))
-    name = fields.Str(required=True, validate=validate.Length(min=3))
-    phone = fields.Str(required=False, allow_none=True, validate=validate.Regexp(r'^\d{8,15}$'))
+    nip = Validated(validation.NIP, required=True)
+    name = Validated(validation.PERSON_NAME, required=True)
+    phone = Validated(validation.PHONE, required=False, allow_none=True)
     address = fields.Str(required=False, allow_none=True)
@@ -1,4 +1,6 @@
 let token = null;
+let avgChart = null;
+let refreshTimer = null;
 
 function setStatus(msg, isError=false) {
   const el = document.getElementById('login-status');
@@ -18,35 +20,75 @@ async function api(path, options={}) {
   return res.json();
 }
 
+function renderAverages(rows) {
+  const labels = rows.map(r => r.code);
+  const values = rows.map(r => r.average);
+
+  if (avgChart) {
+    avgChart.data.labels = labels;
+    avgChart.data.datasets[0].data = values;
+    avgChart.update();
+    return;
+  }
+  const ctx = document.getElementById('avgChart').getContext('2d');
+  avgChart = new Chart(ctx, {
+    type: 'bar',
+    data: {
+      labels,
+      datasets: [{
+        label: 'Rata-rata',
+        data: values,
+        backgroundColor: '#3b82f6'
+      }]
+    },
+    options: {
+      scales: { y: { beginAtZero: true, max: 100 } }
+    }
+  });
+}
+
 async function loadDashboard() {
   try {
-    const stats = await api('/dashboard/stats');
+    // One request: counts and averages by subject together
+    const { stats, averages } = await api('/dashboard/summary');
     document.getElementById('stat-students').textContent = stats.students;
     document.getElementById('stat-teachers').textContent = stats.teachers;
     document.getElementById('stat-subjects').textContent = stats.subjects;
 
-    const rows = await api('/dashboard/avg-by-subject');
-    const labels = rows.map(r => r.code);
-    const values = rows.map(r => r.average);
+    renderAverages(averages);
+  } catch (e) {
+    setStatus('Gagal memuat dashboard: ' + e.message, true);
+  }
+}
+
+function scheduleRefresh() {
+  // Coalesce bursts of change events into one reload
+  if (refreshTimer) return;
+  refreshTimer = setTimeout(() => { refreshTimer = null; loadDashboard(); }, 2000);
+}
 
-    const ctx = document.getElementById('avgChart').getContext('2d');
-    new Chart(ctx, {
-      type: 'bar',
-      data: {
-        labels,
-        datasets: [{
-          label: 'Rata-rata',
-          data: values,
-          backgroundColor: '#3b82f6'
-        }]
-      },
-      options: {
-        scales: { y: { beginAtZero: true, max: 100 } }
+async function subscribeChanges() {
+  // fetch-based SSE reader so the JWT travels in the Authorization header
+  try {
+    const res = await fetch('/events/stream', { headers: { 'Authorization': 'Bearer ' + token } });
+    if (!res.ok || !res.body) throw new Error('HTTP ' + res.status);
+    const reader = res.body.pipeThrough(new TextDecoderStream()).getReader();
+    let buffer = '';
+    while (true) {
+      const { value, done } = await reader.read();
+      if (done) break;
+      buffer += value;
+      let sep;
+      while ((sep = buffer.indexOf('\n\n')) >= 0) {
+        const frame = buffer.slice(0, sep);
+        buffer = buffer.slice(sep + 2);
+        if (/^event: (grade|student|subject|scoring|resync)$/m.test(frame)) scheduleRefresh();
       }
-    });
+    }
   } catch (e) {
-    setStatus('Gagal memuat dashboard: ' + e.message, true);
+    console.warn('Change feed disconnected:', e.message);
   }
+  if (token) setTimeout(subscribeChanges, 5000);
 }
 
 function showDashboard() {
@@ -67,6 +109,7 @@ window.addEventListener('DOMContentLoaded', () => {
       setStatus('Login sukses');
       showDashboard();
       await loadDashboard();
+      subscribeChanges();
     } catch (e) {
       setStatus('Login gagal: ' + e.message, true);
     }
@@ -0,0 +1,89 @@
+import logging
+from datetime import datetime
+from sqlalchemy import delete, exists, insert, literal, select, union_all
+
+from siakad_app.extensions import db
+from siakad_app.models import Grade, GradeArchive
+from siakad_app.utils.terms import ALL_TERMS, current_term, validate_term
+
+logger = logging.getLogger(__name__)
+
+
+def _query(model, term, student_ids=None, **filters):
+    query = model.query.filter_by(**filters)
+    if term != ALL_TERMS:
+        query = query.filter(model.term == term)
+    if student_ids is not None:
+        query = query.filter(model.student_id.in_(student_ids))
+    return query
+
+
+def term_grades(term: str, student_ids=None, **filters):
+    """Grades for one term (or ``ALL_TERMS``), reading the archive only when needed.
+
+    The active term is served from ``grades`` alone through the ``(term, ...)``
+    composite indexes. Other terms combine both tables, like ``term_source``:
+    a grade written into a term after it was archived lives in ``grades`` and
+    takes precedence over an archived row of the same student and subject.
+    """
+    if student_ids is not None and not student_ids:
+        return []
+    grades = _query(Grade, term, student_ids, **filters).all()
+    if term == current_term():
+        return grades
+    live = {(g.student_id, g.subject_id, g.term) for g in grades}
+    archived = [a for a in _query(GradeArchive, term, student_ids, **filters).all()
+                if (a.student_id, a.subject_id, a.term) not in live]
+    if not archived:
+        return grades
+    return sorted(grades + archived, key=lambda g: (g.term, g.subject_id, g.student_id))
+
+
+def _shadowed():
+    """An archived row replaced by a live grade of the same student, subject and term."""
+    return exists().where(Grade.student_id == GradeArchive.student_id, Grade.subject_id == GradeArchive.subject_id,
+                          Grade.term == GradeArchive.term)
+
+
+def term_source(term: str):
+    """Subquery of the grades of ``term`` (student_id, subject_id, term, tugas, uts, uas) for set-based reads.
+
+    The active term only reads ``grades``; other terms read both tables,
+    skipping archived rows that a later live grade replaces.
+    """
+    def part(model):
+        stmt = select(model.student_id, model.subject_id, model.term, model.tugas, model.uts, model.uas)
+        return stmt if term == ALL_TERMS else stmt.where(model.term == term)
+
+    if term == current_term():
+        return part(Grade).subquery('g')
+    return union_all(part(Grade), part(GradeArchive).where(~_shadowed())).subquery('g')
+
+
+def archive_term(term: str) -> int:
+    """Move every grade of a closed term into ``grades_archive`` in one transaction.
+
+    Works on whole tables, i.e. for every school stored in the current database.
+    Running it again moves grades written since; they replace archived rows of
+    the same student and subject.
+    """
+    term = validate_term(term)
+    if term == current_term():
+        raise ValueError('Semester aktif tidak dapat diarsipkan')
+
+    g = Grade.__table__
+    a = GradeArchive.__table__
+    cols = ['tenant_id', 'student_id', 'subject_id', 'term', 'tugas', 'uts', 'uas']
+    source = select(g.c.id, *[g.c[c] for c in cols], literal(datetime.utcnow()).label('archived_at')) \
+        .where(g.c.term == term)
+    replaced = exists().where(g.c.term == term, g.c.student_id == a.c.student_id, g.c.subject_id == a.c.subject_id)
+    try:
+        db.session.execute(delete(a).where(a.c.term == term, replaced))
+        moved = db.session.execute(insert(a).from_select(['grade_id', *cols, 'archived_at'], source)).rowcount
+        db.session.execute(delete(g).where(g.c.term == term))
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    logger.info(f"Term archived: {term} ({moved} grades)")
+    return moved
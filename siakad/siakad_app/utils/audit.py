@@ -0,0 +1,246 @@
+import atexit
+import logging
+import os
+import threading
+from datetime import datetime
+from flask import has_request_context
+from flask_jwt_extended import get_jwt_identity
+from sqlalchemy import event, insert, inspect, select
+
+from siakad_app.extensions import db
+from siakad_app.models import Grade, GradeHistory
+from siakad_app.utils.tenancy import tenancy
+
+logger = logging.getLogger(__name__)
+
+_SESSION_KEY = 'grade_audit'
+_TRACKED = ('tugas', 'uts', 'uas')
+
+
+def _actor_id():
+    if not has_request_context():
+        return None
+    try:
+        return get_jwt_identity()
+    except Exception:
+        return None
+
+
+def audit_event(grade: Grade, action: str, prev=None) -> dict:
+    prev = prev or {}
+    return {
+        'tenant_id': grade.tenant_id,
+        'grade_id': grade.id,
+        'student_id': grade.student_id,
+        'subject_id': grade.subject_id,
+        'term': grade.term,
+        'action': action,
+        'tugas': grade.tugas if action != 'DELETE' else None,
+        'uts': grade.uts if action != 'DELETE' else None,
+        'uas': grade.uas if action != 'DELETE' else None,
+        'prev_tugas': prev.get('tugas'),
+        'prev_uts': prev.get('uts'),
+        'prev_uas': prev.get('uas'),
+        'changed_by': _actor_id(),
+        'changed_at': datetime.utcnow(),
+    }
+
+
+def record_cascade_deletes(*criteria) -> int:
+    """Record DELETE history for the grades matching ``criteria`` before a parent delete removes them.
+
+    Student and subject deletes, single and bulk, leave their grades to
+    ``ON DELETE CASCADE``, so the flush hook never sees those rows; one SELECT
+    collects them instead. Returns the number of events recorded.
+    """
+    columns = (Grade.id, Grade.tenant_id, Grade.student_id, Grade.subject_id, Grade.term,
+               *(getattr(Grade, name) for name in _TRACKED))
+    rows = db.session.execute(select(*columns).where(*criteria)).all()
+    if rows:
+        grade_audit.record([audit_event(row, 'DELETE', {n: getattr(row, n) for n in _TRACKED}) for row in rows])
+    return len(rows)
+
+
+def _previous_values(grade: Grade):
+    state = inspect(grade)
+    prev, changed = {}, False
+    for name in _TRACKED:
+        hist = state.attrs[name].history
+        if hist.deleted:
+            prev[name] = hist.deleted[0]
+            changed = changed or hist.added != hist.deleted
+        else:
+            prev[name] = getattr(grade, name)
+    return prev if changed else None
+
+
+class GradeAuditLog:
+    """Append-only grade history with batched writes.
+
+    Change events are collected from the ORM on every flush. In ``async`` mode
+    (default) they are handed over on commit to an in-process buffer that a
+    background writer inserts in batches with one executemany per batch, so
+    grade entry never waits on the audit INSERT. The buffer is bounded: once
+    ``GRADE_AUDIT_MAX_PENDING`` events are queued the committing request
+    flushes synchronously instead of dropping events, so the only loss window
+    is a hard crash before the next flush (at most one batch or one flush
+    interval of events). ``sync`` mode writes the batch in the same
+    transaction as the grade change instead.
+    """
+
+    def __init__(self):
+        self.app = None
+        self.mode = 'async'
+        self.batch_size = 200
+        self.flush_interval = 2.0
+        self.max_pending = 10000
+        self._listening = False
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending = []
+        self._wakeup = threading.Event()
+        self._writer = None
+
+    def init_app(self, app):
+        self.app = app
+        self.mode = app.config.get('GRADE_AUDIT_MODE', 'async')
+        self.batch_size = app.config.get('GRADE_AUDIT_BATCH_SIZE', 200)
+        self.flush_interval = app.config.get('GRADE_AUDIT_FLUSH_INTERVAL', 2.0)
+        self.max_pending = app.config.get('GRADE_AUDIT_MAX_PENDING', 10000)
+        if not self._listening:
+            event.listen(db.session, 'after_flush', self._after_flush)
+            event.listen(db.session, 'after_commit', self._after_commit)
+            event.listen(db.session, 'after_rollback', self._after_rollback)
+            atexit.register(self.flush)
+            self._listening = True
+
+    # -- session hooks -------------------------------------------------
+
+    def _after_flush(self, session, flush_context):
+        events = []
+        for obj in session.new:
+            if isinstance(obj, Grade):
+                events.append(audit_event(obj, 'CREATE'))
+        for obj in session.dirty:
+            if isinstance(obj, Grade):
+                prev = _previous_values(obj)
+                if prev is not None:
+                    events.append(audit_event(obj, 'UPDATE', prev))
+        for obj in session.deleted:
+            if isinstance(obj, Grade):
+                events.append(audit_event(obj, 'DELETE', {n: getattr(obj, n) for n in _TRACKED}))
+        if events:
+            self.record(events, session)
+
+    def _after_commit(self, session):
+        events = session.info.pop(_SESSION_KEY, None)
+        if events:
+            self._enqueue(events)
+
+    def _after_rollback(self, session):
+        session.info.pop(_SESSION_KEY, None)
+
+    # -- public API ------------------------------------------------------
+
+    def record(self, events, session=None):
+        """Record change events for writes that bypass the ORM (Core upserts, bulk syncs)."""
+        session = session or db.session()
+        if self.mode == 'sync':
+            session.connection().execute(insert(GradeHistory.__table__), events)
+        else:
+            session.info.setdefault(_SESSION_KEY, []).extend(events)
+
+    def pending(self) -> int:
+        return len(self._pending) if self._pid == os.getpid() else 0
+
+    def flush(self) -> int:
+        """Write every buffered event now; returns the number of rows inserted."""
+        if self._pid != os.getpid() or self.app is None:
+            return 0
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, []
+            if not batch:
+                return 0
+            try:
+                with self.app.app_context():
+                    for engine, rows in self._by_engine(batch):
+                        with engine.begin() as conn:
+                            conn.execute(insert(GradeHistory.__table__), rows)
+            except Exception as e:
+                logger.error(f"Grade audit flush failed, {len(batch)} events requeued: {e}")
+                with self._lock:
+                    self._pending[:0] = batch
+                    overflow = len(self._pending) - self.max_pending
+                    if overflow > 0:
+                        del self._pending[:overflow]
+                        logger.error(f"Grade audit buffer full, dropped {overflow} oldest events")
+                return 0
+            return len(batch)
+
+    @staticmethod
+    def _by_engine(batch):
+        # Tenants with their own database get their history written there
+        groups = {}
+        for row in batch:
+            engine = tenancy.engine_for(row['tenant_id']) or db.engine
+            groups.setdefault(engine, []).append(row)
+        return groups.items()
+
+    # -- writer ------------------------------------------------------------
+
+    def _enqueue(self, events):
+        if self._pid != os.getpid():
+            # Forked worker: never reuse the parent's lock, buffer or thread
+            self._reset()
+        with self._lock:
+            self._pending.extend(events)
+            size = len(self._pending)
+        if size >= self.max_pending:
+            self.flush()
+            return
+        self._ensure_writer()
+        if size >= self.batch_size:
+            self._wakeup.set()
+
+    def _ensure_writer(self):
+        if self._writer is not None and self._writer.is_alive():
+            return
+        self._writer = threading.Thread(target=self._run, name='grade-audit-writer', daemon=True)
+        self._writer.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+
+grade_audit = GradeAuditLog()
+
+
+def grade_history(student_id: int = None, subject_id: int = None, term: str = None,
+                  limit: int = 100, before_id: int = None):
+    """Newest-first history for a student and/or subject, keyset-paginated by id.
+
+    Served by the ``(student_id, id)`` / ``(subject_id, id)`` indexes. Pending
+    buffered events of this worker are flushed first so callers read their own
+    writes.
+    """
+    if student_id is None and subject_id is None:
+        raise ValueError('student_id atau subject_id wajib diisi')
+    grade_audit.flush()
+    query = GradeHistory.query
+    if student_id is not None:
+        query = query.filter(GradeHistory.student_id == student_id)
+    if subject_id is not None:
+        query = query.filter(GradeHistory.subject_id == subject_id)
+    if term:
+        query = query.filter(GradeHistory.term == term)
+    if before_id:
+        query = query.filter(GradeHistory.id < before_id)
+    return query.order_by(GradeHistory.id.desc()).limit(limit).all()
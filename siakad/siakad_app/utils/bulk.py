@@ -0,0 +1,68 @@
+from sqlalchemy import delete, update
+
+from siakad_app.extensions import db
+
+MAX_BULK_IDS = 5000
+MAX_IMPORT_ROWS = 5000
+
+_TYPE_NAMES = {int: 'angka', str: 'teks'}
+
+
+def bulk_criteria(model, spec, filters: dict):
+    """Translate a request ``filter`` object into WHERE criteria.
+
+    ``filters`` maps the accepted filter keys to columns; ``ids`` is always
+    accepted. An empty filter is rejected so a bulk call can never touch the
+    whole table by accident, and every value must be a scalar of its
+    column's type (``null`` only for nullable columns).
+    """
+    if not isinstance(spec, dict) or not spec:
+        raise ValueError('filter wajib diisi')
+    unknown = set(spec) - set(filters) - {'ids'}
+    if unknown:
+        raise ValueError(f"Filter tidak dikenal: {', '.join(sorted(unknown))}")
+
+    criteria = []
+    for key, value in spec.items():
+        if key == 'ids':
+            if not isinstance(value, list) or not value or len(value) > MAX_BULK_IDS:
+                raise ValueError(f'ids harus berupa list berisi 1-{MAX_BULK_IDS} id')
+            try:
+                ids = [int(v) for v in value]
+            except (TypeError, ValueError):
+                raise ValueError('ids harus berupa angka')
+            criteria.append(model.id.in_(ids))
+        else:
+            criteria.append(filters[key] == _filter_value(key, filters[key], value))
+    return criteria
+
+
+def _filter_value(key: str, column, value):
+    if value is None and column.expression.nullable:
+        return None
+    python_type = column.type.python_type
+    # bool is an int subclass; lists and objects would only fail in the driver
+    if isinstance(value, bool) or not isinstance(value, python_type):
+        raise ValueError(f"Filter {key} harus berupa {_TYPE_NAMES.get(python_type, python_type.__name__)}")
+    return value
+
+
+def bulk_values(data, validators: dict) -> dict:
+    """Validate a ``set`` object with the same per-field rules as single updates."""
+    if not isinstance(data, dict) or not data:
+        raise ValueError('set wajib diisi')
+    unknown = set(data) - set(validators)
+    if unknown:
+        raise ValueError(f"Field tidak dapat diubah secara massal: {', '.join(sorted(unknown))}")
+    return {key: validators[key](value) for key, value in data.items()}
+
+
+def bulk_update(model, criteria, values: dict) -> int:
+    stmt = update(model).where(*criteria).values(**values).execution_options(synchronize_session=False)
+    return db.session.execute(stmt).rowcount
+
+
+def bulk_delete(model, criteria) -> int:
+    # Dependent rows go through ON DELETE CASCADE / SET NULL in the database
+    stmt = delete(model).where(*criteria).execution_options(synchronize_session=False)
+    return db.session.execute(stmt).rowcount
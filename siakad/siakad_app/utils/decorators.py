@@ -1,29 +1,72 @@
 from functools import wraps
-from flask import jsonify
+from flask import g, jsonify, request
 from flask_jwt_extended import verify_jwt_in_request, get_jwt, get_jwt_identity
 from siakad_app.extensions import db
 from siakad_app.models import User
+from siakad_app.utils.profiling import profiler
+from siakad_app.utils.ratelimit import admit, limiter, parse_rate, too_many_requests
 
 
-def roles_required(*roles):
+def roles_required(*roles, rate=None, max_concurrent=None, queue_timeout=None):
+    """Require one of ``roles``; optionally rate limit and cap concurrency.
+
+    ``rate`` is a limit such as '30/minute' for every role, or a dict of
+    per-role limits, applied per user on top of RATELIMIT_ROLE_DEFAULTS.
+    ``max_concurrent`` caps simultaneous executions per worker; requests
+    that cannot be admitted within ``queue_timeout`` seconds get 429. A
+    streamed response holds its slot until the body has been sent.
+    ADMIN requests with an ``X-Profile: 1`` header run under cProfile
+    (see ``utils.profiling``).
+    """
     roles_set = set(r.upper() for r in roles)
+    for r in (rate.values() if isinstance(rate, dict) else [rate] if rate else []):
+        parse_rate(r)
 
     def wrapper(fn):
         @wraps(fn)
         def decorator(*args, **kwargs):
-            verify_jwt_in_request()
+            verify_jwt()
             claims = get_jwt()
             role = claims.get('role')
             if role not in roles_set:
                 return jsonify({'error': 'Forbidden'}), 403
-            return fn(*args, **kwargs)
+            endpoint = request.endpoint or fn.__name__
+            retry = limiter.check_role(endpoint, role, get_jwt_identity(), rate)
+            if retry is not None:
+                return too_many_requests(retry)
+            if role == 'ADMIN' and profiler.wants_profile(request):
+                return profiler.profile_request(request, admit, endpoint, max_concurrent, queue_timeout,
+                                                fn, *args, **kwargs)
+            return admit(endpoint, max_concurrent, queue_timeout, fn, *args, **kwargs)
         return decorator
     return wrapper
 
 
-def current_user():
+def verify_jwt():
+    """``verify_jwt_in_request``, except in the sub-requests of /batch, which reuse its verified token."""
+    if g.get('batch_verified'):
+        return
     verify_jwt_in_request()
+
+
+def login_required(fn):
+    """``@jwt_required()`` that also skips verification inside /batch."""
+    @wraps(fn)
+    def decorator(*args, **kwargs):
+        verify_jwt()
+        return fn(*args, **kwargs)
+    return decorator
+
+
+def current_user():
+    verify_jwt()
     uid = get_jwt_identity()
     if uid is None:
         return None
-    return db.session.get(User, uid)
+    # Loaded once per request, or once per /batch for all its sub-requests
+    cached = g.get('principal')
+    if cached is not None and cached[0] == uid:
+        return cached[1]
+    user = db.session.get(User, uid)
+    g.principal = (uid, user)
+    return user
@@ -0,0 +1,220 @@
+"""In-process publish/subscribe bus feeding the ``/events/stream`` SSE endpoint.
+
+Write paths publish compact change events after commit. Each subscriber owns
+a bounded queue; a subscriber that falls behind is sent a ``resync`` event
+and disconnected instead of growing memory, and the number of subscribers
+per worker is capped. With ``EVENTS_FANOUT_DIR`` set, workers on the same
+host also forward events to each other over Unix datagram sockets in that
+directory (local only, best effort).
+"""
+import itertools
+import json
+import logging
+import os
+import queue
+import socket
+import threading
+
+from siakad_app.utils.tenancy import current_tenant
+
+logger = logging.getLogger(__name__)
+
+ALL = 'all'
+
+
+class BusFull(Exception):
+    pass
+
+
+def _scoped(topics):
+    # Topics are per school: class '7A' of one tenant is not class '7A' of another
+    tenant = current_tenant()
+    return [f'{tenant}/{topic}' for topic in topics]
+
+
+class Subscription:
+    def __init__(self, topics, maxsize: int):
+        self.topics = frozenset(topics)
+        self.queue = queue.Queue(maxsize)
+        self.overflowed = False
+
+    def offer(self, message: str):
+        try:
+            self.queue.put_nowait(message)
+        except queue.Full:
+            self.overflowed = True
+
+
+class EventBus:
+    def __init__(self):
+        self.max_subscribers = 50
+        self.queue_size = 100
+        self.heartbeat = 15.0
+        self.fanout_dir = None
+        self._topics = {}
+        self._count = 0
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._pid = None
+        self._recv_sock = None
+        self._send_sock = None
+
+    def init_app(self, app):
+        self.max_subscribers = app.config.get('EVENTS_MAX_SUBSCRIBERS', 50)
+        self.queue_size = app.config.get('EVENTS_QUEUE_SIZE', 100)
+        self.heartbeat = app.config.get('EVENTS_HEARTBEAT', 15.0)
+        self.fanout_dir = app.config.get('EVENTS_FANOUT_DIR') or None
+        if self.fanout_dir:
+            os.makedirs(self.fanout_dir, exist_ok=True)
+
+    @property
+    def subscribers(self) -> int:
+        return self._count
+
+    # -- subscribers -------------------------------------------------------
+
+    def subscribe(self, topics) -> Subscription:
+        sub = Subscription(_scoped(topics), self.queue_size)
+        with self._lock:
+            if self._count >= self.max_subscribers:
+                raise BusFull()
+            for topic in sub.topics:
+                self._topics.setdefault(topic, set()).add(sub)
+            self._count += 1
+        if self.fanout_dir:
+            self._ensure_listener()
+        return sub
+
+    def unsubscribe(self, sub: Subscription):
+        with self._lock:
+            for topic in sub.topics:
+                subs = self._topics.get(topic)
+                if subs is not None:
+                    subs.discard(sub)
+                    if not subs:
+                        del self._topics[topic]
+            self._count -= 1
+
+    # -- publishing ----------------------------------------------------------
+
+    def publish(self, event_type: str, data: dict, topics=()):
+        """Deliver ``data`` to subscribers of any of ``topics`` (and of ``all``)."""
+        topics = _scoped([ALL, *topics])
+        message = f"id: {os.getpid()}-{next(self._ids)}\nevent: {event_type}\ndata: {json.dumps(data, separators=(',', ':'), default=str)}\n\n"
+        self._deliver(topics, message)
+        if self.fanout_dir:
+            self._fanout(topics, message)
+
+    def _deliver(self, topics, message: str):
+        if not self._count:
+            return
+        with self._lock:
+            targets = set()
+            for topic in topics:
+                targets.update(self._topics.get(topic, ()))
+        for sub in targets:
+            sub.offer(message)
+
+    # -- cross-worker fan-out ------------------------------------------------
+
+    def _own_path(self):
+        return os.path.join(self.fanout_dir, f'{os.getpid()}.sock')
+
+    def _ensure_listener(self):
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            path = self._own_path()
+            if os.path.exists(path):
+                os.unlink(path)
+            self._recv_sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            self._recv_sock.bind(path)
+        threading.Thread(target=self._listen, name='event-bus-fanout', daemon=True).start()
+
+    def _listen(self):
+        while True:
+            try:
+                packet = json.loads(self._recv_sock.recv(65536))
+            except OSError:
+                return
+            except ValueError:
+                continue
+            self._deliver(packet['topics'], packet['message'])
+
+    def _fanout(self, topics, message: str):
+        packet = json.dumps({'topics': topics, 'message': message}).encode()
+        if self._send_sock is None or self._send_sock.fileno() < 0:
+            self._send_sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            self._send_sock.setblocking(False)
+        own = f'{os.getpid()}.sock'
+        try:
+            names = os.listdir(self.fanout_dir)
+        except OSError:
+            return
+        for name in names:
+            if name == own or not name.endswith('.sock'):
+                continue
+            path = os.path.join(self.fanout_dir, name)
+            try:
+                self._send_sock.sendto(packet, path)
+            except (ConnectionRefusedError, FileNotFoundError):
+                # Worker is gone; nobody will bind this path again
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass
+            except (BlockingIOError, OSError) as e:
+                # Receiver backlog full or packet too large: drop, clients resync on reconnect
+                logger.debug(f"Event fan-out to {name} dropped: {e}")
+
+    # -- SSE -------------------------------------------------------------------
+
+    def stream(self, sub: Subscription):
+        """Generator of SSE frames for one subscription; unsubscribes on exit."""
+        try:
+            yield f'retry: 3000\n: subscribed {",".join(sorted(t.partition("/")[2] for t in sub.topics))}\n\n'
+            while True:
+                try:
+                    message = sub.queue.get(timeout=self.heartbeat)
+                except queue.Empty:
+                    yield ': ping\n\n'
+                    continue
+                yield message
+                if sub.overflowed:
+                    yield 'event: resync\ndata: {}\n\n'
+                    return
+        finally:
+            self.unsubscribe(sub)
+
+
+bus = EventBus()
+
+
+def subject_topic(subject_id) -> str:
+    return f'subject:{subject_id}'
+
+
+def class_topic(class_name) -> str:
+    return f'class:{class_name}'
+
+
+def grade_event(grade, class_name=None) -> dict:
+    return {
+        'id': grade.id,
+        'student_id': grade.student_id,
+        'subject_id': grade.subject_id,
+        'term': grade.term,
+        'tugas': grade.tugas,
+        'uts': grade.uts,
+        'uas': grade.uas,
+        'final': grade.final_score,
+        'class_name': class_name,
+    }
+
+
+def publish_grade(grade, class_name=None, op: str = 'upsert'):
+    topics = [subject_topic(grade.subject_id)]
+    if class_name:
+        topics.append(class_topic(class_name))
+    bus.publish('grade', {'op': op, **grade_event(grade, class_name)}, topics)
@@ -0,0 +1,133 @@
+"""Sync a whole gradebook sheet of one subject and term, writing only what changed.
+
+A sheet is a list of ``{nis, tugas, uts, uas}`` rows. One query loads the
+students named in the sheet together with every current grade of the
+subject and term; each row's fingerprint (its rounded scores) is compared
+with the stored one and only new or changed rows are written, as a single
+upsert in the caller's transaction. Re-uploading an unchanged sheet costs
+one SELECT and no writes.
+"""
+from collections import Counter
+from datetime import datetime
+from sqlalchemy import and_, delete, or_, select
+
+from siakad_app.extensions import db
+from siakad_app.models import Grade, Student
+from siakad_app.utils.audit import audit_event, grade_audit
+from siakad_app.utils.tenancy import current_tenant
+from siakad_app.utils.upsert import upsert
+from siakad_app.utils.validation import GRADE_SHEET_COLUMNS, validate_rows
+from siakad_app.utils.workload import workload_cache
+
+SCORES = ('tugas', 'uts', 'uas')
+_GRADE_COLUMNS = (Grade.id, Grade.tenant_id, Grade.student_id, Grade.subject_id, Grade.term,
+                  Grade.tugas, Grade.uts, Grade.uas)
+
+
+class SheetError(ValueError):
+    """The sheet cannot be applied; ``details`` lists the offending rows or NIS."""
+
+    def __init__(self, message: str, details=None):
+        super().__init__(message)
+        self.details = details
+
+
+def _fingerprint(tugas, uts, uas):
+    return round(float(tugas), 2), round(float(uts), 2), round(float(uas), 2)
+
+
+def _current(subject_id: int, term: str, nis):
+    """{nis: (student_id, grade row or None)} for the sheet's students and every graded student."""
+    stmt = (
+        select(Student.nis, Student.id.label('sid'), *_GRADE_COLUMNS)
+        .outerjoin(Grade, and_(Grade.student_id == Student.id, Grade.subject_id == subject_id, Grade.term == term))
+        .where(or_(Student.nis.in_(nis), Grade.id.is_not(None)))
+    )
+    return {row.nis: (row.sid, row if row.id is not None else None) for row in db.session.execute(stmt)}
+
+
+def diff_sheet(subject_id: int, term: str, rows, delete_missing: bool = False):
+    """Validate ``rows`` and compare them with the stored grades.
+
+    Returns (changes, unchanged count) where each change is
+    ``{nis, student_id, op, before, after, grade}``, op being create, update
+    or delete. Raises SheetError for invalid rows, duplicate or unknown NIS.
+    """
+    values, errors = validate_rows(rows, GRADE_SHEET_COLUMNS)
+    if errors:
+        raise SheetError('Validation error', errors)
+    nis = [v['nis'] for v in values]
+    if len(set(nis)) != len(nis):
+        raise SheetError('NIS ganda di dalam rows', sorted(n for n, k in Counter(nis).items() if k > 1)[:100])
+
+    current = _current(subject_id, term, nis)
+    unknown = [n for n in nis if n not in current]
+    if unknown:
+        raise SheetError('NIS tidak ditemukan', unknown[:100])
+
+    changes, unchanged = [], 0
+    for v in values:
+        student_id, grade = current[v['nis']]
+        after = _fingerprint(v['tugas'], v['uts'], v['uas'])
+        before = _fingerprint(grade.tugas, grade.uts, grade.uas) if grade is not None else None
+        if before == after:
+            unchanged += 1
+            continue
+        changes.append({'nis': v['nis'], 'student_id': student_id, 'op': 'update' if grade else 'create',
+                        'before': before, 'after': after, 'grade': grade})
+    if delete_missing:
+        listed = set(nis)
+        for n, (student_id, grade) in current.items():
+            if grade is not None and n not in listed:
+                changes.append({'nis': n, 'student_id': student_id, 'op': 'delete',
+                                'before': _fingerprint(grade.tugas, grade.uts, grade.uas), 'after': None,
+                                'grade': grade})
+    return changes, unchanged
+
+
+def apply_changes(subject_id: int, term: str, changes) -> None:
+    """Write ``changes`` from ``diff_sheet`` in the current transaction and record their history."""
+    writes = [c for c in changes if c['op'] != 'delete']
+    deletes = [c for c in changes if c['op'] == 'delete']
+    events = []
+    if writes:
+        now = datetime.utcnow()
+        upsert(Grade.__table__, [
+            {'student_id': c['student_id'], 'subject_id': subject_id, 'term': term, 'tenant_id': current_tenant(),
+             'updated_at': now, **dict(zip(SCORES, c['after']))} for c in writes
+        ], keys=('student_id', 'subject_id', 'term'), update=(*SCORES, 'updated_at'))
+        # New ids for the history rows
+        written = {row.student_id: row for row in db.session.execute(
+            select(*_GRADE_COLUMNS).where(Grade.subject_id == subject_id, Grade.term == term,
+                                          Grade.student_id.in_([c['student_id'] for c in writes])))}
+        for c in writes:
+            prev = dict(zip(SCORES, c['before'])) if c['before'] else None
+            events.append(audit_event(written[c['student_id']], 'UPDATE' if prev else 'CREATE', prev))
+    if deletes:
+        db.session.execute(delete(Grade.__table__).where(Grade.id.in_([c['grade'].id for c in deletes])))
+        events.extend(audit_event(c['grade'], 'DELETE', dict(zip(SCORES, c['before']))) for c in deletes)
+    if events:
+        grade_audit.record(events)
+        workload_cache.touch(subject_id)
+
+
+def summarize(subject_id: int, term: str, rows: int, changes, unchanged: int, applied: bool) -> dict:
+    counts = {'create': 0, 'update': 0, 'delete': 0}
+    for c in changes:
+        counts[c['op']] += 1
+    return {
+        'subject_id': subject_id,
+        'term': term,
+        'applied': applied,
+        'rows': rows,
+        'created': counts['create'],
+        'updated': counts['update'],
+        'deleted': counts['delete'],
+        'unchanged': unchanged,
+        'changes': [
+            {'nis': c['nis'], 'student_id': c['student_id'], 'op': c['op'],
+             'before': dict(zip(SCORES, c['before'])) if c['before'] else None,
+             'after': dict(zip(SCORES, c['after'])) if c['after'] else None}
+            for c in changes
+        ],
+    }
@@ -0,0 +1,190 @@
+"""Liveness and readiness state of this worker for ``/healthz`` and ``/readyz``.
+
+Readiness combines the time to check a connection out of the pool (plus a
+``SELECT 1``), the grade audit backlog and the share of 5xx responses over
+the last ``READY_ERROR_WINDOW`` seconds. The result is cached for
+``READY_CACHE_SECONDS`` so frequent load balancer probes from several
+balancers cost one database round trip per window and never queue behind
+each other. Code can also take the
+worker out of rotation explicitly with ``mark_not_ready``. The admission
+gates do this for a few seconds when they shed more than
+``READY_MAX_SHED_RATE`` of the requests over the last ``READY_SHED_WINDOW``
+seconds; a single rejected burst does not take the worker out.
+"""
+import logging
+import threading
+import time
+from flask import g, has_request_context, request
+
+from siakad_app.extensions import db
+
+logger = logging.getLogger(__name__)
+
+# A failing /readyz must not count towards the error rate that fails it
+_PROBES = {'health.healthz', 'health.readyz'}
+
+
+class ErrorWindow:
+    """Request and failure (5xx, shed) counts per second over a sliding window."""
+
+    def __init__(self, seconds: int = 60):
+        self.seconds = seconds
+        self._buckets = [(0, 0, 0)] * seconds  # (second, requests, errors)
+        self._lock = threading.Lock()
+
+    def record(self, error: bool):
+        now = int(time.time())
+        i = now % self.seconds
+        with self._lock:
+            second, requests, errors = self._buckets[i]
+            if second != now:
+                requests = errors = 0
+            self._buckets[i] = (now, requests + 1, errors + (1 if error else 0))
+
+    def totals(self):
+        cutoff = int(time.time()) - self.seconds
+        with self._lock:
+            buckets = list(self._buckets)
+        requests = sum(r for s, r, _ in buckets if s > cutoff)
+        errors = sum(e for s, _, e in buckets if s > cutoff)
+        return requests, errors
+
+
+class HealthMonitor:
+    def __init__(self):
+        self.max_checkout_ms = 500.0
+        self.max_pending = 8000
+        self.max_error_rate = 0.5
+        self.min_requests = 20
+        self.cache_seconds = 2.0
+        self.overload_cooldown = 5.0
+        self.max_shed_rate = 0.2
+        self.errors = ErrorWindow()
+        self.sheds = ErrorWindow(10)
+        self._cached = None
+        self._cached_at = 0.0
+        self._not_ready = None  # (reason, until or None)
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.max_checkout_ms = app.config.get('READY_MAX_CHECKOUT_MS', 500.0)
+        self.max_pending = app.config.get('READY_MAX_PENDING', 8000)
+        self.max_error_rate = app.config.get('READY_MAX_ERROR_RATE', 0.5)
+        self.min_requests = app.config.get('READY_MIN_REQUESTS', 20)
+        self.cache_seconds = app.config.get('READY_CACHE_SECONDS', 2.0)
+        self.overload_cooldown = app.config.get('READY_OVERLOAD_COOLDOWN', 5.0)
+        self.max_shed_rate = app.config.get('READY_MAX_SHED_RATE', 0.2)
+        self.errors = ErrorWindow(app.config.get('READY_ERROR_WINDOW', 60))
+        self.sheds = ErrorWindow(app.config.get('READY_SHED_WINDOW', 10))
+        app.after_request(self._after_request)
+
+    def _after_request(self, response):
+        if request.endpoint in _PROBES:
+            return response
+        self.errors.record(response.status_code >= 500)
+        reason = g.pop('admission_rejected', None)
+        self.sheds.record(reason is not None)
+        if reason is not None:
+            self._check_overload(reason)
+        return response
+
+    # -- explicit state ------------------------------------------------------
+
+    def mark_not_ready(self, reason: str, seconds: float = None):
+        """Fail readiness until ``mark_ready`` or, when given, for ``seconds``."""
+        until = time.monotonic() + seconds if seconds else None
+        if self._not_ready is None:
+            logger.warning(f"Worker marked not ready: {reason}")
+        self._not_ready = (reason, until)
+        self._cached = None
+
+    def overloaded(self, reason: str):
+        """Count a request shed by an admission gate; checked against the shed rate after the response."""
+        if has_request_context():
+            g.admission_rejected = reason
+
+    def _check_overload(self, reason: str):
+        """Leave the rotation for ``READY_OVERLOAD_COOLDOWN`` seconds (0 disables) when shedding is sustained."""
+        if not self.overload_cooldown:
+            return
+        requests, sheds = self.sheds.totals()
+        if requests >= self.min_requests and sheds / requests > self.max_shed_rate:
+            self.mark_not_ready(f'overloaded: {reason}', self.overload_cooldown)
+
+    def mark_ready(self):
+        self._not_ready = None
+        self._cached = None
+
+    def _forced_reason(self):
+        state = self._not_ready
+        if state is None:
+            return None
+        reason, until = state
+        if until is not None and time.monotonic() >= until:
+            self._not_ready = None
+            return None
+        return reason
+
+    def retry_after(self) -> float:
+        """Seconds until readiness may change: end of a timed mark or of the cache window."""
+        state = self._not_ready
+        if state is not None and state[1] is not None:
+            return state[1] - time.monotonic()
+        return self.cache_seconds
+
+    # -- checks ----------------------------------------------------------------
+
+    def _check_database(self) -> dict:
+        started = time.perf_counter()
+        try:
+            with db.engine.connect() as conn:
+                checkout = (time.perf_counter() - started) * 1000
+                conn.exec_driver_sql('SELECT 1')
+        except Exception as e:
+            return {'ok': False, 'error': type(e).__name__}
+        total = (time.perf_counter() - started) * 1000
+        return {'ok': checkout <= self.max_checkout_ms, 'checkout_ms': round(checkout, 1),
+                'query_ms': round(total - checkout, 1), 'pool': db.engine.pool.status()}
+
+    def _check_queue(self) -> dict:
+        from siakad_app.utils.audit import grade_audit
+        pending = grade_audit.pending()
+        return {'ok': pending <= self.max_pending, 'pending': pending}
+
+    def _check_errors(self) -> dict:
+        requests, errors = self.errors.totals()
+        rate = errors / requests if requests else 0.0
+        ok = requests < self.min_requests or rate <= self.max_error_rate
+        return {'ok': ok, 'requests': requests, 'errors': errors, 'rate': round(rate, 3)}
+
+    def readiness(self):
+        """Return (ready, report); the checks run at most once per cache window."""
+        forced = self._forced_reason()
+        if forced is not None:
+            return False, {'status': 'not ready', 'reason': forced}
+        now = time.monotonic()
+        cached = self._cached
+        if cached is not None and now - self._cached_at < self.cache_seconds:
+            return cached
+        with self._lock:
+            if self._cached is not None and now - self._cached_at < self.cache_seconds:
+                return self._cached
+            checks = {'database': self._check_database(), 'queue': self._check_queue(),
+                      'errors': self._check_errors()}
+            ready = all(c['ok'] for c in checks.values())
+            report = {'status': 'ready' if ready else 'not ready', 'checks': checks}
+            if not ready:
+                report['reason'] = ', '.join(name for name, c in checks.items() if not c['ok'])
+            self._cached, self._cached_at = (ready, report), time.monotonic()
+            return self._cached
+
+
+health = HealthMonitor()
+
+
+def mark_not_ready(reason: str, seconds: float = None):
+    health.mark_not_ready(reason, seconds)
+
+
+def mark_ready():
+    health.mark_ready()
@@ -0,0 +1,204 @@
+"""Capture the SELECTs each blueprint issues and EXPLAIN them for missing indexes.
+
+Used by ``manage.py index-advisor``. Every GET route is exercised through the
+Flask test client while a cursor listener records the statements, then each
+distinct statement is explained on the live database (SQLite ``EXPLAIN QUERY
+PLAN`` or MySQL ``EXPLAIN``). Plans are only meaningful on realistic data
+volumes: small tables make full scans look free.
+"""
+import re
+from collections import OrderedDict
+from flask import has_request_context, request
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event, inspect
+
+from siakad_app.extensions import db
+from siakad_app.models import Grade, Student, Subject, Teacher, User
+
+_SELECT_RE = re.compile(r'^\s*SELECT\b', re.IGNORECASE)
+_WHERE_RE = re.compile(r'\bWHERE\b(.*?)(?:\bGROUP BY\b|\bORDER BY\b|\bLIMIT\b|$)', re.IGNORECASE | re.DOTALL)
+_ORDER_RE = re.compile(r'\bORDER BY\b(.*?)(?:\bLIMIT\b|$)', re.IGNORECASE | re.DOTALL)
+_PREDICATE_SPLIT_RE = re.compile(r'\bAND\b|\bOR\b', re.IGNORECASE)
+_COL_RE = re.compile(r'(\w+)\.(\w+)')
+_LIKE_RE = re.compile(r'\bLIKE\b', re.IGNORECASE)
+
+# Extra query strings so filtered variants of listing endpoints are captured too
+_SAMPLE_ARGS = {
+    'students.list_students': lambda s: {'class_name': s['class_name']},
+    'grades.class_report': lambda s: {'class_name': s['class_name']},
+    'grades.list_grade_history': lambda s: {'student_id': s['student_id']},
+}
+
+_PATH_ARGS = {
+    'student_id': 'student_id',
+    'subject_id': 'subject_id',
+    'teacher_id': 'teacher_id',
+    'grade_id': 'grade_id',
+}
+
+
+class QueryCapture:
+    """Records SELECT statements per request endpoint while installed."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.queries = OrderedDict()  # (endpoint, statement) -> parameters
+
+    def __enter__(self):
+        event.listen(self.engine, 'before_cursor_execute', self._capture)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, 'before_cursor_execute', self._capture)
+
+    def _capture(self, conn, cursor, statement, parameters, context, executemany):
+        if executemany or not has_request_context() or not _SELECT_RE.match(statement):
+            return
+        self.queries.setdefault((request.endpoint, statement), parameters)
+
+
+def _samples():
+    first_student = Student.query.order_by(Student.id).first()
+    return {
+        'student_id': first_student.id if first_student else 1,
+        'class_name': first_student.class_name if first_student else '7A',
+        'subject_id': db.session.query(Subject.id).order_by(Subject.id).limit(1).scalar() or 1,
+        'teacher_id': db.session.query(Teacher.id).order_by(Teacher.id).limit(1).scalar() or 1,
+        'grade_id': db.session.query(Grade.id).order_by(Grade.id).limit(1).scalar() or 1,
+    }
+
+
+def _tokens():
+    tokens = []
+    for role in ('ADMIN', 'TEACHER', 'STUDENT'):
+        user = User.query.filter_by(role=role).order_by(User.id).first()
+        if user:
+            claims = {'role': user.role, 'student_id': user.student_id, 'teacher_id': user.teacher_id,
+                      'tenant': user.tenant_id}
+            tokens.append(create_access_token(identity=user.id, additional_claims=claims))
+    return tokens
+
+
+def exercise_routes(app, capture: QueryCapture):
+    """Call every GET route with sample ids, trying each role until one is allowed.
+
+    Runs as the current tenant: sample ids and users are that school's.
+    """
+    samples = _samples()
+    tokens = _tokens()
+    if not tokens:
+        raise ValueError('Tidak ada user; buat admin terlebih dahulu (create-admin)')
+    client = app.test_client()
+    visited = []
+    for rule in sorted(app.url_map.iter_rules(), key=lambda r: r.rule):
+        if 'GET' not in rule.methods or rule.endpoint in ('static', 'index_page'):
+            continue
+        if any(arg not in _PATH_ARGS for arg in rule.arguments):
+            continue
+        path = rule.build({arg: samples[_PATH_ARGS[arg]] for arg in rule.arguments}, append_unknown=False)[1]
+        variants = [{}]
+        if rule.endpoint in _SAMPLE_ARGS:
+            variants.append(_SAMPLE_ARGS[rule.endpoint](samples))
+        for query in variants:
+            for token in tokens:
+                resp = client.get(path, query_string=query, headers={'Authorization': f'Bearer {token}'})
+                if resp.status_code not in (401, 403):
+                    visited.append((rule.endpoint, path, query, resp.status_code))
+                    break
+    db.session.remove()
+    return visited
+
+
+def _explain(conn, statement, parameters):
+    dialect = conn.dialect.name
+    if dialect == 'sqlite':
+        rows = conn.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters).fetchall()
+        return [row[-1] for row in rows]
+    if dialect == 'mysql':
+        result = conn.exec_driver_sql('EXPLAIN ' + statement, parameters)
+        keys = list(result.keys())
+        return [dict(zip(keys, row)) for row in result.fetchall()]
+    raise ValueError(f'EXPLAIN untuk dialect {dialect} belum didukung')
+
+
+def _problems(dialect, plan):
+    """Return (table, issue) pairs for full scans and sorts without an index."""
+    problems = []
+    for step in plan:
+        if dialect == 'sqlite':
+            m = re.match(r'SCAN (\w+)(.*)', step)
+            if m and 'USING' not in m.group(2).upper():
+                problems.append((m.group(1), 'full scan'))
+            if 'USE TEMP B-TREE FOR ORDER BY' in step:
+                problems.append((None, 'sort without index'))
+        else:
+            extra = (step.get('Extra') or '')
+            if step.get('type') == 'ALL':
+                problems.append((step.get('table'), 'full scan'))
+            if 'Using filesort' in extra:
+                problems.append((step.get('table'), 'sort without index'))
+    return problems
+
+
+def _suggest(statement, table, existing):
+    """Equality/IN columns first, then ORDER BY columns, for ``table``."""
+    where = _WHERE_RE.search(statement)
+    order = _ORDER_RE.search(statement)
+    cols = []
+    if where:
+        for predicate in _PREDICATE_SPLIT_RE.split(where.group(1)):
+            if not _LIKE_RE.search(predicate):
+                cols += [c for t, c in _COL_RE.findall(predicate) if t == table]
+    if order:
+        cols += [c for t, c in _COL_RE.findall(order.group(1)) if t == table]
+    cols = list(OrderedDict.fromkeys(c for c in cols if c != 'id'))
+    if not cols:
+        return None
+    for index_cols in existing.get(table, []):
+        if index_cols[:len(cols)] == cols:
+            return None
+    return tuple(cols)
+
+
+def analyze(capture: QueryCapture):
+    """EXPLAIN every captured statement; returns (findings, suggested indexes)."""
+    insp = inspect(db.engine)
+    existing = {}
+    for table in insp.get_table_names():
+        idx = [i['column_names'] for i in insp.get_indexes(table)]
+        idx += [u['column_names'] for u in insp.get_unique_constraints(table)]
+        existing[table] = idx
+
+    findings, suggestions = [], OrderedDict()
+    with db.engine.connect() as conn:
+        for (endpoint, statement), parameters in capture.queries.items():
+            plan = _explain(conn, statement, parameters)
+            problems = _problems(conn.dialect.name, plan)
+            if not problems:
+                continue
+            notes = []
+            for table, issue in problems:
+                cols = _suggest(statement, table, existing) if table else None
+                if cols:
+                    suggestions.setdefault((table, cols), set()).add(endpoint)
+                    notes.append(f"{issue} on {table}: index ({', '.join(cols)})")
+                elif table and _LIKE_RE.search(statement):
+                    notes.append(f"{issue} on {table}: LIKE '%...%' search, no B-tree index can help")
+                elif table and not _WHERE_RE.search(statement):
+                    notes.append(f"{issue} on {table}: query reads the whole table (no WHERE)")
+                else:
+                    notes.append(f"{issue}{' on ' + table if table else ''}")
+            findings.append({'endpoint': endpoint, 'statement': ' '.join(statement.split()),
+                             'plan': plan, 'notes': notes})
+
+    # (class_name) is served by (class_name, name): keep only the longest prefix chain
+    for table, cols in list(suggestions):
+        if any(t == table and len(other) > len(cols) and other[:len(cols)] == cols for t, other in suggestions):
+            endpoints = suggestions.pop((table, cols))
+            longer = next(k for k in suggestions if k[0] == table and k[1][:len(cols)] == cols)
+            suggestions[longer] |= endpoints
+    return findings, suggestions
+
+
+def create_index_sql(table, cols):
+    return f"CREATE INDEX ix_{table}_{'_'.join(cols)} ON {table} ({', '.join(cols)});"
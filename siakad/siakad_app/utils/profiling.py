@@ -0,0 +1,204 @@
+"""On-demand profiling that is safe to leave enabled in production.
+
+Two tools, both restricted to admins and both per worker:
+
+* Per-request cProfile: an ADMIN request carrying ``X-Profile: 1`` runs
+  under ``cProfile``; the response gets an ``X-Profile-Id`` header and the
+  stats can be fetched from ``/profiling/requests/<id>`` as a text report or
+  a binary pstats dump (``python -m pstats``, snakeviz). The last
+  ``PROFILE_KEEP`` profiles are kept.
+* Sampling profiler: a daemon thread snapshots the stacks of every thread
+  each ``interval`` seconds for at most ``PROFILE_MAX_SECONDS`` and
+  aggregates them as collapsed stacks (``frame;frame;frame count``), the
+  input format of flamegraph.pl and speedscope.
+
+Nothing runs unless asked for: requests without the header only pay for one
+header lookup, and at most one sampler runs per worker.
+"""
+import cProfile
+import io
+import itertools
+import logging
+import marshal
+import pstats
+import sys
+import threading
+import time
+from collections import Counter, deque
+from flask import make_response
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = 'X-Profile'
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    module = frame.f_globals.get('__name__', '?')
+    return f"{module}:{getattr(code, 'co_qualname', code.co_name)}"
+
+
+def _collapse(frame) -> str:
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    return ';'.join(reversed(labels))
+
+
+class _Snapshot:
+    # pstats.Stats loads (and then empties) anything with ``create_stats``; hand it a copy
+    def __init__(self, stats: dict):
+        self.stats = dict(stats)
+
+    def create_stats(self):
+        pass
+
+
+class RequestProfile:
+    def __init__(self, profile_id: int, endpoint: str, method: str, path: str, status: int,
+                 duration: float, profile: cProfile.Profile):
+        self.id = profile_id
+        self.endpoint = endpoint
+        self.method = method
+        self.path = path
+        self.status = status
+        self.duration = duration
+        self.created_at = time.time()
+        profile.create_stats()
+        self.stats = profile.stats
+
+    def to_dict(self):
+        return {'id': self.id, 'endpoint': self.endpoint, 'method': self.method, 'path': self.path,
+                'status': self.status, 'duration_ms': round(self.duration * 1000, 1),
+                'created_at': self.created_at}
+
+    def report(self, sort: str = 'cumulative', limit: int = 60) -> str:
+        out = io.StringIO()
+        stats = pstats.Stats(_Snapshot(self.stats), stream=out)
+        stats.strip_dirs().sort_stats(sort).print_stats(limit)
+        return out.getvalue()
+
+    def dump(self) -> bytes:
+        # Same format as cProfile's -o output
+        return marshal.dumps(self.stats)
+
+
+class Sampler:
+    """Stack sampler over all threads, aggregated as collapsed stacks."""
+
+    def __init__(self, seconds: float, interval: float):
+        self.seconds = seconds
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self.started_at = time.time()
+        self.finished_at = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='profiling-sampler', daemon=True)
+
+    @property
+    def running(self) -> bool:
+        return self.finished_at is None
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        own = threading.get_ident()
+        deadline = time.monotonic() + self.seconds
+        try:
+            while not self._stop.is_set() and time.monotonic() < deadline:
+                for ident, frame in sys._current_frames().items():
+                    if ident != own:
+                        self.stacks[_collapse(frame)] += 1
+                self.samples += 1
+                self._stop.wait(self.interval)
+        finally:
+            self.finished_at = time.time()
+
+    def collapsed(self) -> str:
+        return ''.join(f'{stack} {count}\n' for stack, count in self.stacks.most_common())
+
+    def to_dict(self):
+        return {'running': self.running, 'seconds': self.seconds, 'interval': self.interval,
+                'samples': self.samples, 'stacks': len(self.stacks),
+                'started_at': self.started_at, 'finished_at': self.finished_at}
+
+
+class Profiler:
+    def __init__(self):
+        self.enabled = True
+        self.keep = 20
+        self.max_seconds = 60.0
+        self.interval = 0.01
+        self.min_interval = 0.001
+        self.profiles = deque(maxlen=self.keep)
+        self.sampler = None
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.enabled = app.config.get('PROFILING_ENABLED', True)
+        self.keep = app.config.get('PROFILE_KEEP', 20)
+        self.max_seconds = app.config.get('PROFILE_MAX_SECONDS', 60.0)
+        self.interval = app.config.get('PROFILE_SAMPLE_INTERVAL', 0.01)
+        self.profiles = deque(maxlen=self.keep)
+
+    # -- per-request cProfile ------------------------------------------------
+
+    def wants_profile(self, request) -> bool:
+        return self.enabled and request.headers.get(PROFILE_HEADER, '').lower() in ('1', 'true', 'yes')
+
+    def profile_request(self, request, fn, *args, **kwargs):
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError as e:
+            # Another profiler is active in this thread; serve the request unprofiled
+            logger.warning(f"Request profiling skipped: {e}")
+            return fn(*args, **kwargs)
+        started = time.perf_counter()
+        try:
+            response = make_response(fn(*args, **kwargs))
+        finally:
+            profile.disable()
+        duration = time.perf_counter() - started
+        entry = RequestProfile(next(self._ids), request.endpoint, request.method, request.path,
+                               response.status_code, duration, profile)
+        with self._lock:
+            self.profiles.append(entry)
+        logger.info(f"Request profiled: id={entry.id} {request.method} {request.path} {duration * 1000:.1f}ms")
+        response.headers['X-Profile-Id'] = str(entry.id)
+        return response
+
+    def get_profile(self, profile_id: int):
+        with self._lock:
+            return next((p for p in self.profiles if p.id == profile_id), None)
+
+    # -- sampling --------------------------------------------------------------
+
+    def start_sampler(self, seconds: float, interval: float = None) -> Sampler:
+        """Start sampling this worker; raises RuntimeError when a sampler is already running."""
+        seconds = min(max(float(seconds), 0.1), self.max_seconds)
+        interval = max(float(interval or self.interval), self.min_interval)
+        with self._lock:
+            if self.sampler is not None and self.sampler.running:
+                raise RuntimeError('Sampler sedang berjalan')
+            self.sampler = Sampler(seconds, interval)
+            self.sampler.start()
+        logger.info(f"Sampling profiler started: {seconds}s every {interval * 1000:.1f}ms")
+        return self.sampler
+
+    def stop_sampler(self):
+        sampler = self.sampler
+        if sampler is not None and sampler.running:
+            sampler.stop()
+        return sampler
+
+
+profiler = Profiler()
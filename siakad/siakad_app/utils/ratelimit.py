@@ -0,0 +1,232 @@
+import logging
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache, wraps
+from flask import Response, jsonify, request
+
+from siakad_app.utils.health import health
+from siakad_app.utils.tenancy import current_tenant
+
+logger = logging.getLogger(__name__)
+
+_RATE_RE = re.compile(r'^\s*(\d+)\s*/\s*(\d*)\s*(second|minute|hour|day)s?\s*$', re.IGNORECASE)
+_PERIODS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+
+
+@lru_cache(maxsize=128)
+def parse_rate(rate: str):
+    """Parse '30/minute' or '100/5minutes' into (capacity, tokens per second)."""
+    m = _RATE_RE.match(rate or '')
+    if not m:
+        raise ValueError(f"Invalid rate limit '{rate}', expected e.g. '30/minute'")
+    count = int(m.group(1))
+    multiplier = int(m.group(2) or 1)
+    if count <= 0 or multiplier <= 0:
+        raise ValueError(f"Invalid rate limit '{rate}', count and period must be positive")
+    period = multiplier * _PERIODS[m.group(3).lower()]
+    return count, count / period
+
+
+def parse_role_rates(spec: str) -> dict:
+    """Parse 'ADMIN=600/minute,TEACHER=300/minute' into {role: rate}."""
+    rates = {}
+    for part in (spec or '').split(','):
+        if not part.strip():
+            continue
+        role, _, rate = part.partition('=')
+        parse_rate(rate)
+        rates[role.strip().upper()] = rate.strip()
+    return rates
+
+
+def too_many_requests(retry_after: float):
+    seconds = max(1, math.ceil(retry_after))
+    return jsonify({'error': 'Too many requests', 'retry_after': seconds}), 429, {'Retry-After': str(seconds)}
+
+
+class MemoryBackend:
+    """Per-worker token buckets in a bounded LRU dict."""
+
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key: str, capacity: int, refill: float, now: float):
+        with self._lock:
+            tokens, last = self._buckets.pop(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - last) * refill)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return allowed, 0.0 if allowed else (1 - tokens) / refill
+
+
+class SQLiteBackend:
+    """Token buckets in a local SQLite file, shared by all workers on one host."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._connect().execute('CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, tokens REAL, ts REAL)')
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=1.0, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=OFF')
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def take(self, key: str, capacity: int, refill: float, now: float):
+        conn = self._connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            row = conn.execute('SELECT tokens, ts FROM buckets WHERE key = ?', (key,)).fetchone()
+            tokens, last = row if row else (capacity, now)
+            tokens = min(capacity, tokens + (now - last) * refill)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            conn.execute('INSERT OR REPLACE INTO buckets (key, tokens, ts) VALUES (?, ?, ?)', (key, tokens, now))
+            conn.execute('COMMIT')
+        except sqlite3.Error as e:
+            # Fail open: a broken limiter store must not take the API down
+            logger.warning(f"Rate limit store unavailable: {e}")
+            try:
+                conn.execute('ROLLBACK')
+            except sqlite3.Error:
+                pass
+            return True, 0.0
+        return allowed, 0.0 if allowed else (1 - tokens) / refill
+
+
+class AdmissionGate:
+    """Caps concurrent executions of an endpoint; excess requests queue briefly, then get 429."""
+
+    def __init__(self, name: str, max_concurrent: int, queue_timeout: float):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.queue_timeout = queue_timeout
+        self._sem = threading.BoundedSemaphore(max_concurrent)
+        self._lock = threading.Lock()
+        self.active = 0
+        self.waiting = 0
+        self.rejected = 0
+
+    def acquire(self) -> bool:
+        with self._lock:
+            self.waiting += 1
+        acquired = self._sem.acquire(timeout=self.queue_timeout)
+        with self._lock:
+            self.waiting -= 1
+            if acquired:
+                self.active += 1
+            else:
+                self.rejected += 1
+        return acquired
+
+    def release(self):
+        with self._lock:
+            self.active -= 1
+        self._sem.release()
+
+
+class RateLimiter:
+    def __init__(self):
+        self.enabled = False
+        self.backend = None
+        self.role_rates = {}
+        self.queue_timeout = 2.0
+        self.gates = {}
+
+    def init_app(self, app):
+        self.enabled = app.config.get('RATELIMIT_ENABLED', True)
+        storage = app.config.get('RATELIMIT_STORAGE_URL') or 'memory://'
+        if storage.startswith('sqlite:///'):
+            self.backend = SQLiteBackend(storage[len('sqlite:///'):])
+        elif storage == 'memory://':
+            self.backend = MemoryBackend()
+        else:
+            raise ValueError(f"Unsupported RATELIMIT_STORAGE_URL '{storage}'")
+        self.role_rates = parse_role_rates(app.config.get('RATELIMIT_ROLE_DEFAULTS', ''))
+        self.queue_timeout = app.config.get('RATELIMIT_QUEUE_TIMEOUT', 2.0)
+
+    def hit(self, scope: str, key: str, rate: str):
+        """Take one token; returns seconds to wait when the bucket is empty, else None."""
+        if not self.enabled or not rate:
+            return None
+        capacity, refill = parse_rate(rate)
+        allowed, retry_after = self.backend.take(f'{scope}:{key}', capacity, refill, time.time())
+        if allowed:
+            return None
+        logger.info(f"Rate limited: scope={scope} key={key} rate={rate}")
+        return retry_after
+
+    def check_role(self, endpoint: str, role: str, identity, rate=None):
+        """Apply the role-wide default limit and the endpoint limit for this role.
+
+        Buckets are per tenant: user ids repeat across tenant databases.
+        """
+        key = f'{current_tenant()}:{role}:{identity}'
+        retry = self.hit('role', key, self.role_rates.get(role))
+        if retry is None and rate:
+            endpoint_rate = rate.get(role) if isinstance(rate, dict) else rate
+            retry = self.hit(endpoint, key, endpoint_rate)
+        return retry
+
+    def gate(self, endpoint: str, max_concurrent: int, queue_timeout: float = None) -> AdmissionGate:
+        g = self.gates.get(endpoint)
+        if g is None:
+            timeout = self.queue_timeout if queue_timeout is None else queue_timeout
+            g = self.gates.setdefault(endpoint, AdmissionGate(endpoint, max_concurrent, timeout))
+        return g
+
+
+limiter = RateLimiter()
+
+
+def admit(endpoint: str, max_concurrent: int, queue_timeout: float, fn, *args, **kwargs):
+    if not max_concurrent or not limiter.enabled:
+        return fn(*args, **kwargs)
+    gate = limiter.gate(endpoint, max_concurrent, queue_timeout)
+    if not gate.acquire():
+        logger.warning(f"Admission rejected: {endpoint} at {gate.max_concurrent} concurrent requests")
+        health.overloaded(endpoint)
+        return too_many_requests(gate.queue_timeout or 1)
+    try:
+        rv = fn(*args, **kwargs)
+    except BaseException:
+        gate.release()
+        raise
+    if isinstance(rv, Response) and rv.is_streamed:
+        # The body is rendered while the server sends it; keep the slot until then
+        rv.call_on_close(gate.release)
+    else:
+        gate.release()
+    return rv
+
+
+def rate_limited(rate: str, max_concurrent: int = None, queue_timeout: float = None):
+    """Per-client-IP limit for endpoints without a JWT, such as /auth/login."""
+    parse_rate(rate)
+
+    def wrapper(fn):
+        @wraps(fn)
+        def decorator(*args, **kwargs):
+            endpoint = request.endpoint or fn.__name__
+            retry = limiter.hit(endpoint, request.remote_addr or '-', rate)
+            if retry is not None:
+                return too_many_requests(retry)
+            return admit(endpoint, max_concurrent, queue_timeout, fn, *args, **kwargs)
+        return decorator
+    return wrapper
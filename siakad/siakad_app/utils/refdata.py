@@ -0,0 +1,157 @@
+"""Per-worker, per-school cache of reference data: subjects, teachers and class names.
+
+The tables are small and read on almost every request (id -> code lookups,
+filter dropdowns) but change rarely. A ``RefData`` snapshot is built lazily
+from three queries and never mutated; a write replaces the whole snapshot.
+Commits on this worker that touch subjects, teachers or students (ORM
+writes as well as the bulk endpoints) drop the snapshot immediately; changes
+made by other workers are picked up by a cheap version query (the
+``cache_versions`` counter, row counts and newest ``updated_at``) at most
+every ``REFDATA_TTL`` seconds.
+"""
+import hashlib
+import json
+import threading
+import time
+from collections import namedtuple
+from types import MappingProxyType
+from sqlalchemy import event, func, inspect, select
+
+from siakad_app.extensions import db
+from siakad_app.models import Student, Subject, Teacher
+from siakad_app.utils.tenancy import current_tenant
+from siakad_app.utils.versions import cache_versions, version_of
+
+SubjectRef = namedtuple('SubjectRef', 'id code name sks teacher_id')
+TeacherRef = namedtuple('TeacherRef', 'id nip name')
+
+_TRACKED = (Subject, Teacher, Student)
+_SESSION_KEY = 'refdata_dirty'
+
+
+class RefData:
+    def __init__(self, subjects, teachers, class_names, version):
+        self.subjects = tuple(subjects)
+        self.teachers = tuple(teachers)
+        self.class_names = tuple(class_names)
+        self.version = version
+        self.subjects_by_id = MappingProxyType({s.id: s for s in self.subjects})
+        self.teachers_by_id = MappingProxyType({t.id: t for t in self.teachers})
+        self.subject_codes = MappingProxyType({s.id: s.code for s in self.subjects})
+        # The /reference response is serialized once per snapshot
+        self.body = json.dumps({
+            'subjects': [s._asdict() for s in self.subjects],
+            'teachers': [t._asdict() for t in self.teachers],
+            'class_names': list(self.class_names),
+        }, separators=(',', ':'))
+        self.etag = hashlib.sha1(self.body.encode()).hexdigest()[:16]
+
+
+def owned_subjects(teacher_id) -> tuple:
+    """Subjects taught by ``teacher_id``, read from the database.
+
+    For access checks: a snapshot may lag a reassignment made on another
+    worker by up to ``REFDATA_TTL`` seconds.
+    """
+    if teacher_id is None:
+        return ()
+    return tuple(SubjectRef(*row) for row in db.session.execute(
+        select(Subject.id, Subject.code, Subject.name, Subject.sks, Subject.teacher_id)
+        .where(Subject.teacher_id == teacher_id).order_by(Subject.name)))
+
+
+def _version():
+    # One round trip: the change counter, row counts and newest updated_at of every tracked table
+    row = db.session.execute(select(
+        version_of('refdata'),
+        *[select(func.count(model.id)).scalar_subquery() for model in _TRACKED],
+        *[select(func.max(model.updated_at)).scalar_subquery() for model in _TRACKED],
+    )).one()
+    return tuple(row)
+
+
+def _load(version) -> RefData:
+    subjects = [SubjectRef(*row) for row in db.session.execute(
+        select(Subject.id, Subject.code, Subject.name, Subject.sks, Subject.teacher_id).order_by(Subject.name))]
+    teachers = [TeacherRef(*row) for row in db.session.execute(
+        select(Teacher.id, Teacher.nip, Teacher.name).order_by(Teacher.name))]
+    class_names = db.session.scalars(select(Student.class_name).distinct().order_by(Student.class_name)).all()
+    return RefData(subjects, teachers, class_names, version)
+
+
+def _touches_refdata(obj, deleted=False) -> bool:
+    if isinstance(obj, (Subject, Teacher)):
+        return True
+    if isinstance(obj, Student):
+        # Only the set of class names is cached from students
+        return deleted or inspect(obj).attrs.class_name.history.has_changes()
+    return False
+
+
+cache_versions.track('refdata', _TRACKED, _touches_refdata)
+
+
+class RefDataCache:
+    def __init__(self):
+        self.ttl = 30.0
+        self._entries = {}  # tenant -> (RefData, checked at)
+        self._lock = threading.Lock()
+        self._listening = False
+
+    def init_app(self, app):
+        self.ttl = app.config.get('REFDATA_TTL', 30.0)
+        if not self._listening:
+            event.listen(db.session, 'after_flush', self._after_flush)
+            event.listen(db.session, 'do_orm_execute', self._do_orm_execute)
+            event.listen(db.session, 'after_commit', self._after_commit)
+            event.listen(db.session, 'after_rollback', self._after_rollback)
+            self._listening = True
+
+    def invalidate(self):
+        self._entries.pop(current_tenant(), None)
+
+    def get(self) -> RefData:
+        tenant = current_tenant()
+        now = time.monotonic()
+        entry = self._entries.get(tenant)
+        if entry is not None and now - entry[1] < self.ttl:
+            return entry[0]
+        with self._lock:
+            entry = self._entries.get(tenant)
+            if entry is not None and now - entry[1] < self.ttl:
+                return entry[0]
+            version = _version()
+            data = entry[0] if entry is not None else None
+            if data is None or data.version != version:
+                data = _load(version)
+            self._entries[tenant] = (data, now)
+            return data
+
+    # -- write-path invalidation ---------------------------------------------
+
+    def _after_flush(self, session, flush_context):
+        if session.info.get(_SESSION_KEY):
+            return
+        if (any(_touches_refdata(o) for o in session.new) or any(_touches_refdata(o) for o in session.dirty)
+                or any(_touches_refdata(o, deleted=True) for o in session.deleted)):
+            session.info[_SESSION_KEY] = True
+
+    def _do_orm_execute(self, state):
+        # Bulk INSERT/UPDATE/DELETE statements bypass the unit of work
+        if (state.is_insert or state.is_update or state.is_delete) and state.bind_mapper is not None \
+                and state.bind_mapper.class_ in _TRACKED:
+            state.session.info[_SESSION_KEY] = True
+
+    def _after_commit(self, session):
+        if session.info.pop(_SESSION_KEY, False):
+            self.invalidate()
+
+    def _after_rollback(self, session):
+        session.info.pop(_SESSION_KEY, None)
+
+
+reference_data = RefDataCache()
+
+
+def refdata() -> RefData:
+    return reference_data.get()
@@ -0,0 +1,378 @@
+"""Deterministic load replay of captured traffic.
+
+Four steps, each a ``flask`` command in manage.py:
+
+1. ``replay-prepare`` reads request captures (``utils.request_log`` JSON
+   lines) or WSGI access logs in the combined format and writes one
+   anonymized, time-ordered log. Personal fields (NIS, NIP, names,
+   addresses, phones, class names, subject codes, usernames, searches) are
+   replaced by HMAC pseudonyms, so the same input and salt always give the
+   same output; ids, terms and scores are kept. Access-log lines carry no
+   body or user: reads are replayed as an admin, writes are dropped.
+2. ``replay-seed`` fills an empty database with synthetic students,
+   teachers, subjects, grades and users covering every id, NIS, class and
+   user the log refers to.
+3. ``replay-run`` sends the log to a running instance over HTTP with the
+   original pacing divided by ``speed`` (0: as fast as possible) from at
+   most ``concurrency`` threads, and writes one result line per request.
+4. ``replay-compare`` compares the results of two runs (e.g. two releases
+   against the same seed) per route and flags latency and error
+   regressions.
+"""
+import hashlib
+import hmac
+import json
+import math
+import random
+import re
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+REPLAY_PASSWORD = 'replay-password'
+
+_FIRST = ('Adi', 'Bayu', 'Citra', 'Dewi', 'Eka', 'Fajar', 'Gita', 'Hadi', 'Intan', 'Joko', 'Kartika', 'Lestari',
+          'Made', 'Nur', 'Oki', 'Putri', 'Rina', 'Sari', 'Tono', 'Wulan', 'Yudi', 'Zahra')
+_LAST = ('Pratama', 'Saputra', 'Wijaya', 'Santoso', 'Lestari', 'Hidayat', 'Nugroho', 'Kusuma', 'Siregar',
+         'Halim', 'Rahman', 'Setiawan', 'Utami', 'Permana')
+_ACCESS_RE = re.compile(r'^\S+ \S+ \S+ \[(?P<time>[^\]]+)\] "(?P<method>[A-Z]+) (?P<target>\S+)[^"]*" '
+                        r'(?P<status>\d{3}) \S+(?: "[^"]*" "[^"]*")?(?: (?P<micros>\d+))?')
+_ID_PATHS = (
+    (re.compile(r'^/students/(\d+)'), 'students'),
+    (re.compile(r'^/teachers/(\d+)'), 'teachers'),
+    (re.compile(r'^/subjects/(\d+)'), 'subjects'),
+    (re.compile(r'^/grades/(?:student|transcript)/(\d+)'), 'students'),
+    (re.compile(r'^/grades/subject/(\d+)'), 'subjects'),
+    (re.compile(r'^/grades/(\d+)$'), 'grades'),
+)
+_ID_FIELDS = {'student_id': 'students', 'teacher_id': 'teachers', 'subject_id': 'subjects'}
+_SKIPPED_PATHS = ('/auth/logout', '/auth/refresh', '/auth/users/')
+
+
+def route_of(path: str) -> str:
+    """Path with numeric segments replaced, e.g. /grades/<id>."""
+    return '/'.join('<id>' if part.isdigit() else part for part in path.split('/'))
+
+
+# -- prepare ---------------------------------------------------------------------
+
+
+def read_capture(lines):
+    """Entries from ``utils.request_log`` JSON lines and/or combined-format access log lines."""
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith('{'):
+            yield json.loads(line)
+            continue
+        m = _ACCESS_RE.match(line)
+        if not m:
+            continue
+        target = urlsplit(m['target'])
+        yield {
+            'ts': datetime.strptime(m['time'], '%d/%b/%Y:%H:%M:%S %z').timestamp(),
+            'method': m['method'], 'path': target.path, 'query': target.query, 'status': int(m['status']),
+            'ms': int(m['micros']) / 1000 if m['micros'] else None, 'role': 'ADMIN', 'access_log': True,
+        }
+
+
+class Anonymizer:
+    """HMAC pseudonyms: equal inputs map to equal outputs for one salt."""
+
+    def __init__(self, salt: str):
+        self.salt = salt.encode()
+        self.users = {}  # (tenant, user id) -> synthetic username
+        self._rules = {
+            'nis': lambda v: f'{self._n("nis", v) % 10 ** 10:010d}',
+            'nip': lambda v: f'{self._n("nip", v) % 10 ** 18:018d}',
+            'name': lambda v: self.person(v),
+            'address': lambda v: f'Jl. Replay No. {self._n("address", v) % 200 + 1}',
+            'phone': lambda v: f'08{self._n("phone", v) % 10 ** 10:010d}' if v else v,
+            'parent_phone': lambda v: f'08{self._n("phone", v) % 10 ** 10:010d}' if v else v,
+            'class_name': lambda v: self.class_name(v),
+            'code': lambda v: f'R{self._n("code", v) % 16 ** 5:05X}',
+            'username': lambda v: f'u{self._n("username", v) % 16 ** 8:08x}',
+            'birth_date': lambda v: f'{str(v)[:4]}-01-01',
+            'q': lambda v: _FIRST[self._n('q', v) % len(_FIRST)],
+        }
+
+    def _n(self, kind: str, value) -> int:
+        digest = hmac.new(self.salt, f'{kind}:{value}'.encode(), hashlib.sha256).digest()
+        return int.from_bytes(digest[:8], 'big')
+
+    def person(self, value) -> str:
+        n = self._n('name', value)
+        return f'{_FIRST[n % len(_FIRST)]} {_LAST[(n >> 16) % len(_LAST)]}'
+
+    def class_name(self, value) -> str:
+        return f'K-{self._n("class", value) % 16 ** 4:04X}'
+
+    def user(self, tenant, user_id, role: str) -> str:
+        key = (tenant, user_id)
+        if key not in self.users:
+            count = sum(1 for name in self.users.values() if name.startswith(f'replay-{role.lower()}-'))
+            self.users[key] = f'replay-{role.lower()}-{count + 1}'
+        return self.users[key]
+
+    def value(self, key, value):
+        if isinstance(value, dict):
+            return {k: self.value(k, v) for k, v in value.items()}
+        if isinstance(value, list):
+            return [self.value(key, v) for v in value]
+        rule = self._rules.get(key)
+        return rule(value) if rule is not None and value is not None else value
+
+    def query(self, query: str) -> str:
+        return urlencode([(k, self.value(k, v)) for k, v in parse_qsl(query, keep_blank_values=True)])
+
+
+def prepare(lines, salt: str):
+    """Anonymized entries sorted by time, plus counts of what was dropped."""
+    anon = Anonymizer(salt)
+    entries, dropped = [], defaultdict(int)
+    for e in sorted(read_capture(lines), key=lambda e: e['ts']):
+        login = (e.get('body') or {}).get('username') if e['path'] == '/auth/login' else None
+        writes = e['method'] not in ('GET', 'HEAD')
+        if e['path'].startswith(_SKIPPED_PATHS):
+            dropped['session'] += 1
+            continue
+        if writes and 'body' not in e and e['path'] != '/auth/login':
+            dropped['write without body'] += 1
+            continue
+        out = {'ts': e['ts'], 'method': e['method'], 'path': e['path'], 'query': anon.query(e.get('query') or ''),
+               'status': e['status'], 'ms': e.get('ms'), 'role': e.get('role'),
+               'teacher_id': e.get('teacher_id'), 'student_id': e.get('student_id')}
+        if e.get('access_log'):
+            out['user'] = 'replay-admin-0'
+        elif e.get('user') is not None and e.get('role'):
+            out['user'] = anon.user(e.get('tenant'), e['user'], e['role'])
+        if writes and e['path'] != '/auth/login':
+            out['body'] = anon.value(None, e.get('body'))
+        elif e['path'] == '/auth/login':
+            out['login'] = anon.value('username', login)
+        entries.append(out)
+
+    # Logins are replayed as one of the synthetic users, picked by the original username
+    users = sorted({e['user'] for e in entries if e.get('user')}) or ['replay-admin-0']
+    for e in entries:
+        if e['path'] == '/auth/login':
+            e['role'] = None
+            username = users[anon._n('login', e.pop('login', None)) % len(users)]
+            e['body'] = {'username': username, 'password': REPLAY_PASSWORD}
+    return entries, dict(dropped)
+
+
+# -- seed ------------------------------------------------------------------------
+
+
+def seed_plan(entries, min_students=200, min_teachers=10, min_subjects=12, min_classes=4) -> dict:
+    """What the synthetic data must contain for ``entries`` to find their rows."""
+    top = {'students': min_students, 'teachers': min_teachers, 'subjects': min_subjects, 'grades': 0}
+    classes, nis, users, owned = set(), [], {}, set()
+
+    def visit(key, value, teacher_id):
+        if isinstance(value, dict):
+            for k, v in value.items():
+                visit(k, v, teacher_id)
+        elif isinstance(value, list):
+            for v in value:
+                visit(key, v, teacher_id)
+        elif key in _ID_FIELDS and isinstance(value, int):
+            top[_ID_FIELDS[key]] = max(top[_ID_FIELDS[key]], value)
+            if key == 'subject_id' and teacher_id:
+                owned.add((teacher_id, value))
+        elif key == 'class_name' and value:
+            classes.add(value)
+        elif key == 'nis' and value and value not in nis:
+            nis.append(value)
+
+    for e in entries:
+        teacher_id = e.get('teacher_id') if e.get('role') == 'TEACHER' else None
+        for pattern, kind in _ID_PATHS:
+            m = pattern.match(e['path'])
+            if m:
+                top[kind] = max(top[kind], int(m[1]))
+                if kind == 'subjects' and teacher_id:
+                    owned.add((teacher_id, int(m[1])))
+        visit(None, dict(parse_qsl(e.get('query') or '')), teacher_id)
+        if e['method'] in ('PUT', 'PATCH', 'DELETE') or e['path'].endswith('/sync'):
+            visit(None, e.get('body'), teacher_id)  # rows that must already exist
+        else:
+            visit(None, {k: v for k, v in (e.get('body') or {}).items()
+                         if k in ('student_id', 'subject_id', 'class_name')}, teacher_id)
+        for key in ('teacher_id', 'student_id'):
+            if e.get(key):
+                top[_ID_FIELDS[key]] = max(top[_ID_FIELDS[key]], e[key])
+        if e.get('user'):
+            users[e['user']] = (e.get('role') or 'ADMIN', e.get('teacher_id'), e.get('student_id'))
+    users.setdefault('replay-admin-0', ('ADMIN', None, None))
+    while len(classes) < min_classes:
+        classes.add(f'K-S{len(classes):02d}')
+    top['students'] = max(top['students'], len(nis))
+    return {**top, 'classes': sorted(classes), 'nis': nis, 'users': users, 'owned': sorted(owned)}
+
+
+def seed(plan: dict, term: str, density: float = 0.8, seed: int = 1) -> dict:
+    """Insert the synthetic rows of ``plan`` into the current tenant; returns row counts.
+
+    Rows get the plan's explicit ids, which are unique per table rather than
+    per tenant, so the tenant's database must be empty for every tenant.
+    """
+    from sqlalchemy import func, insert, select
+    from siakad_app.extensions import bcrypt, db
+    from siakad_app.models import Grade, Student, Subject, Teacher, User
+
+    if any(db.session.scalar(select(func.count(m.id)).execution_options(all_tenants=True))
+           for m in (Student, Teacher, Subject, User)):
+        raise ValueError('Database tidak kosong; replay-seed membutuhkan database baru')
+    rng = random.Random(seed)
+    anon = Anonymizer(f'seed-{seed}')
+    teachers = [{'id': i, 'nip': f'{rng.randrange(10 ** 17, 10 ** 18)}', 'name': anon.person(f't{i}'),
+                 'phone': '', 'address': ''} for i in range(1, plan['teachers'] + 1)]
+    owner = dict((s, t) for t, s in plan['owned'] if t <= plan['teachers'])
+    subjects = [{'id': i, 'code': f'RS{i:04d}', 'name': f'Mapel {i}', 'sks': rng.randint(1, 4),
+                 'teacher_id': owner.get(i, (i - 1) % plan['teachers'] + 1)} for i in range(1, plan['subjects'] + 1)]
+    nis, used = list(plan['nis']), set(plan['nis'])
+    while len(nis) < plan['students']:
+        candidate = f'{rng.randrange(10 ** 9, 10 ** 10):010d}'
+        if candidate not in used:
+            nis.append(candidate)
+            used.add(candidate)
+    students = [{'id': i, 'nis': nis[i - 1], 'name': anon.person(f's{i}'), 'birth_date': date(2009 + i % 3, 1, 1),
+                 'address': '', 'gender': 'LP'[i % 2], 'parent_phone': '',
+                 'class_name': plan['classes'][(i - 1) % len(plan['classes'])]} for i in range(1, plan['students'] + 1)]
+    # Grade ids follow insertion order: the first plan['grades'] pairs are always graded
+    pairs = [(st, sj) for st in range(1, plan['students'] + 1) for sj in range(1, plan['subjects'] + 1)]
+    grades = [{'student_id': st, 'subject_id': sj, 'term': term, 'tugas': rng.randint(50, 100),
+               'uts': rng.randint(40, 100), 'uas': rng.randint(40, 100)}
+              for n, (st, sj) in enumerate(pairs) if n < plan['grades'] or rng.random() < density]
+    password_hash = bcrypt.generate_password_hash(REPLAY_PASSWORD).decode('utf-8')
+    users = [{'username': name, 'role': role, 'password_hash': password_hash,
+              'teacher_id': teacher_id if role == 'TEACHER' and teacher_id and teacher_id <= plan['teachers'] else None,
+              'student_id': student_id if role == 'STUDENT' and student_id and student_id <= plan['students'] else None}
+             for name, (role, teacher_id, student_id) in sorted(plan['users'].items())]
+
+    for model, rows in ((Teacher, teachers), (Subject, subjects), (Student, students), (Grade, grades), (User, users)):
+        if rows:
+            db.session.execute(insert(model), rows)
+    db.session.commit()
+    return {'teachers': len(teachers), 'subjects': len(subjects), 'students': len(students),
+            'grades': len(grades), 'users': len(users)}
+
+
+# -- run -------------------------------------------------------------------------
+
+
+def mint_tokens(usernames, hours: float) -> dict:
+    """Access tokens of the seeded users, valid for the whole replay (no /auth/login round trips)."""
+    from flask_jwt_extended import create_access_token
+    from siakad_app.models import User
+
+    tokens = {}
+    for user in User.query.filter(User.username.in_(list(usernames))):
+        claims = {'role': user.role, 'student_id': user.student_id, 'teacher_id': user.teacher_id,
+                  'tenant': user.tenant_id}
+        tokens[user.username] = create_access_token(identity=user.id, additional_claims=claims,
+                                                    expires_delta=timedelta(hours=hours))
+    return tokens
+
+
+def _send(base_url: str, entry: dict, token, timeout: float):
+    url = base_url.rstrip('/') + entry['path'] + (f"?{entry['query']}" if entry.get('query') else '')
+    headers = {'Accept': 'application/json'}
+    data = None
+    if token:
+        headers['Authorization'] = f'Bearer {token}'
+    if entry['method'] not in ('GET', 'HEAD'):
+        data = json.dumps(entry.get('body')).encode()
+        headers['Content-Type'] = 'application/json'
+    req = urllib.request.Request(url, data=data, headers=headers, method=entry['method'])
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            resp.read()
+            return resp.status
+    except urllib.error.HTTPError as e:
+        e.read()
+        return e.code
+    except (urllib.error.URLError, OSError):
+        return 0
+
+
+def run(entries, base_url: str, tokens: dict, speed: float = 1.0, concurrency: int = 8, timeout: float = 30.0):
+    """Replay ``entries`` in order; returns one result dict per entry, in log order.
+
+    With ``speed`` > 0 request i is started ``(ts_i - ts_0) / speed`` seconds
+    after the first; ``lag_ms`` records how late it actually started (all
+    threads busy). ``speed`` 0 sends as fast as ``concurrency`` allows.
+    """
+    results = [None] * len(entries)
+    lock = threading.Lock()
+
+    def one(i, entry, due):
+        started = time.perf_counter()
+        status = _send(base_url, entry, tokens.get(entry.get('user')) if entry.get('role') else None, timeout)
+        elapsed = time.perf_counter() - started
+        with lock:
+            results[i] = {'i': i, 'method': entry['method'], 'route': route_of(entry['path']), 'status': status,
+                          'expected': entry.get('status'), 'ms': round(elapsed * 1000, 2),
+                          'lag_ms': round(max(started - due, 0) * 1000, 2)}
+
+    if not entries:
+        return []
+    t0 = entries[0]['ts']
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='replay') as pool:
+        for i, entry in enumerate(entries):
+            due = start + ((entry['ts'] - t0) / speed if speed > 0 else 0)
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(one, i, entry, due)
+    return results
+
+
+# -- compare ---------------------------------------------------------------------
+
+
+def _percentile(values, p: float):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, max(0, math.ceil(p / 100 * len(values)) - 1))]
+
+
+def summarize(results) -> dict:
+    """Per (method, route): count, error rate (5xx or no response) and latency percentiles."""
+    groups = defaultdict(list)
+    for r in results:
+        groups[(r['method'], r['route'])].append(r)
+    summary = {}
+    for key, rows in groups.items():
+        ms = [r['ms'] for r in rows]
+        summary[key] = {'count': len(rows),
+                        'errors': sum(1 for r in rows if r['status'] == 0 or r['status'] >= 500) / len(rows),
+                        'p50': _percentile(ms, 50), 'p95': _percentile(ms, 95), 'p99': _percentile(ms, 99)}
+    return summary
+
+
+def compare(baseline, candidate, threshold: float = 0.10, min_ms: float = 5.0, min_count: int = 20):
+    """Rows of (method, route, baseline stats, candidate stats, regression reasons)."""
+    a, b = summarize(baseline), summarize(candidate)
+    rows = []
+    for key in sorted(set(a) | set(b)):
+        old, new = a.get(key), b.get(key)
+        reasons = []
+        if old and new and min(old['count'], new['count']) >= min_count:
+            for p in ('p50', 'p95', 'p99'):
+                if new[p] > old[p] * (1 + threshold) and new[p] - old[p] >= min_ms:
+                    reasons.append(f'{p} {old[p]:.1f} -> {new[p]:.1f} ms')
+        if old and new and new['errors'] > old['errors'] + 0.01:
+            reasons.append(f"errors {old['errors']:.1%} -> {new['errors']:.1%}")
+        rows.append((key[0], key[1], old, new, reasons))
+    return rows
@@ -0,0 +1,87 @@
+"""Class report rendering.
+
+The HTML report is streamed: one ordered query walks the students of the
+class (outer-joined to their grades, final scores computed in SQL) with a
+server-side cursor, each student becomes a row vector of preformatted cells,
+and the template is rendered with ``stream_template`` in ~16 KB chunks. The
+first bytes leave before the last student is read and memory stays flat in
+the class size.
+"""
+from flask import render_template, stream_template
+from sqlalchemy import select
+
+from siakad_app.extensions import db
+from siakad_app.models import Student
+from siakad_app.utils.archive import term_source
+from siakad_app.utils.refdata import refdata
+from siakad_app.utils.scoring import scoring_policy
+from siakad_app.utils.terms import ALL_TERMS
+
+TEMPLATE = 'reports/class_report.html'
+CHUNK_SIZE = 16 * 1024
+YIELD_PER = 500
+
+
+def report_columns(source, class_name: str, term: str):
+    """Column labels and a (subject_id, term) -> position index for the grades present in the class."""
+    subject_codes = refdata().subject_codes
+    keys = db.session.execute(
+        select(source.c.subject_id, source.c.term).distinct()
+        .join(Student, Student.id == source.c.student_id)
+        .where(Student.class_name == class_name)
+    ).all()
+    labels = {}
+    for subject_id, t in keys:
+        code = subject_codes.get(subject_id, str(subject_id))
+        labels[(subject_id, t)] = f'{code} ({t})' if term == ALL_TERMS else code
+    ordered = sorted(labels.items(), key=lambda item: item[1])
+    return [label for _, label in ordered], {key: i for i, (key, _) in enumerate(ordered)}
+
+
+def report_rows(source, class_name: str, columns: dict):
+    """Yield (nis, name, cells) per student in name order from one ordered query."""
+    final = scoring_policy().sql_final(source.c)
+    stmt = (
+        select(Student.id, Student.nis, Student.name, source.c.subject_id, source.c.term, final)
+        .outerjoin(source, source.c.student_id == Student.id)
+        .where(Student.class_name == class_name)
+        .order_by(Student.name, Student.id)
+        .execution_options(yield_per=YIELD_PER)
+    )
+    empty = ['0.00'] * len(columns)
+    current = nis = name = cells = None
+    for student_id, s_nis, s_name, subject_id, t, value in db.session.execute(stmt):
+        if student_id != current:
+            if current is not None:
+                yield nis, name, cells
+            current, nis, name, cells = student_id, s_nis, s_name, list(empty)
+        if subject_id is not None:
+            # A grade committed after the header was read has no column; skip it
+            pos = columns.get((subject_id, t))
+            if pos is not None:
+                cells[pos] = f'{value:.2f}'
+    if current is not None:
+        yield nis, name, cells
+
+
+def _chunked(parts, size: int = CHUNK_SIZE):
+    buffer, length = [], 0
+    for part in parts:
+        buffer.append(part)
+        length += len(part)
+        if length >= size:
+            yield ''.join(buffer)
+            buffer, length = [], 0
+    if buffer:
+        yield ''.join(buffer)
+
+
+def class_report_html(class_name: str, term: str, stream: bool = True):
+    """The HTML report as an iterator of chunks, or as one string with ``stream=False``."""
+    source = term_source(term)
+    subjects, columns = report_columns(source, class_name, term)
+    rows = report_rows(source, class_name, columns)
+    context = {'class_name': class_name, 'term': term, 'subjects': subjects}
+    if not stream:
+        return render_template(TEMPLATE, rows=list(rows), **context)
+    return _chunked(stream_template(TEMPLATE, rows=rows, **context))
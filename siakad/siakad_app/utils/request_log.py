@@ -0,0 +1,92 @@
+"""Opt-in capture of API traffic for load replay (see ``utils.replay``).
+
+With ``REQUEST_LOG_PATH`` set, every API request is appended as one JSON
+line: start time, method, path, query string, status, duration, the JWT
+claims (role, user id, teacher/student id, tenant) and, with
+``REQUEST_LOG_BODIES``, the JSON body of writes. Passwords and tokens are
+dropped before writing; everything else is personal data until
+``flask replay-prepare`` anonymizes it, so keep the file private and short
+lived. A ``{pid}`` in the path gives every worker its own file.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from flask import g, request
+from flask_jwt_extended import get_jwt
+
+logger = logging.getLogger(__name__)
+
+_SECRET_KEYS = {'password', 'old_password', 'new_password', 'refresh_token', 'access_token'}
+_SKIPPED_PREFIXES = ('/static/', '/healthz', '/readyz', '/profiling/', '/events/')
+
+
+def _scrub(value):
+    if isinstance(value, dict):
+        return {k: _scrub(v) for k, v in value.items() if k not in _SECRET_KEYS}
+    if isinstance(value, list):
+        return [_scrub(v) for v in value]
+    return value
+
+
+class RequestLog:
+    def __init__(self):
+        self.path = None
+        self.bodies = True
+        self._file = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.path = app.config.get('REQUEST_LOG_PATH') or None
+        self.bodies = app.config.get('REQUEST_LOG_BODIES', True)
+        if self.path:
+            app.before_request(self._before_request)
+            app.after_request(self._after_request)
+            logger.warning(f"Request capture enabled: {self.path}")
+
+    def _open(self):
+        # Reopened after fork so every worker writes its own file
+        if self._pid != os.getpid():
+            path = self.path.replace('{pid}', str(os.getpid()))
+            self._file = open(path, 'a', encoding='utf-8', buffering=1)
+            self._pid = os.getpid()
+        return self._file
+
+    def _before_request(self):
+        g.request_log_started = time.time()
+
+    def _after_request(self, response):
+        started = g.pop('request_log_started', None)
+        if started is None or request.path.startswith(_SKIPPED_PREFIXES):
+            return response
+        try:
+            claims = get_jwt()
+        except RuntimeError:
+            claims = {}
+        entry = {
+            'ts': round(started, 4),
+            'method': request.method,
+            'path': request.path,
+            'query': request.query_string.decode('latin-1'),
+            'status': response.status_code,
+            'ms': round((time.time() - started) * 1000, 2),
+            'role': claims.get('role'),
+            'user': claims.get('sub'),
+            'teacher_id': claims.get('teacher_id'),
+            'student_id': claims.get('student_id'),
+            'tenant': claims.get('tenant'),
+        }
+        if self.bodies and request.method not in ('GET', 'HEAD', 'OPTIONS'):
+            entry['body'] = _scrub(request.get_json(silent=True))
+        line = json.dumps(entry, separators=(',', ':'), default=str) + '\n'
+        try:
+            with self._lock:
+                self._open().write(line)
+        except OSError as e:
+            logger.error(f"Request capture failed: {e}")
+        return response
+
+
+request_log = RequestLog()
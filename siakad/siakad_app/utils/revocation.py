@@ -0,0 +1,268 @@
+"""JWT revocation checks without a database query per request.
+
+Revoked token ids (``jti``) are kept in an in-process bloom filter: a miss,
+which is the answer for almost every request, means "not revoked" without
+touching the database. A hit is confirmed against ``token_revocations``
+through a bounded LRU, so false positives cost at most one indexed lookup
+per token. Forced logouts are per-user cutoffs held in a dict, in epoch
+milliseconds: every token carries its issue time in an ``iat_ms`` claim, since
+``iat`` has whole-second resolution.
+
+State is kept per database (see ``RevocationStore``). Each worker pulls new
+rows incrementally every ``TOKEN_REVOCATION_REFRESH``
+seconds and rebuilds the filter from scratch every
+``TOKEN_REVOCATION_REBUILD`` seconds (dropping expired entries), so a
+revocation made on another worker takes effect within one refresh interval;
+revocations made by this worker take effect immediately.
+"""
+import hashlib
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import exists, select
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+
+from siakad_app.extensions import db, jwt
+from siakad_app.models import TokenRevocation
+from siakad_app.utils.tenancy import current_tenant, tenancy, tenant_context
+
+logger = logging.getLogger(__name__)
+
+ISSUED_MS = 'iat_ms'
+
+
+class BloomFilter:
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        self.size = max(1024, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, key: str):
+        for pos in self._positions(key):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+
+class _State:
+    """Revocations of one database: bloom filter, user cutoffs, LRU and refresh cursor."""
+
+    def __init__(self):
+        self.bloom = None
+        self.users = {}  # str(user id) -> revoked_before (epoch seconds)
+        self.cache = OrderedDict()  # jti -> revoked
+        self.cursor = 0
+        self.entries = 0
+        self.next_refresh = 0.0
+        self.next_rebuild = 0.0
+        self.lock = threading.Lock()
+
+
+class RevocationStore:
+    """Per-database revocation state.
+
+    Tenants in ``TENANT_DATABASES`` have their own ``token_revocations`` table,
+    id sequence and user ids, so each gets its own state; tenants stored in
+    the configured database share one. Lookups run as the tenant of the
+    token's claim, since the blocklist check happens before
+    ``Tenancy._verify_claim`` switches the request to it.
+    """
+
+    def __init__(self):
+        self.refresh_interval = 5.0
+        self.rebuild_interval = 300.0
+        self.capacity = 100000
+        self.cache_size = 10000
+        self._states = {}  # tenancy.database_key -> _State
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.refresh_interval = app.config.get('TOKEN_REVOCATION_REFRESH', 5.0)
+        self.rebuild_interval = app.config.get('TOKEN_REVOCATION_REBUILD', 300.0)
+        self.capacity = app.config.get('TOKEN_REVOCATION_CAPACITY', 100000)
+        self.cache_size = app.config.get('TOKEN_REVOCATION_CACHE_SIZE', 10000)
+        jwt.token_in_blocklist_loader(self._blocklist_loader)
+        jwt.additional_claims_loader(_issue_claims)
+
+    def _state(self, tenant: str = None) -> _State:
+        key = tenancy.database_key(tenant or current_tenant())
+        state = self._states.get(key)
+        if state is None:
+            with self._lock:
+                state = self._states.setdefault(key, _State())
+        return state
+
+    # -- lookups -------------------------------------------------------------
+
+    def _blocklist_loader(self, jwt_header, jwt_payload) -> bool:
+        tenant = tenancy.claim_tenant(jwt_payload)
+        if tenant is None:
+            # Rejected by Tenancy._verify_claim right after this check
+            return False
+        with tenant_context(tenant):
+            return self.is_revoked(jwt_payload)
+
+    def is_revoked(self, payload: dict) -> bool:
+        """Check ``payload`` against the revocations of the current tenant's database."""
+        state = self._state()
+        if time.monotonic() >= state.next_refresh:
+            self._refresh(state)
+        cutoff = state.users.get(str(payload.get('sub')))
+        if cutoff is not None and _issued_ms(payload) <= cutoff:
+            return True
+        jti = payload.get('jti')
+        if jti is None or state.bloom is None or jti not in state.bloom:
+            return False
+        return self._confirm(state, jti)
+
+    def _confirm(self, state: _State, jti: str) -> bool:
+        with state.lock:
+            revoked = state.cache.get(jti)
+            if revoked is not None:
+                state.cache.move_to_end(jti)
+                return revoked
+        revoked = bool(db.session.query(exists().where(TokenRevocation.jti == jti)).scalar())
+        self._remember(state, jti, revoked)
+        return revoked
+
+    def _remember(self, state: _State, jti: str, revoked: bool):
+        with state.lock:
+            state.cache[jti] = revoked
+            state.cache.move_to_end(jti)
+            if len(state.cache) > self.cache_size:
+                state.cache.popitem(last=False)
+
+    # -- loading -------------------------------------------------------------
+
+    def _refresh(self, state: _State):
+        with state.lock:
+            now = time.monotonic()
+            if now < state.next_refresh:
+                return
+            # Other threads keep answering from the current state meanwhile
+            state.next_refresh = now + self.refresh_interval
+            full = state.bloom is None or now >= state.next_rebuild or state.entries >= self.capacity
+        try:
+            self._load(state, full)
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            logger.warning(f"Token revocation refresh failed, keeping previous state: {e}")
+            if state.bloom is None:
+                raise
+            return
+        if full:
+            state.next_rebuild = now + self.rebuild_interval
+
+    def _load(self, state: _State, full: bool):
+        stmt = (
+            select(TokenRevocation.id, TokenRevocation.jti, TokenRevocation.user_id, TokenRevocation.revoked_before)
+            .where(TokenRevocation.expires_at > datetime.utcnow())
+            .order_by(TokenRevocation.id)
+        )
+        if not full:
+            stmt = stmt.where(TokenRevocation.id > state.cursor)
+        rows = db.session.execute(stmt).all()
+
+        if full:
+            bloom = BloomFilter(max(self.capacity, 2 * len(rows)))
+            users, entries, cursor = {}, 0, 0
+        else:
+            bloom, users, entries, cursor = state.bloom, dict(state.users), state.entries, state.cursor
+        for row_id, jti, user_id, revoked_before in rows:
+            if jti:
+                bloom.add(jti)
+                entries += 1
+            if user_id is not None and revoked_before is not None:
+                key = str(user_id)
+                users[key] = max(users.get(key, 0), revoked_before)
+            cursor = max(cursor, row_id)
+
+        with state.lock:
+            state.bloom, state.users, state.entries, state.cursor = bloom, users, entries, cursor
+            if full:
+                state.cache.clear()
+        if full:
+            logger.debug(f"Token revocations loaded for {current_tenant()}: {entries} tokens, "
+                         f"{len(users)} user cutoffs")
+
+    # -- writes --------------------------------------------------------------
+
+    def revoke_token(self, payload: dict):
+        """Revoke one token (logout, refresh rotation) until it expires anyway."""
+        jti = payload['jti']
+        exp = payload.get('exp')
+        expires_at = datetime.utcfromtimestamp(exp) if exp else datetime.utcnow() + timedelta(days=365)
+        row = TokenRevocation(jti=jti, user_id=_user_id(payload), expires_at=expires_at)
+        db.session.add(row)
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # Already revoked
+            db.session.rollback()
+        state = self._state()
+        if state.bloom is None:
+            self._refresh(state)
+        state.bloom.add(jti)
+        self._remember(state, jti, True)
+
+    def revoke_user(self, user_id: int):
+        """Revoke every token issued to ``user_id`` up to now (forced logout).
+
+        The cutoff is in milliseconds, compared with the ``iat_ms`` claim, so
+        a token issued earlier in the same second is revoked while a login
+        right after the forced logout keeps its token.
+        """
+        lifetime = current_app.config.get('JWT_REFRESH_TOKEN_EXPIRES')
+        if not isinstance(lifetime, timedelta):
+            lifetime = timedelta(days=365)
+        cutoff = int(time.time() * 1000)
+        db.session.add(TokenRevocation(user_id=user_id, revoked_before=cutoff,
+                                       expires_at=datetime.utcnow() + lifetime))
+        db.session.commit()
+        state = self._state()
+        with state.lock:
+            users = dict(state.users)
+            users[str(user_id)] = max(users.get(str(user_id), 0), cutoff)
+            state.users = users
+
+    def prune(self) -> int:
+        """Delete rows of tokens that have expired in every database; returns the number removed."""
+        deleted = 0
+        for tenant in [current_tenant(), *sorted(tenancy.databases)]:
+            with tenant_context(tenant):
+                deleted += TokenRevocation.query.filter(TokenRevocation.expires_at <= datetime.utcnow()).delete()
+                db.session.commit()
+        return deleted
+
+
+def _issue_claims(identity) -> dict:
+    return {ISSUED_MS: int(time.time() * 1000)}
+
+
+def _issued_ms(payload: dict) -> int:
+    issued = payload.get(ISSUED_MS)
+    if isinstance(issued, int):
+        return issued
+    # Tokens from before the claim existed: the start of their iat second, so a tie counts as revoked
+    return int(payload.get('iat', 0)) * 1000
+
+
+def _user_id(payload: dict):
+    try:
+        return int(payload.get('sub'))
+    except (TypeError, ValueError):
+        return None
+
+
+revocations = RevocationStore()
@@ -0,0 +1,173 @@
+"""Configurable final-score formulas.
+
+All scoring policies are loaded into one immutable ``CompiledPolicy`` which
+produces both a SQL expression (for aggregates and sorting in the database)
+and a batch evaluator (for transcripts and reports), so changing a weight is
+a metadata update and never a recompute of stored rows. The compiled policy
+is cached per worker and reloaded when the table changes (checked at most
+every ``SCORING_POLICY_TTL`` seconds, immediately after a local write).
+"""
+import threading
+import time
+from collections import namedtuple
+from flask import current_app
+from sqlalchemy import and_, case, func, literal, select
+
+from siakad_app.extensions import db
+from siakad_app.models.scoring_policy import ScoringPolicy
+from siakad_app.utils.tenancy import current_tenant
+from siakad_app.utils.versions import cache_versions, version_of
+
+try:
+    import numpy as np
+except ImportError:  # optional dependency, pure Python fallback below
+    np = None
+
+Weights = namedtuple('Weights', 'tugas uts uas')
+
+LEGACY_WEIGHTS = Weights(1.0, 1.0, 1.0)
+
+# Indonesian 4.0 scale: (minimum final score, letter, grade point)
+GRADE_POINTS = ((85, 'A', 4.0), (70, 'B', 3.0), (55, 'C', 2.0), (40, 'D', 1.0), (0, 'E', 0.0))
+
+
+def parse_weights(spec: str) -> Weights:
+    """Parse '30,30,40' into Weights; the sum need not be 100."""
+    parts = [p.strip() for p in (spec or '').split(',') if p.strip()]
+    if len(parts) != 3:
+        raise ValueError("Bobot default harus berisi 3 angka, contoh '30,30,40'")
+    return Weights(*ScoringPolicy._validate_weights(*parts))
+
+
+def grade_point(final: float):
+    for minimum, letter, point in GRADE_POINTS:
+        if final >= minimum:
+            return letter, point
+    return 'E', 0.0
+
+
+class CompiledPolicy:
+    def __init__(self, policies, default: Weights, version=None):
+        self.configured_default = default
+        self.default = default
+        self.version = version
+        self._exact = {}
+        self._by_subject = {}
+        self._by_term = {}
+        for p in policies:
+            w = Weights(p.w_tugas, p.w_uts, p.w_uas)
+            if p.subject_id is not None and p.term:
+                self._exact[(p.subject_id, p.term)] = w
+            elif p.subject_id is not None:
+                self._by_subject[p.subject_id] = w
+            elif p.term:
+                self._by_term[p.term] = w
+            else:
+                self.default = w
+        self._memo = {}
+
+    def weights_for(self, subject_id, term) -> Weights:
+        key = (subject_id, term)
+        w = self._memo.get(key)
+        if w is None:
+            w = (self._exact.get(key) or self._by_subject.get(subject_id)
+                 or self._by_term.get(term) or self.default)
+            self._memo[key] = w
+        return w
+
+    def score(self, subject_id, term, tugas, uts, uas) -> float:
+        w = self.weights_for(subject_id, term)
+        return round((w.tugas * float(tugas) + w.uts * float(uts) + w.uas * float(uas))
+                     / (w.tugas + w.uts + w.uas), 2)
+
+    # -- SQL -------------------------------------------------------------------
+
+    @staticmethod
+    def _weighted(cols, w: Weights):
+        if w.tugas == w.uts == w.uas:
+            # Same expression as the original (tugas + uts + uas) / 3 formula
+            return (cols.tugas + cols.uts + cols.uas) / 3.0
+        total = w.tugas + w.uts + w.uas
+        return (cols.tugas * literal(w.tugas) + cols.uts * literal(w.uts) + cols.uas * literal(w.uas)) / literal(total)
+
+    def sql_final(self, cols):
+        """Final-score SQL expression over a grades-like table or model (``cols``).
+
+        Rounded to 2 places per row like ``score``, so SQL aggregates agree
+        with averages of the Python finals.
+        """
+        whens = []
+        for (sid, term), w in self._exact.items():
+            whens.append((and_(cols.subject_id == sid, cols.term == term), self._weighted(cols, w)))
+        for sid, w in self._by_subject.items():
+            whens.append((cols.subject_id == sid, self._weighted(cols, w)))
+        for term, w in self._by_term.items():
+            whens.append((cols.term == term, self._weighted(cols, w)))
+        default = self._weighted(cols, self.default)
+        return func.round(case(*whens, else_=default) if whens else default, 2)
+
+    # -- batch evaluation --------------------------------------------------------
+
+    def evaluate(self, subject_ids, terms, tugas, uts, uas):
+        """Final scores for parallel columns; vectorized with numpy when available."""
+        weights = [self.weights_for(s, t) for s, t in zip(subject_ids, terms)]
+        if not weights:
+            return []
+        if np is not None:
+            w = np.asarray(weights, dtype=float)
+            values = np.column_stack((np.asarray(tugas, dtype=float), np.asarray(uts, dtype=float),
+                                      np.asarray(uas, dtype=float)))
+            return np.round((values * w).sum(axis=1) / w.sum(axis=1), 2).tolist()
+        return [
+            round((w.tugas * float(a) + w.uts * float(b) + w.uas * float(c)) / (w.tugas + w.uts + w.uas), 2)
+            for w, a, b, c in zip(weights, tugas, uts, uas)
+        ]
+
+    def evaluate_grades(self, grades):
+        """Batch finals for Grade/GradeArchive objects."""
+        return self.evaluate([g.subject_id for g in grades], [g.term for g in grades],
+                             [g.tugas for g in grades], [g.uts for g in grades], [g.uas for g in grades])
+
+
+class _PolicyCache:
+    """Compiled policy per tenant, revalidated by version every SCORING_POLICY_TTL seconds."""
+
+    def __init__(self):
+        self._entries = {}  # tenant -> (CompiledPolicy, checked at)
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        self._entries.pop(current_tenant(), None)
+
+    def get(self) -> CompiledPolicy:
+        ttl = current_app.config.get('SCORING_POLICY_TTL', 30)
+        tenant = current_tenant()
+        now = time.monotonic()
+        entry = self._entries.get(tenant)
+        if entry is not None and now - entry[1] < ttl:
+            return entry[0]
+        with self._lock:
+            entry = self._entries.get(tenant)
+            if entry is not None and now - entry[1] < ttl:
+                return entry[0]
+            # The counter catches edits within the second of the newest updated_at (see utils.versions)
+            version = tuple(db.session.execute(select(
+                version_of('scoring'), func.count(ScoringPolicy.id), func.max(ScoringPolicy.updated_at))).one())
+            default = parse_weights(current_app.config.get('DEFAULT_SCORE_WEIGHTS', '1,1,1'))
+            compiled = entry[0] if entry is not None else None
+            if compiled is None or compiled.version != version or compiled.configured_default != default:
+                compiled = CompiledPolicy(ScoringPolicy.query.all(), default, version)
+            self._entries[tenant] = (compiled, now)
+            return compiled
+
+
+cache_versions.track('scoring', (ScoringPolicy,))
+_cache = _PolicyCache()
+
+
+def scoring_policy() -> CompiledPolicy:
+    return _cache.get()
+
+
+def invalidate_scoring_policy():
+    _cache.invalidate()
@@ -0,0 +1,243 @@
+"""Multi-school (multi-tenant) data isolation.
+
+Every school-owned table carries a ``tenant_id`` (``TenantScoped``) and every
+ORM SELECT/UPDATE/DELETE issued through ``db.session`` is filtered by the
+current tenant with ``with_loader_criteria``, so blueprints never add the
+filter themselves. Inserts pick the tenant up from the column default. The
+filter is applied in single-school mode too (tenant ``DEFAULT_TENANT``) so the
+tenant-leading indexes serve both modes.
+
+With ``MULTI_TENANT=true`` the tenant of a request comes from the host name
+(``TENANT_HOSTS`` or ``<tenant>.TENANT_BASE_DOMAIN``) and, for authenticated
+requests, from the ``tenant`` claim of the JWT; a token used on another
+school's host is rejected. Tenants listed in ``TENANT_DATABASES`` get their own
+database: engines are created on first use with a small pool and the least
+recently used idle engine is disposed once more than ``TENANT_ENGINE_CACHE``
+are open.
+
+Core statements on tables (``db.engine``, exports, archiving) are not scoped.
+"""
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from flask import g, jsonify, request
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import with_loader_criteria
+
+from siakad_app.extensions import RoutingSession, db, jwt
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TENANT = 'default'
+TENANT_PATTERN = r'^[a-z0-9][a-z0-9_\-]{0,31}$'
+_TENANT_RE = re.compile(TENANT_PATTERN)
+
+_current = ContextVar('siakad_tenant', default=None)
+_default = DEFAULT_TENANT
+
+
+def current_tenant() -> str:
+    return _current.get() or _default
+
+
+@contextmanager
+def tenant_context(tenant: str):
+    """Run a block (CLI command, background job) as ``tenant``."""
+    token = _current.set(validate_tenant(tenant))
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+
+def validate_tenant(tenant: str) -> str:
+    tenant = (tenant or '').strip().lower()
+    if not _TENANT_RE.match(tenant):
+        raise ValueError('Tenant harus 1-32 karakter (a-z, 0-9, _ atau -)')
+    return tenant
+
+
+class TenantScoped:
+    """Mixin for tables owned by one school; see ``utils.tenancy``."""
+    tenant_id = db.Column(db.String(32), nullable=False, default=current_tenant, server_default=DEFAULT_TENANT)
+
+
+def _parse_map(spec: str) -> dict:
+    """Parse 'a=x,b=y' into {a: x}; values may contain '='."""
+    result = {}
+    for part in (spec or '').split(','):
+        key, sep, value = part.strip().partition('=')
+        if sep:
+            result[key.strip().lower()] = value.strip()
+    return result
+
+
+class TenantEngines:
+    """Bounded LRU of per-tenant engines; idle engines are disposed on eviction."""
+
+    def __init__(self, max_engines: int = 8, pool_size: int = 2, max_overflow: int = 3, pool_recycle: int = 3600):
+        self.max_engines = max_engines
+        self.engine_options = {'pool_size': pool_size, 'max_overflow': max_overflow,
+                               'pool_recycle': pool_recycle, 'pool_pre_ping': True}
+        self._engines = OrderedDict()
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    def get(self, tenant: str, url: str):
+        created = None
+        with self._lock:
+            if self._pid != os.getpid():
+                # Forked worker: the parent's connections are not ours to use or close
+                for engine in self._engines.values():
+                    engine.dispose(close=False)
+                self._engines.clear()
+                self._pid = os.getpid()
+            engine = self._engines.pop(tenant, None)
+            if engine is None:
+                options = {} if url.startswith('sqlite') else self.engine_options
+                engine = created = create_engine(url, **options)
+            self._engines[tenant] = engine
+            self._evict()
+        if created is not None:
+            logger.info(f"Engine opened for tenant {tenant}")
+            db.metadata.create_all(created)
+        return engine
+
+    def _evict(self):
+        for name in list(self._engines):
+            if len(self._engines) <= self.max_engines:
+                return
+            engine = self._engines[name]
+            checked_out = getattr(engine.pool, 'checkedout', lambda: 0)()
+            if checked_out:
+                continue
+            del self._engines[name]
+            engine.dispose()
+            logger.info(f"Engine closed for idle tenant {name}")
+
+    def dispose_all(self):
+        # Before fork: children must not inherit open connections
+        with self._lock:
+            for engine in self._engines.values():
+                engine.dispose()
+            self._engines.clear()
+
+    def __len__(self):
+        return len(self._engines)
+
+
+class Tenancy:
+    def __init__(self):
+        self.enabled = False
+        self.tenants = {DEFAULT_TENANT}
+        self.hosts = {}
+        self.base_domain = None
+        self.databases = {}
+        self.engines = TenantEngines()
+        self._listening = False
+
+    def init_app(self, app):
+        global _default
+        _default = validate_tenant(app.config.get('DEFAULT_TENANT') or DEFAULT_TENANT)
+        self.enabled = app.config.get('MULTI_TENANT', False)
+        self.hosts = {host: validate_tenant(t) for host, t in _parse_map(app.config.get('TENANT_HOSTS')).items()}
+        self.base_domain = (app.config.get('TENANT_BASE_DOMAIN') or '').lower().strip('.') or None
+        self.databases = {validate_tenant(t): url for t, url in _parse_map(app.config.get('TENANT_DATABASES')).items()}
+        listed = {validate_tenant(t) for t in (app.config.get('TENANTS') or '').split(',') if t.strip()}
+        self.tenants = {_default} | listed | set(self.hosts.values()) | set(self.databases)
+        self.engines = TenantEngines(
+            max_engines=app.config.get('TENANT_ENGINE_CACHE', 8),
+            pool_size=app.config.get('TENANT_POOL_SIZE', 2),
+            max_overflow=app.config.get('TENANT_MAX_OVERFLOW', 3),
+            pool_recycle=app.config.get('SQLALCHEMY_POOL_RECYCLE', 3600),
+        )
+
+        if not self._listening:
+            event.listen(db.session, 'do_orm_execute', self._scope)
+            self._listening = True
+        RoutingSession.bind_resolver = self._bind if self.databases else None
+        if self.enabled:
+            app.before_request(self._resolve_request)
+            app.teardown_request(self._reset_request)
+            jwt.token_verification_loader(self._verify_claim)
+
+    # -- resolution ----------------------------------------------------------
+
+    def tenant_for_host(self, host: str):
+        host = (host or '').split(':')[0].lower()
+        if host in self.hosts:
+            return self.hosts[host]
+        if self.base_domain and host.endswith('.' + self.base_domain):
+            sub = host[:-len(self.base_domain) - 1]
+            if '.' not in sub:
+                return sub
+        return None
+
+    def _resolve_request(self):
+        tenant = self.tenant_for_host(request.host)
+        if tenant is not None and tenant not in self.tenants:
+            return jsonify({'error': 'Tenant tidak dikenal'}), 404
+        g.host_tenant = tenant
+        g.tenant_token = _current.set(tenant or _default)
+
+    def _reset_request(self, exc=None):
+        token = g.pop('tenant_token', None)
+        if token is not None:
+            _current.reset(token)
+
+    def _verify_claim(self, jwt_header, jwt_payload) -> bool:
+        # Runs on every JWT verification, before the endpoint body
+        claim = jwt_payload.get('tenant') or _default
+        host_tenant = g.get('host_tenant')
+        if host_tenant is not None and claim != host_tenant:
+            logger.warning(f"Token of tenant {claim} used on host of tenant {host_tenant}")
+            return False
+        if claim not in self.tenants:
+            return False
+        _current.set(claim)
+        return True
+
+    # -- scoping and routing -------------------------------------------------
+
+    def _scope(self, state):
+        if state.execution_options.get('all_tenants'):
+            return
+        if state.is_select and (state.is_column_load or state.is_relationship_load):
+            # Lazy loads inherit the criteria of the query that loaded the parent
+            return
+        if state.is_select or state.is_update or state.is_delete:
+            tenant = current_tenant()
+            state.statement = state.statement.options(
+                with_loader_criteria(TenantScoped, lambda cls: cls.tenant_id == tenant, include_aliases=True)
+            )
+
+    def _bind(self):
+        url = self.databases.get(current_tenant())
+        return self.engines.get(current_tenant(), url) if url else None
+
+    def claim_tenant(self, jwt_payload: dict):
+        """Tenant a token belongs to, or None for a tenant this instance does not serve.
+
+        For checks that run before ``_verify_claim`` has switched the request
+        to the token's tenant, e.g. the revocation lookup.
+        """
+        if not self.enabled:
+            return current_tenant()
+        claim = jwt_payload.get('tenant') or _default
+        return claim if claim in self.tenants else None
+
+    def database_key(self, tenant: str):
+        """Tenants sharing the configured database share one key (None); others are keyed by name."""
+        return tenant if tenant in self.databases else None
+
+    def engine_for(self, tenant: str):
+        """Engine holding ``tenant``'s data (None: the default database)."""
+        url = self.databases.get(tenant)
+        return self.engines.get(tenant, url) if url else None
+
+
+tenancy = Tenancy()
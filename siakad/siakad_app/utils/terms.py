@@ -0,0 +1,45 @@
+import re
+from datetime import date
+from flask import current_app, request
+
+
+TERM_PATTERN = r'^\d{4}/\d{4}-[12]$'
+ALL_TERMS = 'all'
+
+_term_re = re.compile(TERM_PATTERN)
+
+
+def validate_term(term: str) -> str:
+    term = (term or '').strip()
+    if not _term_re.fullmatch(term):
+        raise ValueError("Format semester harus 'YYYY/YYYY-1' atau 'YYYY/YYYY-2', contoh 2024/2025-1")
+    start, end = int(term[:4]), int(term[5:9])
+    if end != start + 1:
+        raise ValueError('Tahun ajaran harus berurutan, contoh 2024/2025')
+    return term
+
+
+def term_for_date(d: date) -> str:
+    # Semester ganjil runs July-December, semester genap January-June
+    if d.month >= 7:
+        return f'{d.year}/{d.year + 1}-1'
+    return f'{d.year - 1}/{d.year}-2'
+
+
+def current_term() -> str:
+    configured = current_app.config.get('CURRENT_TERM')
+    if configured:
+        return validate_term(configured)
+    return term_for_date(date.today())
+
+
+def requested_term(allow_all: bool = True) -> str:
+    """Resolve the ``term`` query argument; defaults to the active term."""
+    term = (request.args.get('term') or '').strip()
+    if not term:
+        return current_term()
+    if term.lower() == ALL_TERMS:
+        if not allow_all:
+            raise ValueError("term=all tidak didukung untuk endpoint ini")
+        return ALL_TERMS
+    return validate_term(term)
@@ -0,0 +1,40 @@
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+
+from siakad_app.extensions import db
+
+_INSERTS = {'mysql': mysql.insert, 'mariadb': mysql.insert, 'sqlite': sqlite.insert, 'postgresql': postgresql.insert}
+
+
+def upsert_statement(dialect: str, table, rows, keys, update):
+    """The INSERT ... ON DUPLICATE KEY / ON CONFLICT statement behind ``upsert``.
+
+    ``update`` lists the columns taken from the new row, or maps columns to
+    expressions over the existing row, e.g. ``{'version': table.c.version + 1}``.
+    """
+    insert = _INSERTS.get(dialect)
+    if insert is None:
+        raise NotImplementedError(f'Upsert is not supported for {dialect}')
+    stmt = insert(table).values(rows)
+    if isinstance(update, dict):
+        values = update
+    elif dialect in ('mysql', 'mariadb'):
+        values = {c: stmt.inserted[c] for c in update}
+    else:
+        values = {c: stmt.excluded[c] for c in update}
+    if dialect in ('mysql', 'mariadb'):
+        return stmt.on_duplicate_key_update(values)
+    return stmt.on_conflict_do_update(index_elements=list(keys), set_=values)
+
+
+def upsert(table, rows, keys, update) -> int:
+    """Insert ``rows`` or update the ``update`` columns of existing ones in one atomic statement.
+
+    Uses ``ON DUPLICATE KEY UPDATE`` on MySQL and ``ON CONFLICT (keys) DO
+    UPDATE`` on SQLite/PostgreSQL, so concurrent writers of the same key never
+    fail with a duplicate key error. ``keys`` must be covered by a unique
+    constraint. Runs in the current session transaction.
+    """
+    if not rows:
+        return 0
+    stmt = upsert_statement(db.session.get_bind().dialect.name, table, rows, keys, update)
+    return db.session.execute(stmt).rowcount
@@ -0,0 +1,194 @@
+"""Field validators shared by the models, the marshmallow schemas and bulk imports.
+
+Each validator is a callable that normalizes one value and returns it, or
+raises ValueError with the message shown to the user. Text fields take a
+string or None; any other JSON value (number, list, object) is a ValueError
+too, never an AttributeError. Patterns are compiled
+once at import. ``validate_rows`` checks a whole batch column by column:
+pattern fields are matched against the joined column in a single regex call
+and only fall back to row-by-row checks to locate errors.
+"""
+import math
+import re
+from datetime import date
+
+_WS_RE = re.compile(r'\s+')
+
+
+class Field:
+    """Validator for one value; ``column`` applies it to a list of values."""
+
+    def __init__(self, check, message: str = None):
+        self.check = check
+        self.message = message
+
+    def __call__(self, value):
+        return self.check(value)
+
+    def column(self, values):
+        """Return (cleaned values, {row index: error}) for a whole column."""
+        cleaned, errors = [], {}
+        for i, value in enumerate(values):
+            try:
+                cleaned.append(self(value))
+            except ValueError as e:
+                cleaned.append(None)
+                errors[i] = str(e)
+        return cleaned, errors
+
+
+class PatternField(Field):
+    """Normalize, then require a full match of ``pattern``.
+
+    ``empty`` decides which raw values are accepted as '' without matching:
+    None (``'none'``), any falsy value (``'blank'``) or none at all.
+    """
+
+    def __init__(self, pattern: str, message: str, normalize=None, empty: str = None):
+        super().__init__(None, message)
+        self.regex = re.compile(pattern)
+        # Whole column in one call: every value followed by a newline
+        self.block = re.compile(f'(?:{pattern}\n)*')
+        self.normalize = normalize or _strip
+        self.empty = empty
+
+    def _is_empty(self, value) -> bool:
+        if self.empty == 'none':
+            return value is None
+        if self.empty == 'blank':
+            return not value
+        return False
+
+    def __call__(self, value):
+        if self._is_empty(value):
+            return ''
+        value = self.normalize(value)
+        if not self.regex.fullmatch(value):
+            raise ValueError(self.message)
+        return value
+
+    def column(self, values):
+        try:
+            cleaned = ['' if self._is_empty(v) else self.normalize(v) for v in values]
+        except ValueError:
+            # A value of the wrong type: locate it row by row
+            return super().column(values)
+        checked = [c for v, c in zip(values, cleaned) if not self._is_empty(v)]
+        joined = '\n'.join(checked) + '\n'
+        # A newline inside a value would let two halves pass as two rows
+        if not checked or (joined.count('\n') == len(checked) and self.block.fullmatch(joined)):
+            return cleaned, {}
+        return super().column(values)
+
+
+def _strip(value) -> str:
+    if value is None:
+        return ''
+    if not isinstance(value, str):
+        raise ValueError('Nilai harus berupa teks')
+    return value.strip()
+
+
+def _min_length(length: int, message: str):
+    def check(value):
+        value = _strip(value)
+        if len(value) < length:
+            raise ValueError(message)
+        return value
+    return check
+
+
+def _gender(value):
+    value = _strip(value).upper()
+    if value not in {'L', 'P'}:
+        raise ValueError("Gender harus 'L' (Laki-laki) atau 'P' (Perempuan)")
+    return value
+
+
+def _class_name(value):
+    value = _strip(value)
+    if not value:
+        raise ValueError('Kelas harus diisi')
+    if len(value) > 20:
+        raise ValueError('Nama kelas maksimal 20 karakter')
+    return value
+
+
+def _birth_date(value):
+    if isinstance(value, date):
+        return value
+    try:
+        return date.fromisoformat(str(value).strip())
+    except (TypeError, ValueError):
+        raise ValueError('Tanggal lahir harus berformat YYYY-MM-DD')
+
+
+def _sks(value):
+    try:
+        value = int(value)
+    except Exception:
+        raise ValueError('SKS harus berupa angka')
+    if value < 1 or value > 6:
+        raise ValueError('SKS harus antara 1 sampai 6')
+    return value
+
+
+def _score(value):
+    try:
+        value = float(value)
+    except Exception:
+        raise ValueError('Nilai harus berupa angka')
+    if not math.isfinite(value) or value < 0 or value > 100:
+        raise ValueError('Nilai harus di antara 0 dan 100')
+    return round(value, 2)
+
+
+def _digits(value) -> str:
+    return _WS_RE.sub('', _strip(value))
+
+
+NIS = PatternField(r'\d{10}', 'NIS harus 10 digit angka')
+NIP = PatternField(r'\d{8,18}', 'NIP harus 8-18 digit angka')
+PARENT_PHONE = PatternField(r'\d{8,15}', 'Nomor telepon orang tua harus 8-15 digit', normalize=_digits, empty='none')
+PHONE = PatternField(r'\d{8,15}', 'Nomor telepon harus 8-15 digit', normalize=_digits, empty='blank')
+SUBJECT_CODE = PatternField(r'[A-Z0-9_\-]{2,12}', 'Kode mata pelajaran harus 2-12 karakter (A-Z, 0-9, _ atau -)',
+                            normalize=lambda v: _strip(v).upper())
+PERSON_NAME = Field(_min_length(3, 'Nama minimal 3 karakter'))
+SUBJECT_NAME = Field(_min_length(2, 'Nama mata pelajaran minimal 2 karakter'))
+GENDER = Field(_gender)
+CLASS_NAME = Field(_class_name)
+BIRTH_DATE = Field(_birth_date)
+ADDRESS = Field(_strip)
+SKS = Field(_sks)
+SCORE = Field(_score)
+
+STUDENT_COLUMNS = {
+    'nis': NIS, 'name': PERSON_NAME, 'birth_date': BIRTH_DATE, 'address': ADDRESS,
+    'gender': GENDER, 'parent_phone': PARENT_PHONE, 'class_name': CLASS_NAME,
+}
+GRADE_SHEET_COLUMNS = {'nis': NIS, 'tugas': SCORE, 'uts': SCORE, 'uas': SCORE}
+
+
+def validate_rows(rows, columns: dict, max_errors: int = 100):
+    """Validate a batch of row dicts column-wise against ``columns`` (name -> Field).
+
+    Returns (cleaned rows, errors); errors are ``{'row', 'field', 'error'}``
+    sorted by row, at most ``max_errors``, and no rows are returned when any
+    row is invalid.
+    """
+    if not isinstance(rows, list) or not all(isinstance(r, dict) for r in rows):
+        raise ValueError('rows harus berupa list objek')
+    unknown = set().union(*rows) - set(columns)
+    if unknown:
+        raise ValueError(f"Field tidak dikenal: {', '.join(sorted(unknown))}")
+
+    names = list(columns)
+    cleaned_columns, errors = [], []
+    for name in names:
+        cleaned, bad = columns[name].column([r.get(name) for r in rows])
+        cleaned_columns.append(cleaned)
+        errors.extend({'row': i, 'field': name, 'error': msg} for i, msg in bad.items())
+    if errors:
+        errors.sort(key=lambda e: e['row'])
+        return [], errors[:max_errors]
+    return [dict(zip(names, values)) for values in zip(*cleaned_columns)], []
@@ -0,0 +1,78 @@
+"""Change counters for the per-worker caches of rarely changing tables.
+
+Workers revalidate their reference-data and scoring-policy snapshots with a
+cheap version query. Row counts and ``max(updated_at)`` alone miss an edit
+made within the same second as the newest ``updated_at`` a snapshot saw
+(``DATETIME`` has second precision on MySQL), which would keep the stale
+snapshot until some unrelated write. So every transaction that writes a
+tracked table also increments a counter row in ``cache_versions``, in the
+same transaction: ORM flushes as well as bulk statements. A cache includes
+``version_of(name)`` in its version and sees every committed change within
+its TTL.
+"""
+from sqlalchemy import event, select
+
+from siakad_app.extensions import db
+from siakad_app.models.cache_version import CacheVersion
+from siakad_app.utils.tenancy import current_tenant
+from siakad_app.utils.upsert import upsert_statement
+
+_SESSION_KEY = 'cache_versions_bumped'
+
+
+def version_of(name: str):
+    """Scalar subquery of the counter ``name`` of the current tenant (NULL before the first write)."""
+    return select(CacheVersion.version).where(CacheVersion.name == name).scalar_subquery()
+
+
+class CacheVersions:
+    def __init__(self):
+        self._tracked = {}  # name -> (models, touches(obj, deleted) or None)
+        self._listening = False
+
+    def track(self, name: str, models, touches=None):
+        """Bump ``name`` whenever ``models`` are written; ``touches`` narrows which ORM changes count."""
+        self._tracked[name] = (tuple(models), touches)
+
+    def init_app(self, app):
+        if not self._listening:
+            event.listen(db.session, 'after_flush', self._after_flush)
+            event.listen(db.session, 'do_orm_execute', self._do_orm_execute)
+            event.listen(db.session, 'after_commit', self._clear)
+            event.listen(db.session, 'after_rollback', self._clear)
+            self._listening = True
+
+    def bump(self, session, name: str):
+        """Increment ``name`` once per transaction, in that transaction."""
+        bumped = session.info.setdefault(_SESSION_KEY, set())
+        if name in bumped:
+            return
+        bumped.add(name)
+        table = CacheVersion.__table__
+        connection = session.connection()
+        stmt = upsert_statement(connection.dialect.name, table,
+                                [{'tenant_id': current_tenant(), 'name': name, 'version': 1}],
+                                keys=('tenant_id', 'name'), update={'version': table.c.version + 1})
+        # Core on the session's connection: allowed inside flush events and not itself tracked
+        connection.execute(stmt)
+
+    # -- session hooks -------------------------------------------------------
+
+    def _after_flush(self, session, flush_context):
+        for name, (models, touches) in self._tracked.items():
+            for objects, deleted in ((session.new, False), (session.dirty, False), (session.deleted, True)):
+                if any(isinstance(o, models) and (touches is None or touches(o, deleted)) for o in objects):
+                    self.bump(session, name)
+                    break
+
+    def _do_orm_execute(self, state):
+        if (state.is_insert or state.is_update or state.is_delete) and state.bind_mapper is not None:
+            for name, (models, _) in self._tracked.items():
+                if state.bind_mapper.class_ in models:
+                    self.bump(state.session, name)
+
+    def _clear(self, session):
+        session.info.pop(_SESSION_KEY, None)
+
+
+cache_versions = CacheVersions()
@@ -0,0 +1,62 @@
+"""Pre-fork warmup for gunicorn ``preload_app`` (see gunicorn.conf.py).
+
+With ``preload_app`` the master imports the app once: modules, SQLAlchemy
+metadata and ``db.create_all`` run a single time instead of once per worker.
+``prefork`` then fills the read-only caches every worker needs, the
+reference data (subjects, teachers and class names) and the compiled
+scoring policy of every configured tenant, and the report templates. Workers inherit these objects copy-on-write. Finally it
+closes the master's database connections, which must never be shared with
+children, and moves every object into the permanent GC generation
+(``gc.freeze``) so collections in the workers do not write to, and thereby
+copy, the shared pages.
+
+A worker keeps the inherited snapshot until the data changes (see
+``utils.refdata``); only then does it build a private copy.
+"""
+import gc
+import logging
+import time
+
+from siakad_app.extensions import db
+from siakad_app.utils.refdata import refdata
+from siakad_app.utils.scoring import scoring_policy
+from siakad_app.utils.tenancy import tenancy, tenant_context
+
+logger = logging.getLogger(__name__)
+
+TEMPLATES = ('index.html', 'reports/class_report.html')
+
+
+def prefork(app) -> dict:
+    """Warm the shared caches in the master, close its connections and freeze the heap."""
+    started = time.perf_counter()
+    warmed = []
+    with app.app_context():
+        for tenant in sorted(tenancy.tenants):
+            try:
+                with tenant_context(tenant):
+                    data = refdata()
+                    scoring_policy()
+                warmed.append(f'{tenant} ({len(data.subjects)} subjects)')
+            except Exception as e:
+                # A school whose database is down must not keep the others from starting
+                logger.warning(f"Warmup skipped tenant {tenant}: {e}")
+            finally:
+                db.session.remove()
+        for name in TEMPLATES:
+            app.jinja_env.get_template(name)
+        db.engine.dispose()
+    tenancy.engines.dispose_all()
+    gc.collect()
+    gc.freeze()
+    stats = {'tenants': warmed, 'frozen_objects': gc.get_freeze_count(),
+             'seconds': round(time.perf_counter() - started, 3)}
+    logger.info(f"Pre-fork warmup done: {stats}")
+    return stats
+
+
+def postfork(app):
+    """In a new worker: start with an empty connection pool of its own."""
+    with app.app_context():
+        # close=False: the sockets belong to the master; just forget them
+        db.engine.dispose(close=False)
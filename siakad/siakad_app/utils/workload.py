@@ -0,0 +1,158 @@
+"""Per-teacher workload: grade-entry completeness and averages of every owned subject.
+
+``teacher_workload`` answers with one grouped query: grades of the
+teacher's subjects joined to their students and to the size of each
+student's class, grouped by subject and class. A subject's *enrolled*
+students are the students of the classes that have at least one grade in
+it, since the schema has no enrollment table.
+
+Results are cached per worker by (tenant, teacher, term) together with the
+teacher's subjects, read from the database on every call, and the
+reference-data and scoring-policy versions, so a change of subject
+ownership or weights is a cache miss. Commits on this worker that touch the
+grades of a subject drop the entries that include it; commits that add,
+remove or move students drop the whole tenant. Grade writes made by other
+workers are seen within ``WORKLOAD_CACHE_TTL`` seconds.
+"""
+import threading
+import time
+from sqlalchemy import distinct, event, func, inspect, select
+
+from siakad_app.extensions import db
+from siakad_app.models import Grade, GradeArchive, Student, Subject
+from siakad_app.utils.archive import term_source
+from siakad_app.utils.refdata import owned_subjects, refdata
+from siakad_app.utils.scoring import scoring_policy
+from siakad_app.utils.tenancy import current_tenant
+
+_SESSION_KEY = 'workload_dirty'
+_ALL = object()
+
+
+def _avg(total, count):
+    return round(total / count, 2) if count else None
+
+
+def _summarize(ref, teacher_id, term, subjects):
+    items = {s.id: {**s._asdict(), 'classes': [], 'enrolled': 0, 'graded': 0, '_n': 0,
+                    '_sums': [0.0, 0.0, 0.0, 0.0]} for s in subjects}
+    if items:
+        policy = scoring_policy()
+        source = term_source(term)
+        sizes = (select(Student.class_name, func.count(Student.id).label('enrolled'))
+                 .group_by(Student.class_name).subquery('sizes'))
+        stmt = (
+            select(source.c.subject_id, Student.class_name, sizes.c.enrolled,
+                   func.count(distinct(source.c.student_id)), func.count(),
+                   func.sum(source.c.tugas), func.sum(source.c.uts), func.sum(source.c.uas),
+                   func.sum(policy.sql_final(source.c)))
+            .join(Student, Student.id == source.c.student_id)
+            .join(sizes, sizes.c.class_name == Student.class_name)
+            .where(source.c.subject_id.in_(items))
+            .group_by(source.c.subject_id, Student.class_name, sizes.c.enrolled)
+            .order_by(source.c.subject_id, Student.class_name)
+        )
+        for subject_id, class_name, enrolled, graded, n, *sums in db.session.execute(stmt):
+            item = items[subject_id]
+            item['classes'].append({'class_name': class_name, 'enrolled': enrolled, 'graded': graded})
+            item['enrolled'] += enrolled
+            item['graded'] += graded
+            item['_n'] += n
+            item['_sums'] = [a + float(b or 0) for a, b in zip(item['_sums'], sums)]
+
+    result, enrolled, graded = [], 0, 0
+    for item in items.values():
+        n, sums = item.pop('_n'), item.pop('_sums')
+        item['completeness'] = round(item['graded'] / item['enrolled'], 4) if item['enrolled'] else None
+        item['averages'] = dict(zip(('tugas', 'uts', 'uas', 'final'), (_avg(total, n) for total in sums)))
+        enrolled += item['enrolled']
+        graded += item['graded']
+        result.append(item)
+    return {
+        'teacher': ref.teachers_by_id[teacher_id]._asdict() if teacher_id in ref.teachers_by_id else None,
+        'term': term,
+        'subjects': result,
+        'totals': {'subjects': len(result), 'enrolled': enrolled, 'graded': graded,
+                   'completeness': round(graded / enrolled, 4) if enrolled else None},
+    }
+
+
+class WorkloadCache:
+    def __init__(self):
+        self.ttl = 60.0
+        self._entries = {}  # (tenant, teacher, term) -> (versions, subject ids, payload, stored at)
+        self._lock = threading.Lock()
+        self._listening = False
+
+    def init_app(self, app):
+        self.ttl = app.config.get('WORKLOAD_CACHE_TTL', 60.0)
+        if not self._listening:
+            event.listen(db.session, 'after_flush', self._after_flush)
+            event.listen(db.session, 'do_orm_execute', self._do_orm_execute)
+            event.listen(db.session, 'after_commit', self._after_commit)
+            event.listen(db.session, 'after_rollback', self._after_rollback)
+            self._listening = True
+
+    def get(self, teacher_id: int, term: str) -> dict:
+        ref = refdata()
+        key = (current_tenant(), teacher_id, term)
+        # Ownership is read live; the snapshot may lag a reassignment made on another worker
+        subjects = owned_subjects(teacher_id)
+        versions = (ref.version, scoring_policy().version, subjects)
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == versions and time.monotonic() - entry[3] < self.ttl:
+            return entry[2]
+        payload = _summarize(ref, teacher_id, term, subjects)
+        subject_ids = frozenset(s['id'] for s in payload['subjects'])
+        with self._lock:
+            self._entries[key] = (versions, subject_ids, payload, time.monotonic())
+        return payload
+
+    def touch(self, *subject_ids, session=None):
+        """Mark grades of ``subject_ids`` as changed; applied when the session commits.
+
+        For writes that bypass the ORM unit of work, e.g. Core upserts.
+        """
+        info = (session or db.session()).info
+        if info.get(_SESSION_KEY) is not _ALL:
+            info.setdefault(_SESSION_KEY, set()).update(subject_ids)
+
+    def invalidate(self, subject_ids=_ALL):
+        tenant = current_tenant()
+        with self._lock:
+            for key, entry in list(self._entries.items()):
+                if key[0] == tenant and (subject_ids is _ALL or entry[1] & subject_ids):
+                    del self._entries[key]
+
+    # -- write-path invalidation ---------------------------------------------
+
+    def _after_flush(self, session, flush_context):
+        for obj in (*session.new, *session.dirty, *session.deleted):
+            if isinstance(obj, (Grade, GradeArchive)):
+                self.touch(obj.subject_id, *inspect(obj).attrs.subject_id.history.deleted, session=session)
+            elif isinstance(obj, Subject):
+                self.touch(obj.id, session=session)
+            elif isinstance(obj, Student) and (obj in session.new or obj in session.deleted
+                                               or inspect(obj).attrs.class_name.history.has_changes()):
+                session.info[_SESSION_KEY] = _ALL
+
+    def _do_orm_execute(self, state):
+        # Bulk statements on the ORM entities; the affected subjects are unknown
+        if (state.is_insert or state.is_update or state.is_delete) and state.bind_mapper is not None \
+                and state.bind_mapper.class_ in (Grade, GradeArchive, Student):
+            state.session.info[_SESSION_KEY] = _ALL
+
+    def _after_commit(self, session):
+        dirty = session.info.pop(_SESSION_KEY, None)
+        if dirty:
+            self.invalidate(dirty)
+
+    def _after_rollback(self, session):
+        session.info.pop(_SESSION_KEY, None)
+
+
+workload_cache = WorkloadCache()
+
+
+def teacher_workload(teacher_id: int, term: str) -> dict:
+    return workload_cache.get(teacher_id, term)
@@ -0,0 +1,61 @@
+from conftest import add_subject, add_teacher, put_grade
+from siakad_app.extensions import db
+from siakad_app.models import GradeHistory
+from siakad_app.utils.audit import grade_audit
+from siakad_app.utils.tenancy import tenant_context
+
+
+def _history(api, **params):
+    r = api.get('/grades/history', query_string=params)
+    assert r.status_code == 200, r.get_json()
+    return r.get_json()
+
+
+def test_history_records_create_update_and_delete(admin):
+    sid = add_subject(admin)
+    grade = put_grade(admin, 1, sid, 70)
+    assert admin.patch(f'/grades/{grade["id"]}', json={'uas': 90}).status_code == 200
+    # A write that changes nothing leaves no history row
+    assert admin.patch(f'/grades/{grade["id"]}', json={'uas': 90}).status_code == 200
+    assert admin.delete(f'/subjects/{sid}').status_code == 200
+
+    items = _history(admin, student_id=1)['items']
+    assert [i['action'] for i in items] == ['DELETE', 'UPDATE', 'CREATE']
+    assert items[1]['uas'] == 90.0 and items[1]['prev']['uas'] == 70.0
+    assert items[0]['prev'] == {'tugas': 70.0, 'uts': 70.0, 'uas': 90.0}
+    assert items[2]['changed_by'] == 1
+
+
+def test_events_are_buffered_until_flush(app, admin):
+    put_grade(admin, 1, add_subject(admin), 70)
+    assert grade_audit.pending() == 1
+    with app.app_context(), tenant_context('sman1'):
+        assert db.session.query(GradeHistory).count() == 0
+        assert grade_audit.flush() == 1
+        assert db.session.query(GradeHistory).count() == 1
+    assert grade_audit.pending() == 0
+
+
+def test_rejected_write_records_nothing(admin):
+    grade = put_grade(admin, 1, add_subject(admin), 70)
+    assert admin.patch(f'/grades/{grade["id"]}', json={'tugas': 80, 'uts': 101}).status_code == 400
+    assert [i['action'] for i in _history(admin, student_id=1)['items']] == ['CREATE']
+
+
+def test_history_is_keyset_paginated(admin):
+    grade = put_grade(admin, 1, add_subject(admin), 50)
+    for score in range(51, 56):
+        admin.patch(f'/grades/{grade["id"]}', json={'tugas': score})
+    page = _history(admin, student_id=1, limit=4)
+    assert len(page['items']) == 4 and page['next_before_id'] == page['items'][-1]['id']
+    rest = _history(admin, student_id=1, limit=4, before_id=page['next_before_id'])
+    assert [i['action'] for i in rest['items']] == ['UPDATE', 'CREATE'] and rest['next_before_id'] is None
+
+
+def test_teacher_reads_only_own_subject_history(admin):
+    teacher_id, teacher = add_teacher(admin, username='guru1')
+    own = add_subject(admin, 'MAT101', teacher_id)
+    other = add_subject(admin, 'BIO101')
+    assert teacher.get('/grades/history', query_string={'subject_id': own}).status_code == 200
+    assert teacher.get('/grades/history', query_string={'subject_id': other}).status_code == 403
+    assert teacher.get('/grades/history', query_string={'student_id': 1}).status_code == 403
@@ -0,0 +1,41 @@
+from conftest import add_teacher, login
+
+
+def _names(response):
+    return [[s['name'] for s in r['body']['items']] for r in response.get_json()['responses']]
+
+
+def test_every_sub_request_runs_as_the_batch_tenant(client):
+    paths = [{'path': '/students/'}, {'path': '/students/'}, {'path': '/students/?class_name=7A'}]
+    for tenant in ('sman1', 'smpn2'):
+        r = client.post('/batch', json={'requests': paths}, headers=login(client, tenant),
+                        base_url=f'http://{tenant}.test')
+        assert r.status_code == 200
+        assert _names(r) == [[f'Siswa {tenant}']] * len(paths)
+
+
+def test_batch_tenant_does_not_outlive_the_request(client):
+    headers = login(client, 'sman1')
+    client.post('/batch', json={'requests': [{'path': '/students/'}] * 2}, headers=headers,
+                base_url='http://sman1.test')
+    r = client.get('/students/', headers=login(client, 'smpn2'), base_url='http://smpn2.test')
+    assert [s['name'] for s in r.get_json()['items']] == ['Siswa smpn2']
+
+
+def test_invalid_batches_are_rejected(admin):
+    assert admin.post('/batch', json={'requests': []}).status_code == 400
+    assert admin.post('/batch', json={'requests': [{'path': '/students/'}] * 21}).status_code == 400
+    r = admin.post('/batch', json={'requests': [{'path': 'students/'}, {'path': '/students/', 'method': 'POST'}]})
+    assert r.status_code == 400
+    assert set(r.get_json()['messages']) == {'0', '1'}
+
+
+def test_sub_requests_keep_their_order_and_own_checks(admin):
+    _, teacher = add_teacher(admin, username='guru')
+    paths = ['/students/', '/grades/write-buffer', '/students/999', '/readyz', '/events/stream']
+    r = teacher.post('/batch', json={'requests': [{'path': p} for p in paths]})
+    assert r.status_code == 200
+    responses = r.get_json()['responses']
+    assert [x['path'] for x in responses] == paths
+    # The admin-only endpoint is refused to the teacher; excluded blueprints never run
+    assert [x['status'] for x in responses] == [200, 403, 404, 400, 400]
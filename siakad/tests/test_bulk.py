@@ -0,0 +1,78 @@
+import pytest
+
+from conftest import login
+
+BASE = 'http://sman1.test'
+
+
+def _teacher(client, headers):
+    r = client.post('/teachers/', json={'nip': '1234567890', 'name': 'Budi Santoso', 'address': 'Jl. Mawar'},
+                    headers=headers, base_url=BASE)
+    assert r.status_code == 201, r.get_json()
+    return r.get_json()['id']
+
+
+@pytest.mark.parametrize('address', [12345, ['Jl. Melati'], {'street': 'Melati'}])
+def test_teacher_bulk_update_validates_address_like_single_writes(client, address):
+    headers = login(client, 'sman1')
+    tid = _teacher(client, headers)
+    r = client.post('/teachers/bulk-update', json={'filter': {'ids': [tid]}, 'set': {'address': address}},
+                    headers=headers, base_url=BASE)
+    assert r.status_code == 400
+    assert r.get_json()['error'] == 'Nilai harus berupa teks'
+
+
+def test_teacher_bulk_update_strips_address(client):
+    headers = login(client, 'sman1')
+    tid = _teacher(client, headers)
+    r = client.post('/teachers/bulk-update', json={'filter': {'ids': [tid]}, 'set': {'address': '  Jl. Melati  '}},
+                    headers=headers, base_url=BASE)
+    assert r.get_json() == {'updated': 1}
+    assert client.get(f'/teachers/{tid}', headers=headers, base_url=BASE).get_json()['address'] == 'Jl. Melati'
+
+
+@pytest.mark.parametrize('endpoint', ['/students/bulk-update', '/students/bulk-delete'])
+@pytest.mark.parametrize('spec', [{'class_name': ['7A']}, {'class_name': {'$ne': '7A'}}, {'class_name': 7},
+                                  {'gender': None}, {'gender': True}])
+def test_student_bulk_filter_rejects_non_scalar_values(client, endpoint, spec):
+    body = {'filter': spec, 'set': {'class_name': '8A'}}
+    r = client.post(endpoint, json=body, headers=login(client, 'sman1'), base_url=BASE)
+    assert r.status_code == 400
+    assert r.get_json()['error'].startswith('Filter ')
+
+
+@pytest.mark.parametrize('spec', [{'teacher_id': '1'}, {'teacher_id': [1]}, {'sks': True}, {'sks': 2.5},
+                                  {'ids': 'abc'}, {'ids': []}, {}, {'code': 'MAT101'}])
+def test_subject_bulk_filter_rejects_invalid_specs(client, spec):
+    r = client.post('/subjects/bulk-update', json={'filter': spec, 'set': {'sks': 3}},
+                    headers=login(client, 'sman1'), base_url=BASE)
+    assert r.status_code == 400
+
+
+def test_bulk_filters_match_scalars_and_null(client):
+    headers = login(client, 'sman1')
+    tid = _teacher(client, headers)
+    for code, teacher_id in (('MAT101', tid), ('BIO101', None)):
+        client.post('/subjects/', json={'code': code, 'name': code, 'sks': 2, 'teacher_id': teacher_id},
+                    headers=headers, base_url=BASE)
+    r = client.post('/subjects/bulk-update', json={'filter': {'teacher_id': None}, 'set': {'sks': 4}},
+                    headers=headers, base_url=BASE)
+    assert r.get_json() == {'updated': 1}
+    r = client.post('/subjects/bulk-update', json={'filter': {'teacher_id': tid, 'sks': 2}, 'set': {'sks': 3}},
+                    headers=headers, base_url=BASE)
+    assert r.get_json() == {'updated': 1}
+    r = client.post('/students/bulk-update', json={'filter': {'class_name': '7A'}, 'set': {'class_name': '8A'}},
+                    headers=headers, base_url=BASE)
+    assert r.get_json() == {'updated': 1}
+
+
+def test_bulk_delete_records_history_of_cascaded_grades(client):
+    headers = login(client, 'sman1')
+    sid = client.post('/subjects/', json={'code': 'MAT101', 'name': 'Matematika', 'sks': 2}, headers=headers,
+                      base_url=BASE).get_json()['id']
+    client.post('/grades/', json={'student_id': 1, 'subject_id': sid, 'tugas': 80, 'uts': 80, 'uas': 80},
+                headers=headers, base_url=BASE)
+    r = client.post('/students/bulk-delete', json={'filter': {'class_name': '7A'}}, headers=headers, base_url=BASE)
+    assert r.get_json() == {'deleted': 1}
+    items = client.get('/grades/history?student_id=1', headers=headers, base_url=BASE).get_json()['items']
+    assert [i['action'] for i in items] == ['DELETE', 'CREATE']
@@ -0,0 +1,66 @@
+from conftest import PASSWORD, login
+from siakad_app.extensions import db
+from siakad_app.models import User
+from siakad_app.utils.archive import archive_term
+from siakad_app.utils.tenancy import tenant_context
+
+BASE = 'http://sman1.test'
+OLD_TERM = '2023/2024-2'
+
+
+def _setup(client, headers):
+    tid = client.post('/teachers/', json={'nip': '1234567890', 'name': 'Budi Santoso'}, headers=headers,
+                      base_url=BASE).get_json()['id']
+    sid = client.post('/subjects/', json={'code': 'MAT101', 'name': 'Matematika', 'sks': 2, 'teacher_id': tid},
+                      headers=headers, base_url=BASE).get_json()['id']
+    for term, score in ((OLD_TERM, 60), ('2024/2025-1', 90)):
+        r = client.post('/grades/', json={'student_id': 1, 'subject_id': sid, 'term': term,
+                                          'tugas': score, 'uts': score, 'uas': score}, headers=headers, base_url=BASE)
+        assert r.status_code in (200, 201), r.get_json()
+    return tid
+
+
+def _register_teacher(client, headers, username, teacher_id):
+    r = client.post('/auth/register', json={'username': username, 'password': 'rahasia123', 'role': 'TEACHER',
+                                            'teacher_id': teacher_id}, headers=headers, base_url=BASE)
+    assert r.status_code == 201, r.get_json()
+    return login(client, 'sman1', username, 'rahasia123')
+
+
+def test_archived_term_is_read_from_the_archive(app, client):
+    headers = login(client, 'sman1')
+    tid = _setup(client, headers)
+    with app.app_context(), tenant_context('sman1'):
+        assert archive_term(OLD_TERM) == 1
+
+    r = client.get(f'/dashboard/avg-by-subject?term={OLD_TERM}', headers=headers, base_url=BASE)
+    assert r.get_json() == [{'code': 'MAT101', 'name': 'Matematika', 'average': 60.0}]
+    r = client.get('/dashboard/avg-by-subject', headers=headers, base_url=BASE)
+    assert r.get_json()[0]['average'] == 90.0
+    r = client.get('/dashboard/avg-by-subject?term=all', headers=headers, base_url=BASE)
+    assert r.get_json()[0]['average'] == 75.0
+
+    teacher = _register_teacher(client, headers, 'guru', tid)
+    summary = client.get(f'/dashboard/summary?term={OLD_TERM}', headers=teacher, base_url=BASE).get_json()
+    assert summary['scope'] == 'teacher'
+    assert summary['stats']['students'] == 1
+    assert summary['averages'] == [{'code': 'MAT101', 'name': 'Matematika', 'average': 60.0}]
+
+
+def test_teacher_without_profile_gets_an_empty_summary(app, client):
+    headers = login(client, 'sman1')
+    _setup(client, headers)
+    # e.g. the teacher row was deleted and users.teacher_id set to NULL
+    with app.app_context(), tenant_context('sman1'):
+        user = User('guru_baru', 'TEACHER')
+        user.set_password(PASSWORD)
+        db.session.add(user)
+        db.session.commit()
+    teacher = login(client, 'sman1', 'guru_baru')
+    summary = client.get('/dashboard/summary', headers=teacher, base_url=BASE).get_json()
+    assert summary['scope'] == 'teacher'
+    assert summary['stats'] == {'students': 0, 'teachers': 0, 'subjects': 0}
+    assert summary['averages'] == []
+
+    admin = client.get('/dashboard/summary', headers=headers, base_url=BASE).get_json()
+    assert admin['scope'] == 'all' and admin['stats']['students'] == 1
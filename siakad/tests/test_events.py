@@ -0,0 +1,87 @@
+import json
+
+import pytest
+
+from conftest import add_subject, add_teacher, put_grade
+from siakad_app.utils.events import ALL, BusFull, EventBus, bus, class_topic, subject_topic
+from siakad_app.utils.tenancy import tenant_context
+
+
+def _frames(sub):
+    frames = []
+    while not sub.queue.empty():
+        frames.append(sub.queue.get_nowait())
+    return frames
+
+
+def _data(frame):
+    return json.loads(frame.split('data: ', 1)[1])
+
+
+def test_events_reach_matching_topics_of_the_same_tenant():
+    events = EventBus()
+    with tenant_context('sman1'):
+        by_subject = events.subscribe([subject_topic(1)])
+        by_class = events.subscribe([class_topic('7A')])
+        everything = events.subscribe([ALL])
+    with tenant_context('smpn2'):
+        other_school = events.subscribe([ALL])
+    with tenant_context('sman1'):
+        events.publish('grade', {'id': 1}, [subject_topic(1)])
+        events.publish('grade', {'id': 2}, [subject_topic(2), class_topic('7A')])
+    assert [_data(f)['id'] for f in _frames(by_subject)] == [1]
+    assert [_data(f)['id'] for f in _frames(by_class)] == [2]
+    assert [_data(f)['id'] for f in _frames(everything)] == [1, 2]
+    assert _frames(other_school) == []
+
+
+def test_subscribers_are_capped_and_released():
+    events = EventBus()
+    events.max_subscribers = 1
+    sub = events.subscribe([ALL])
+    with pytest.raises(BusFull):
+        events.subscribe([ALL])
+    events.unsubscribe(sub)
+    assert events.subscribers == 0 and events._topics == {}
+
+
+def test_slow_subscriber_gets_resync_and_is_dropped():
+    events = EventBus()
+    events.queue_size = 2
+    sub = events.subscribe([ALL])
+    for i in range(3):
+        events.publish('grade', {'id': i})
+    frames = list(events.stream(sub))
+    assert frames[0].startswith('retry: 3000\n: subscribed all')
+    # Queued events are stale once one was lost: the client refetches instead
+    assert _data(frames[1]) == {'id': 0}
+    assert frames[2].startswith('event: resync') and len(frames) == 3
+    assert events.subscribers == 0
+
+
+def test_stream_delivers_grade_writes(admin, monkeypatch):
+    monkeypatch.setattr(bus, 'heartbeat', 0.01)
+    sid = add_subject(admin)
+    before = bus.subscribers
+    r = admin.get(f'/events/stream?subject_id={sid}', buffered=False)
+    assert r.status_code == 200 and r.mimetype == 'text/event-stream'
+    frames = iter(r.response)
+    assert next(frames).startswith(b'retry: 3000')
+    assert next(frames) == b': ping\n\n'
+    put_grade(admin, 1, sid, 80)
+    frame = next(frames).decode()
+    assert 'event: grade' in frame and _data(frame)['final'] == 80.0 and _data(frame)['class_name'] == '7A'
+    r.close()
+    assert bus.subscribers == before
+
+
+def test_teacher_streams_only_owned_subjects(admin):
+    teacher_id, teacher = add_teacher(admin, username='guru1')
+    own = add_subject(admin, 'MAT101', teacher_id)
+    other = add_subject(admin, 'BIO101')
+    assert teacher.get(f'/events/stream?subject_id={other}').status_code == 403
+    r = teacher.get('/events/stream', buffered=False)
+    assert next(iter(r.response)) == f'retry: 3000\n: subscribed {subject_topic(own)}\n\n'.encode()
+    r.close()
+    _, idle = add_teacher(admin, nip='1234567891', username='guru2')
+    assert idle.get('/events/stream').status_code == 404
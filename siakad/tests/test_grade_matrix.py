@@ -0,0 +1,72 @@
+import pytest
+
+from conftest import add_subject, put_grade, seed_students
+from siakad_app.utils import grade_matrix
+from siakad_app.utils.grade_matrix import GradeMatrix, StudentRow
+from siakad_app.utils.scoring import CompiledPolicy, Weights
+
+TERM = '2024/2025-1'
+STUDENTS = [StudentRow(1, '1', 'Ani'), StudentRow(2, '2', 'Budi'), StudentRow(3, '3', 'Citra'),
+            StudentRow(4, '4', 'Dewi')]
+CELLS = [
+    (1, 10, TERM, 80, 80, 80), (1, 20, TERM, 60, 60, 60),
+    (2, 10, TERM, 70, 70, 70), (2, 20, TERM, 70, 70, 70),
+    (3, 20, TERM, 90, 90, 30),
+    (99, 10, TERM, 100, 100, 100),  # not in the class
+]
+
+
+@pytest.fixture(params=['numpy', 'python'])
+def matrix(request, monkeypatch):
+    if request.param == 'python':
+        monkeypatch.setattr(grade_matrix, 'np', None)
+    policy = CompiledPolicy([], Weights(1, 1, 1))
+    policy._by_subject[20] = Weights(1, 1, 2)
+    return GradeMatrix.from_rows(STUDENTS, CELLS, policy)
+
+
+def test_finals_and_aggregates(matrix):
+    assert matrix.shape == (4, 2) and matrix.columns == ((10, TERM), (20, TERM))
+    assert matrix.nbytes == 4 * 2 * 3 * 8 + 4 * 2 + 2 * 3 * 8
+    assert [matrix.row(i) for i in range(4)] == [[80.0, 60.0], [70.0, 70.0], [None, 60.0], [None, None]]
+    assert matrix.as_table(['MAT', 'BIO']) == {1: {'MAT': 80.0, 'BIO': 60.0}, 2: {'MAT': 70.0, 'BIO': 70.0},
+                                               3: {'BIO': 60.0}}
+    assert matrix.student_averages() == [70.0, 70.0, 60.0, None]
+    assert matrix.column_averages() == [75.0, 63.33]
+
+
+def test_ranking_shares_ranks_and_puts_ungraded_last(matrix):
+    assert matrix.ranking() == [(1, 0, 70.0), (1, 1, 70.0), (3, 2, 60.0), (None, 3, None)]
+
+
+def test_column_stats(matrix):
+    assert matrix.column_stats() == [
+        {'count': 2, 'mean': 75.0, 'min': 70.0, 'max': 80.0, 'std': 5.0},
+        {'count': 3, 'mean': 63.33, 'min': 60.0, 'max': 70.0, 'std': 4.71},
+    ]
+
+
+def test_empty_matrix(monkeypatch):
+    for np in (grade_matrix.np, None):
+        monkeypatch.setattr(grade_matrix, 'np', np)
+        matrix = GradeMatrix.from_rows(STUDENTS[:1], [], CompiledPolicy([], Weights(1, 1, 1)))
+        assert matrix.row(0) == [] and matrix.student_averages() == [None] and matrix.column_stats() == []
+        assert matrix.ranking() == [(None, 0, None)]
+
+
+def test_ranking_and_stats_endpoints(app, admin):
+    ids = seed_students(app, 3)
+    mat, bio = add_subject(admin, 'MAT101'), add_subject(admin, 'BIO101')
+    put_grade(admin, ids[0], mat, 90)
+    put_grade(admin, ids[1], mat, 70)
+    put_grade(admin, ids[1], bio, 80)
+
+    ranking = admin.get('/grades/class-ranking?class_name=8A').get_json()['ranking']
+    assert [(r['rank'], r['student']['id'], r['average'], r['subjects']) for r in ranking] == [
+        (1, ids[0], 90.0, 1), (2, ids[1], 75.0, 2), (None, ids[2], None, 0)]
+
+    stats = admin.get('/grades/class-stats?class_name=8A').get_json()
+    assert stats['students'] == 3 and stats['class_average'] == 82.5
+    assert [(s['subject_id'], s['label'], s['count'], s['mean']) for s in stats['subjects']] == [
+        (mat, 'MAT101', 2, 80.0), (bio, 'BIO101', 1, 80.0)]
+    assert admin.get('/grades/class-ranking').status_code == 400
@@ -0,0 +1,94 @@
+import pytest
+
+from conftest import add_subject, add_teacher, put_grade
+from config import Config
+from siakad_app.extensions import db
+from siakad_app.models import Grade
+from siakad_app.utils.grade_writes import grade_writes
+from siakad_app.utils.tenancy import tenant_context
+
+
+@pytest.fixture(autouse=True)
+def coalescing(monkeypatch):
+    # Before the app fixture: init_app reads the window and registers its hook on the new app
+    monkeypatch.setattr(Config, 'GRADE_COALESCE_WINDOW', 60.0)
+    for name in ('app', 'window', '_listening', '_entries', '_counts'):
+        monkeypatch.setattr(grade_writes, name, getattr(grade_writes, name))
+    grade_writes._listening = False
+    grade_writes._entries = {}
+    grade_writes._counts = {'edits': 0, 'rows': 0, 'commits': 0, 'failed': 0}
+    # Tests flush explicitly; the writer thread would outlive the window once it is reset
+    monkeypatch.setattr(grade_writes, '_ensure_writer', lambda: None)
+
+
+def _stored(app, grade_id):
+    with app.app_context(), tenant_context('sman1'):
+        g = db.session.get(Grade, grade_id)
+        return g.tugas, g.uts, g.uas
+
+
+@pytest.fixture
+def grade(admin):
+    teacher_id, teacher = add_teacher(admin, username='guru')
+    grade = put_grade(admin, 1, add_subject(admin, teacher_id=teacher_id), 70)
+    return grade['id'], teacher
+
+
+def test_patches_merge_into_one_write(app, admin, grade):
+    grade_id, teacher = grade
+    assert teacher.patch(f'/grades/{grade_id}', json={'tugas': 80}).get_json()['tugas'] == 80.0
+    assert teacher.patch(f'/grades/{grade_id}', json={'uts': 85}).get_json()['uts'] == 85.0
+    r = teacher.patch(f'/grades/{grade_id}', json={'uas': 90, 'tugas': 82})
+    assert r.status_code == 200
+    assert {k: r.get_json()[k] for k in ('tugas', 'uts', 'uas')} == {'tugas': 82.0, 'uts': 85.0, 'uas': 90.0}
+    assert _stored(app, grade_id) == (70.0, 70.0, 70.0)
+
+    # The admin has no buffered edits, so reading the stats does not flush the teacher's
+    stats = admin.get('/grades/write-buffer').get_json()
+    assert stats['enabled'] and stats['pending'] == 1 and stats['edits'] == 3 and stats['commits'] == 0
+
+    assert grade_writes.flush() == 1
+    assert _stored(app, grade_id) == (82.0, 85.0, 90.0)
+    stats = admin.get('/grades/write-buffer').get_json()
+    assert (stats['pending'], stats['rows'], stats['commits'], stats['commits_saved']) == (0, 1, 1, 2)
+
+    items = admin.get('/grades/history', query_string={'student_id': 1}).get_json()['items']
+    assert [i['action'] for i in items] == ['UPDATE', 'CREATE']
+    assert items[0]['uas'] == 90.0 and items[0]['prev'] == {'tugas': 70.0, 'uts': 70.0, 'uas': 70.0}
+    # Users 1 and 2 are the tenant admins
+    assert items[0]['changed_by'] == 3
+
+
+def test_own_reads_see_buffered_edits(app, grade):
+    grade_id, teacher = grade
+    teacher.patch(f'/grades/{grade_id}', json={'uas': 95})
+    r = teacher.get('/grades/student/1')
+    assert r.status_code == 200
+    assert [g['uas'] for g in r.get_json()] == [95.0]
+    assert grade_writes.pending() == 0
+    assert _stored(app, grade_id)[2] == 95.0
+
+
+def test_other_writes_flush_the_buffer_first(app, admin, grade):
+    grade_id, teacher = grade
+    teacher.patch(f'/grades/{grade_id}', json={'tugas': 60})
+    add_subject(admin, code='FIS101')
+    assert grade_writes.pending() == 0
+    assert _stored(app, grade_id)[0] == 60.0
+
+
+def test_buffered_patch_is_validated(admin, grade):
+    grade_id, teacher = grade
+    assert teacher.patch('/grades/999', json={'uas': 90}).status_code == 404
+    assert teacher.patch(f'/grades/{grade_id}', json={'uas': 101}).status_code == 400
+    _, stranger = add_teacher(admin, nip='9876543210', username='guru2')
+    assert stranger.patch(f'/grades/{grade_id}', json={'uas': 90}).status_code == 403
+    assert grade_writes.pending() == 0
+
+
+def test_without_a_window_edits_write_through(app, admin, monkeypatch):
+    monkeypatch.setattr(grade_writes, 'window', 0.0)
+    grade = put_grade(admin, 1, add_subject(admin), 70)
+    assert admin.patch(f'/grades/{grade["id"]}', json={'uas': 90}).status_code == 200
+    assert grade_writes.pending() == 0
+    assert _stored(app, grade['id'])[2] == 90.0
@@ -0,0 +1,95 @@
+from sqlalchemy import event
+
+from conftest import add_subject, add_teacher, put_grade, seed_students
+from siakad_app.extensions import db
+
+
+def _row(nis, score):
+    return {'nis': nis, 'tugas': score, 'uts': score, 'uas': score}
+
+
+def _sync(api, sid, rows, query='', **body):
+    return api.post(f'/grades/subject/{sid}/sync{query}', json={'rows': rows, **body})
+
+
+def _writes(app, fn):
+    """Run ``fn`` and return the data-changing statements it sent to the database."""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.split(None, 1)[0].upper() in ('INSERT', 'UPDATE', 'DELETE'):
+            statements.append(statement)
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        result = fn()
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+    return result, statements
+
+
+def test_sync_writes_only_changed_rows(app, admin):
+    seed_students(app, 3)
+    sid = add_subject(admin)
+    rows = [_row('2024100000', 80), _row('2024100001', 70)]
+    body = _sync(admin, sid, rows).get_json()
+    assert (body['applied'], body['created'], body['updated'], body['unchanged']) == (True, 2, 0, 0)
+
+    # Unchanged sheet: one SELECT, nothing written
+    r, writes = _writes(app, lambda: _sync(admin, sid, [_row('2024100000', 80.001), _row('2024100001', 70)]))
+    assert r.get_json()['applied'] is False and r.get_json()['unchanged'] == 2 and writes == []
+
+    body = _sync(admin, sid, [_row('2024100000', 80), _row('2024100001', 75), _row('2024100002', 50)]).get_json()
+    assert (body['created'], body['updated'], body['unchanged']) == (1, 1, 1)
+    assert body['changes'][0] == {'nis': '2024100001', 'student_id': body['changes'][0]['student_id'],
+                                  'op': 'update', 'before': {'tugas': 70.0, 'uts': 70.0, 'uas': 70.0},
+                                  'after': {'tugas': 75.0, 'uts': 75.0, 'uas': 75.0}}
+    grades = admin.get(f'/grades/subject/{sid}').get_json()
+    assert sorted(g['tugas'] for g in grades) == [50.0, 75.0, 80.0]
+
+
+def test_delete_missing_and_dry_run(app, admin):
+    ids = seed_students(app, 2)
+    sid = add_subject(admin)
+    put_grade(admin, ids[0], sid, 80)
+    put_grade(admin, ids[1], sid, 70)
+    put_grade(admin, 1, sid, 60)
+
+    sheet = [_row('2024100000', 85)]
+    preview = _sync(admin, sid, sheet, '?dry_run=1', delete_missing=True).get_json()
+    assert (preview['applied'], preview['updated'], preview['deleted']) == (False, 1, 2)
+    assert len(admin.get(f'/grades/subject/{sid}').get_json()) == 3
+
+    assert _sync(admin, sid, sheet, delete_missing=True).get_json()['deleted'] == 2
+    assert [g['tugas'] for g in admin.get(f'/grades/subject/{sid}').get_json()] == [85.0]
+    actions = [i['action'] for i in admin.get(f'/grades/history?subject_id={sid}').get_json()['items']]
+    assert sorted(actions[:3]) == ['DELETE', 'DELETE', 'UPDATE']
+
+
+def test_sync_into_a_given_term(app, admin):
+    sid = add_subject(admin)
+    body = _sync(admin, sid, [_row('2023000001', 90)], term='2023/2024-2').get_json()
+    assert body['term'] == '2023/2024-2' and body['created'] == 1
+    assert admin.get(f'/grades/subject/{sid}').get_json() == []
+    assert _sync(admin, sid, [_row('2023000001', 90)], term='2023/2024-9').status_code == 400
+
+
+def test_invalid_sheets_write_nothing(app, admin):
+    sid = add_subject(admin)
+    for rows in ([_row('2023000001', 101)], [_row('2023000001', 90), _row('2023000001', 80)],
+                 [_row('2023000001', 90), _row('2023000002', 80)]):
+        r = _sync(admin, sid, rows)
+        assert r.status_code == 400 and r.get_json()['errors']
+    # 2023000002 is the other school's student
+    assert _sync(admin, sid, [_row('2023000001', 90), _row('2023000002', 80)]).get_json()['errors'] == ['2023000002']
+    assert _sync(admin, sid, []).status_code == 400
+    assert _sync(admin, 99, [_row('2023000001', 90)]).status_code == 404
+    assert admin.get(f'/grades/subject/{sid}').get_json() == []
+
+
+def test_teacher_syncs_only_own_subjects(admin):
+    teacher_id, teacher = add_teacher(admin, username='guru1')
+    own, other = add_subject(admin, 'MAT101', teacher_id), add_subject(admin, 'BIO101')
+    assert _sync(teacher, own, [_row('2023000001', 90)]).get_json()['created'] == 1
+    assert _sync(teacher, other, [_row('2023000001', 90)]).status_code == 403
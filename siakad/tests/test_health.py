@@ -0,0 +1,83 @@
+import pytest
+
+from conftest import add_subject, put_grade
+from siakad_app.utils.health import ErrorWindow, health
+from siakad_app.utils.ratelimit import MemoryBackend, limiter
+
+
+@pytest.fixture
+def fresh(monkeypatch):
+    # Run the checks on every probe instead of serving the cached report
+    monkeypatch.setattr(health, 'cache_seconds', 0)
+    return health
+
+
+def test_probes(client, fresh):
+    assert client.get('/healthz').get_json() == {'status': 'ok'}
+    r = client.get('/readyz')
+    assert r.status_code == 200 and r.headers['Cache-Control'] == 'no-store'
+    body = r.get_json()
+    assert body['status'] == 'ready' and set(body['checks']) == {'database', 'queue', 'errors'}
+    assert body['checks']['database']['ok'] and body['checks']['queue'] == {'ok': True, 'pending': 0}
+
+
+def test_readiness_is_cached(app, monkeypatch):
+    monkeypatch.setattr(health, 'cache_seconds', 60)
+    with app.app_context():
+        first = health.readiness()
+        assert health.readiness() is first
+
+
+def test_explicit_not_ready(client, fresh):
+    fresh.mark_not_ready('maintenance', seconds=30)
+    r = client.get('/readyz')
+    assert r.status_code == 503 and r.get_json() == {'status': 'not ready', 'reason': 'maintenance'}
+    assert 29 <= int(r.headers['Retry-After']) <= 30
+    fresh.mark_ready()
+    assert client.get('/readyz').status_code == 200
+
+
+def test_audit_backlog_fails_readiness(client, admin, fresh, monkeypatch):
+    put_grade(admin, 1, add_subject(admin), 80)
+    monkeypatch.setattr(fresh, 'max_pending', 0)
+    r = client.get('/readyz')
+    assert r.status_code == 503 and r.get_json()['reason'] == 'queue'
+
+
+def test_sustained_shedding_takes_the_worker_out(client, admin, fresh, monkeypatch):
+    monkeypatch.setattr(limiter, 'enabled', True)
+    monkeypatch.setattr(limiter, 'backend', MemoryBackend())
+    monkeypatch.setattr(limiter, 'gates', {})
+    gate = limiter.gate('grades.class_stats', 1, queue_timeout=0)
+    assert gate.acquire()
+
+    # One rejected burst on an idle worker is below READY_MIN_REQUESTS
+    assert [admin.get('/grades/class-stats?class_name=7A').status_code for _ in range(5)] == [429] * 5
+    assert client.get('/readyz').status_code == 200
+    for _ in range(15):
+        admin.get('/subjects/')
+    # 6 of 21 requests shed: above READY_MAX_SHED_RATE
+    assert admin.get('/grades/class-stats?class_name=7A').status_code == 429
+    r = client.get('/readyz')
+    assert r.status_code == 503 and r.get_json()['reason'] == 'overloaded: grades.class_stats'
+    gate.release()
+
+
+def test_probes_do_not_count_towards_the_error_rate(client, fresh):
+    fresh.mark_not_ready('maintenance')
+    for _ in range(30):
+        assert client.get('/readyz').status_code == 503
+    assert fresh.errors.totals() == (0, 0)
+
+
+def test_error_window_slides(monkeypatch):
+    window = ErrorWindow(2)
+    clock = [100.0]
+    monkeypatch.setattr('siakad_app.utils.health.time.time', lambda: clock[0])
+    window.record(True)
+    window.record(False)
+    clock[0] = 101.0
+    window.record(False)
+    assert window.totals() == (3, 1)
+    clock[0] = 102.0
+    assert window.totals() == (1, 0)
@@ -0,0 +1,37 @@
+from siakad_app.extensions import db
+from siakad_app.utils import index_advisor
+from siakad_app.utils.tenancy import tenant_context
+
+
+def test_problems_in_sqlite_and_mysql_plans():
+    plan = ['SCAN students', 'SEARCH grades USING INDEX ix_grades_student (student_id=?)',
+            'SCAN subjects USING COVERING INDEX ix_subjects_name', 'USE TEMP B-TREE FOR ORDER BY']
+    assert index_advisor._problems('sqlite', plan) == [('students', 'full scan'), (None, 'sort without index')]
+    plan = [{'table': 'students', 'type': 'ALL', 'Extra': 'Using where; Using filesort'},
+            {'table': 'grades', 'type': 'ref', 'Extra': None}]
+    assert index_advisor._problems('mysql', plan) == [('students', 'full scan'), ('students', 'sort without index')]
+
+
+def test_suggest_puts_filters_before_sort_columns():
+    statement = ('SELECT students.id FROM students WHERE students.class_name = ? AND students.name LIKE ? '
+                 'ORDER BY students.name LIMIT ?')
+    assert index_advisor._suggest(statement, 'students', {}) == ('class_name', 'name')
+    # An existing index with the same leading columns already serves it
+    assert index_advisor._suggest(statement, 'students', {'students': [['class_name', 'name', 'id']]}) is None
+    assert index_advisor._suggest('SELECT students.id FROM students WHERE students.id = ?', 'students', {}) is None
+    assert (index_advisor.create_index_sql('students', ('class_name', 'name'))
+            == 'CREATE INDEX ix_students_class_name_name ON students (class_name, name);')
+
+
+def test_shipped_indexes_cover_the_get_endpoints(app):
+    with app.app_context(), tenant_context('sman1'):
+        with index_advisor.QueryCapture(db.engine) as capture:
+            visited = index_advisor.exercise_routes(app, capture)
+        # Plus a lookup nothing indexes, with a shorter variant that the longer one absorbs
+        capture.queries[('x', 'SELECT students.id FROM students WHERE students.parent_phone = ?')] = ('0811',)
+        capture.queries[('y', 'SELECT students.id FROM students WHERE students.parent_phone = ? '
+                              'ORDER BY students.gender')] = ('0811',)
+        findings, suggestions = index_advisor.analyze(capture)
+    assert len(visited) > 20 and len(capture.queries) > 20
+    assert suggestions == {('students', ('parent_phone', 'gender')): {'x', 'y'}}
+    assert {f['endpoint'] for f in findings} >= {'x', 'y'}
@@ -0,0 +1,65 @@
+import pstats
+
+import pytest
+
+from conftest import add_teacher
+from siakad_app.utils.profiling import profiler
+
+
+@pytest.fixture
+def sampler_cleanup():
+    yield
+    profiler.stop_sampler()
+    profiler.sampler = None
+
+
+def test_admin_request_is_profiled(admin, tmp_path):
+    r = admin.get('/students/', headers={'X-Profile': '1'})
+    assert r.status_code == 200
+    profile_id = int(r.headers['X-Profile-Id'])
+    assert 'X-Profile-Id' not in admin.get('/students/').headers
+
+    [listed] = admin.get('/profiling/requests').get_json()
+    assert listed['id'] == profile_id and listed['endpoint'] == 'students.list_students' and listed['status'] == 200
+
+    report = admin.get(f'/profiling/requests/{profile_id}?sort=tottime&limit=500').get_data(as_text=True)
+    assert 'list_students' in report and 'Ordered by: internal time' in report
+    assert admin.get(f'/profiling/requests/{profile_id}?sort=name').status_code == 400
+    assert admin.get('/profiling/requests/999').status_code == 404
+
+    dump = tmp_path / 'request.pstats'
+    dump.write_bytes(admin.get(f'/profiling/requests/{profile_id}?format=pstats').get_data())
+    assert any(func[2] == 'list_students' for func in pstats.Stats(str(dump)).stats)
+
+
+def test_profiling_is_admin_only(admin):
+    _, teacher = add_teacher(admin, username='guru1')
+    assert 'X-Profile-Id' not in teacher.get('/students/', headers={'X-Profile': '1'}).headers
+    assert teacher.get('/profiling/requests').status_code == 403
+
+
+def test_disabled_profiling(admin, monkeypatch):
+    monkeypatch.setattr(profiler, 'enabled', False)
+    assert 'X-Profile-Id' not in admin.get('/students/', headers={'X-Profile': '1'}).headers
+    assert admin.get('/profiling/requests').status_code == 404
+
+
+def test_sampler(admin, sampler_cleanup):
+    assert admin.get('/profiling/sampler').status_code == 404
+    assert admin.post('/profiling/sampler', json={'seconds': 'lama'}).status_code == 400
+    r = admin.post('/profiling/sampler', json={'seconds': 30, 'interval': 0.001})
+    assert r.status_code == 202 and r.get_json()['running']
+    assert admin.post('/profiling/sampler', json={'seconds': 1}).status_code == 409
+    assert admin.get('/profiling/sampler/stacks').status_code == 409
+
+    status = admin.delete('/profiling/sampler').get_json()
+    assert not status['running'] and status['samples'] >= 1
+    stacks = admin.get('/profiling/sampler/stacks').get_data(as_text=True).splitlines()
+    assert stacks and all(line.rsplit(' ', 1)[1].isdigit() for line in stacks)
+    assert any('test_sampler' in line for line in stacks)
+
+
+def test_sampler_duration_is_capped(sampler_cleanup, monkeypatch):
+    monkeypatch.setattr(profiler, 'max_seconds', 5.0)
+    sampler = profiler.start_sampler(3600, interval=0.0001)
+    assert sampler.seconds == 5.0 and sampler.interval == profiler.min_interval
@@ -0,0 +1,66 @@
+import pytest
+
+from conftest import PASSWORD
+from siakad_app.utils.health import health
+from siakad_app.utils.ratelimit import MemoryBackend, SQLiteBackend, limiter, parse_rate, parse_role_rates
+
+
+@pytest.fixture
+def limits(monkeypatch):
+    monkeypatch.setattr(limiter, 'enabled', True)
+    monkeypatch.setattr(limiter, 'backend', MemoryBackend())
+    monkeypatch.setattr(limiter, 'gates', {})
+    yield limiter
+    health.mark_ready()
+
+
+def test_parse_rate():
+    assert parse_rate('30/minute') == (30, 0.5)
+    assert parse_rate('100 / 5 minutes') == (100, 100 / 300)
+    for bad in ('0/minute', '10/0minutes', '10/fortnight', '', None):
+        with pytest.raises(ValueError):
+            parse_rate(bad)
+    assert parse_role_rates('admin=600/minute, TEACHER=300/minute,') == {'ADMIN': '600/minute',
+                                                                          'TEACHER': '300/minute'}
+    with pytest.raises(ValueError):
+        parse_role_rates('ADMIN=lots')
+
+
+@pytest.mark.parametrize('backend', ['memory', 'sqlite'])
+def test_token_bucket_refills(backend, tmp_path):
+    store = MemoryBackend() if backend == 'memory' else SQLiteBackend(str(tmp_path / 'buckets.db'))
+    assert [store.take('k', 2, 1.0, 100.0)[0] for _ in range(3)] == [True, True, False]
+    assert store.take('k', 2, 1.0, 100.0) == (False, 1.0)
+    assert store.take('k', 2, 1.0, 101.0)[0] is True
+    assert store.take('other', 2, 1.0, 101.0)[0] is True
+
+
+def test_sqlite_buckets_are_shared_between_workers(tmp_path):
+    path = str(tmp_path / 'buckets.db')
+    assert SQLiteBackend(path).take('k', 1, 0.1, 100.0)[0] is True
+    assert SQLiteBackend(path).take('k', 1, 0.1, 100.0)[0] is False
+
+
+def test_login_is_limited_per_client(client, limits):
+    body = {'username': 'admin', 'password': 'salah'}
+    codes = [client.post('/auth/login', json=body, base_url='http://sman1.test').status_code for _ in range(11)]
+    assert codes == [401] * 10 + [429]
+    r = client.post('/auth/login', json={'username': 'admin', 'password': PASSWORD}, base_url='http://sman1.test')
+    assert r.status_code == 429 and int(r.headers['Retry-After']) >= 1
+
+
+def test_role_default_limit(admin, limits, monkeypatch):
+    monkeypatch.setitem(limits.role_rates, 'ADMIN', '2/minute')
+    assert [admin.get('/subjects/').status_code for _ in range(3)] == [200, 200, 429]
+    assert admin.get('/subjects/').get_json()['retry_after'] >= 1
+
+
+def test_admission_gate_rejects_when_full(admin, limits):
+    gate = limits.gate('grades.class_stats', 1, queue_timeout=0)
+    assert gate.acquire()
+    r = admin.get('/grades/class-stats?class_name=7A')
+    assert r.status_code == 429 and r.headers['Retry-After'] == '1'
+    assert (gate.active, gate.rejected) == (1, 1)
+    gate.release()
+    assert admin.get('/grades/class-stats?class_name=7A').status_code == 200
+    assert gate.active == 0
@@ -0,0 +1,81 @@
+from sqlalchemy import select
+
+from conftest import add_subject, add_teacher
+from siakad_app.extensions import db
+from siakad_app.models import CacheVersion, Student, Subject
+from siakad_app.utils.refdata import reference_data, refdata
+from siakad_app.utils.tenancy import tenant_context
+
+
+def _counter(name):
+    return db.session.scalar(select(CacheVersion.version).where(CacheVersion.name == name))
+
+
+def test_reference_document_and_etag(admin):
+    teacher_id, _ = add_teacher(admin)
+    add_subject(admin, 'MAT101', teacher_id)
+    r = admin.get('/reference/')
+    body = r.get_json()
+    assert [s['code'] for s in body['subjects']] == ['MAT101']
+    assert body['teachers'] == [{'id': teacher_id, 'nip': '1234567890', 'name': 'Guru 1234567890'}]
+    assert body['class_names'] == ['7A']
+    etag = r.headers['ETag']
+    assert admin.get('/reference/', headers={'If-None-Match': etag}).status_code == 304
+
+    # A write on this worker drops the snapshot at once, TTL or not
+    r = admin.post('/subjects/bulk-update', json={'filter': {'sks': 2}, 'set': {'sks': 4}})
+    assert r.get_json() == {'updated': 1}
+    r = admin.get('/reference/', headers={'If-None-Match': etag})
+    assert r.status_code == 200 and r.get_json()['subjects'][0]['sks'] == 4 and r.headers['ETag'] != etag
+
+
+def test_only_class_name_changes_of_students_invalidate(app, admin):
+    with app.app_context(), tenant_context('sman1'):
+        snapshot = refdata()
+        assert refdata() is snapshot
+    admin.patch('/students/1', json={'name': 'Nama Baru'})
+    with app.app_context(), tenant_context('sman1'):
+        assert refdata() is snapshot
+    admin.patch('/students/1', json={'class_name': '8B'})
+    with app.app_context(), tenant_context('sman1'):
+        assert refdata().class_names == ('8B',)
+
+
+def test_snapshots_are_per_school(app, admin):
+    add_subject(admin)
+    with app.app_context():
+        with tenant_context('sman1'):
+            assert [s.code for s in refdata().subjects] == ['MAT101']
+        with tenant_context('smpn2'):
+            assert refdata().subjects == ()
+
+
+def test_other_workers_edits_within_the_same_second_are_seen(app, admin, monkeypatch):
+    sid = add_subject(admin)
+    monkeypatch.setattr(reference_data, 'ttl', 0)
+    with app.app_context(), tenant_context('sman1'):
+        assert refdata().subjects_by_id[sid].name == 'Mapel MAT101'
+        before = _counter('refdata')
+        # Another worker renames the subject: counts and newest updated_at stay the same
+        monkeypatch.setattr(reference_data, 'invalidate', lambda: None)
+        subject = db.session.get(Subject, sid)
+        subject.name, subject.updated_at = 'Matematika', subject.updated_at
+        db.session.commit()
+        assert _counter('refdata') == before + 1
+        assert refdata().subjects_by_id[sid].name == 'Matematika'
+
+
+def test_counter_is_bumped_once_per_transaction(app):
+    with app.app_context(), tenant_context('sman1'):
+        before = _counter('refdata') or 0
+        db.session.add(Subject(code='MAT101', name='Matematika', sks=2))
+        db.session.add(Subject(code='BIO101', name='Biologi', sks=2))
+        db.session.flush()
+        db.session.get(Student, 1).class_name = '8B'
+        db.session.commit()
+        assert _counter('refdata') == before + 1
+        # A rolled back write leaves the counter alone
+        db.session.get(Subject, 1).name = 'Batal'
+        db.session.flush()
+        db.session.rollback()
+        assert _counter('refdata') == before + 1
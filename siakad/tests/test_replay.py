@@ -0,0 +1,122 @@
+import json
+import threading
+
+import pytest
+from sqlalchemy import delete, func, select
+from werkzeug.serving import make_server
+
+from siakad_app.extensions import db
+from siakad_app.models import Grade, Student, Subject, Teacher, User
+from siakad_app.utils import replay
+from siakad_app.utils.tenancy import tenancy, tenant_context
+
+TERM = '2024/2025-1'
+CAPTURE = [
+    json.dumps({'ts': 1000.5, 'method': 'POST', 'path': '/grades/', 'query': '', 'status': 201, 'ms': 8.0,
+                'role': 'TEACHER', 'user': 7, 'teacher_id': 3, 'student_id': None, 'tenant': 'sman1',
+                'body': {'student_id': 40, 'subject_id': 5, 'tugas': 80, 'uts': 70, 'uas': 90}}),
+    json.dumps({'ts': 1000.0, 'method': 'GET', 'path': '/students/', 'query': 'class_name=7A&q=Budi',
+                'status': 200, 'ms': 3.0, 'role': 'ADMIN', 'user': 1, 'tenant': 'sman1'}),
+    json.dumps({'ts': 1001.0, 'method': 'POST', 'path': '/auth/login', 'query': '', 'status': 200, 'ms': 90.0,
+                'body': {'username': 'guru.budi', 'password': '[scrubbed]'}}),
+    json.dumps({'ts': 1002.0, 'method': 'POST', 'path': '/auth/logout', 'query': '', 'status': 200, 'ms': 1.0,
+                'role': 'ADMIN', 'user': 1, 'tenant': 'sman1'}),
+    '10.0.0.1 - - [01/Jan/2025:10:00:03 +0000] "GET /grades/transcript/12?term=2024%2F2025-1 HTTP/1.1" 200 512 '
+    '"-" "curl/8" 4200',
+    '10.0.0.1 - - [01/Jan/2025:10:00:04 +0000] "DELETE /students/3 HTTP/1.1" 200 10 "-" "curl/8"',
+    'not a log line',
+]
+
+
+def test_prepare_is_deterministic_and_anonymized():
+    entries, dropped = replay.prepare(CAPTURE, 'salt')
+    assert replay.prepare(CAPTURE, 'salt') == (entries, dropped)
+    assert dropped == {'session': 1, 'write without body': 1}
+    assert [(e['method'], e['path']) for e in entries] == [
+        ('GET', '/students/'), ('POST', '/grades/'), ('POST', '/auth/login'), ('GET', '/grades/transcript/12')]
+
+    students, grade, login, transcript = entries
+    assert 'Budi' not in students['query'] and '7A' not in students['query']
+    assert students['user'] == 'replay-admin-1' and grade['user'] == 'replay-teacher-1'
+    assert grade['body'] == {'student_id': 40, 'subject_id': 5, 'tugas': 80, 'uts': 70, 'uas': 90}
+    assert login['role'] is None and login['body']['password'] == replay.REPLAY_PASSWORD
+    assert login['body']['username'] in ('replay-admin-1', 'replay-teacher-1')
+    assert transcript['user'] == 'replay-admin-0' and transcript['ms'] == 4.2
+    assert transcript['query'] == 'term=2024%2F2025-1'
+    assert replay.prepare(CAPTURE, 'other')[0][0]['query'] != students['query']
+
+
+def test_seed_plan_covers_every_reference():
+    entries, _ = replay.prepare(CAPTURE, 'salt')
+    plan = replay.seed_plan(entries, min_students=10, min_teachers=2, min_subjects=2, min_classes=3)
+    assert (plan['students'], plan['teachers'], plan['subjects']) == (40, 3, 5)
+    assert plan['owned'] == [(3, 5)] and len(plan['classes']) == 3
+    assert plan['users'] == {'replay-admin-0': ('ADMIN', None, None), 'replay-admin-1': ('ADMIN', None, None),
+                             'replay-teacher-1': ('TEACHER', 3, None)}
+
+
+@pytest.fixture
+def empty_db(app):
+    with app.app_context():
+        for model in (User, Student):
+            db.session.execute(delete(model).execution_options(all_tenants=True))
+        db.session.commit()
+    return app
+
+
+def test_seed_and_run_against_a_live_server(empty_db, monkeypatch):
+    app = empty_db
+    # The server below stands in for the school's own host
+    monkeypatch.setitem(tenancy.hosts, '127.0.0.1', 'sman1')
+    entries, _ = replay.prepare(CAPTURE, 'salt')
+    plan = replay.seed_plan(entries, min_students=50, min_teachers=2, min_subjects=6)
+    with app.app_context(), tenant_context('sman1'):
+        counts = replay.seed(plan, TERM, density=0.5, seed=7)
+        assert counts['students'] == 50 and counts['subjects'] == 6 and counts['users'] == 3
+        assert db.session.scalar(select(Subject.teacher_id).where(Subject.id == 5)) == 3
+        assert db.session.scalar(select(func.count(Grade.id))) == counts['grades']
+        with pytest.raises(ValueError):
+            replay.seed(plan, TERM)
+        tokens = replay.mint_tokens({e['user'] for e in entries if e.get('user')}, hours=1)
+    assert set(tokens) == {'replay-admin-0', 'replay-admin-1', 'replay-teacher-1'}
+
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        # One in-memory SQLite connection is shared by every thread: one request at a time
+        results = replay.run(entries, f'http://127.0.0.1:{server.server_port}', tokens, speed=0, concurrency=1)
+    finally:
+        server.shutdown()
+    assert [(r['route'], r['status'], r['expected']) for r in results] == [
+        ('/students/', 200, 200), ('/grades/', 201, 201), ('/auth/login', 200, 200),
+        ('/grades/transcript/<id>', 200, 200)]
+
+
+def test_seed_is_reproducible(empty_db):
+    app = empty_db
+    plan = replay.seed_plan([], min_students=20, min_teachers=2, min_subjects=3, min_classes=2)
+    snapshots = []
+    for _ in range(2):
+        with app.app_context(), tenant_context('sman1'):
+            replay.seed(plan, TERM, seed=3)
+            snapshots.append(db.session.execute(select(Grade.student_id, Grade.subject_id, Grade.tugas)).all())
+            for model in (Grade, User, Student, Subject, Teacher):
+                db.session.execute(delete(model))
+            db.session.commit()
+    assert snapshots[0] == snapshots[1] and snapshots[0]
+
+
+def test_compare_flags_regressions():
+    base = [{'method': 'GET', 'route': '/students/', 'status': 200, 'ms': 10.0} for _ in range(20)]
+    slower = [{**r, 'ms': 30.0} for r in base]
+    failing = [{**r, 'status': 500 if i < 5 else 200} for i, r in enumerate(base)]
+    assert replay.summarize(base)[('GET', '/students/')] == {'count': 20, 'errors': 0.0, 'p50': 10.0,
+                                                            'p95': 10.0, 'p99': 10.0}
+    assert replay.compare(base, base)[0][4] == []
+    assert replay.compare(base, slower)[0][4] == ['p50 10.0 -> 30.0 ms', 'p95 10.0 -> 30.0 ms',
+                                                  'p99 10.0 -> 30.0 ms']
+    assert replay.compare(base, failing)[0][4] == ['errors 0.0% -> 25.0%']
+    # Too few requests for a latency verdict
+    assert replay.compare(base[:5], slower[:5])[0][4] == []
+    assert replay.route_of('/grades/transcript/12') == '/grades/transcript/<id>'
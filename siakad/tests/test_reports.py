@@ -0,0 +1,79 @@
+import re
+
+import pytest
+
+from conftest import OLD_TERM, add_subject, put_grade, seed_students
+from siakad_app.utils import reports
+from siakad_app.utils.ratelimit import MemoryBackend, limiter
+from siakad_app.utils.tenancy import tenant_context
+
+HTML = {'Accept': 'text/html'}
+
+
+def _rows(html):
+    return re.findall(r'<tr>\s*<td>(\d+)</td>\s*<td>([^<]+)</td>(.*?)</tr>', html, re.DOTALL)
+
+
+def _cells(row):
+    return re.findall(r'<td style="text-align:center">([^<]+)</td>', row[2])
+
+
+def test_html_report_is_streamed_in_chunks(app, admin):
+    ids = seed_students(app, 300)
+    mat, bio = add_subject(admin, 'MAT101'), add_subject(admin, 'BIO101')
+    put_grade(admin, ids[0], mat, 80)
+    put_grade(admin, ids[0], bio, 61)
+    put_grade(admin, ids[1], bio, 70)
+
+    r = admin.get('/grades/class-report?class_name=8A', headers=HTML, buffered=False)
+    assert r.status_code == 200 and r.is_streamed and r.mimetype == 'text/html'
+    chunks = [c.decode() for c in r.response]
+    r.close()
+    assert len(chunks) > 2 and all(len(c) >= reports.CHUNK_SIZE for c in chunks[:-1])
+
+    html = ''.join(chunks)
+    assert re.findall(r'<th>([A-Z]+\d+)</th>', html) == ['BIO101', 'MAT101']
+    rows = _rows(html)
+    assert len(rows) == 300 and rows[0][:2] == ('2024100000', 'Murid 0000')
+    assert [_cells(row) for row in rows[:3]] == [['61.00', '80.00'], ['70.00', '0.00'], ['0.00', '0.00']]
+
+    with app.test_request_context(), tenant_context('sman1'):
+        assert reports.class_report_html('8A', '2024/2025-1', stream=False) == html
+
+
+def test_json_report_and_terms(admin):
+    sid = add_subject(admin)
+    put_grade(admin, 1, sid, 80)
+    put_grade(admin, 1, sid, 60, term=OLD_TERM)
+    body = admin.get('/grades/class-report?class_name=7A').get_json()
+    assert body['term'] == '2024/2025-1' and body['grades'] == {'1': {'MAT101': 80.0}}
+
+    html = admin.get('/grades/class-report?class_name=7A&term=all', headers=HTML).get_data(as_text=True)
+    assert re.findall(r'<th>(MAT101 \([^)]+\))</th>', html) == ['MAT101 (2023/2024-2)', 'MAT101 (2024/2025-1)']
+    assert _cells(_rows(html)[0]) == ['60.00', '80.00']
+    assert admin.get('/grades/class-report', headers=HTML).status_code == 400
+
+
+@pytest.fixture
+def gated(monkeypatch):
+    monkeypatch.setattr(limiter, 'enabled', True)
+    monkeypatch.setattr(limiter, 'backend', MemoryBackend())
+    monkeypatch.setattr(limiter, 'gates', {})
+    return limiter.gate('grades.class_report', 4, queue_timeout=0)
+
+
+def test_streamed_report_holds_its_slot_until_sent(app, admin, gated):
+    seed_students(app, 50)
+    r = admin.get('/grades/class-report?class_name=8A', headers=HTML, buffered=False)
+    assert gated.active == 1
+    b''.join(r.response)
+    r.close()
+    assert gated.active == 0
+
+    # A client that disconnects early releases it too
+    r = admin.get('/grades/class-report?class_name=8A', headers=HTML, buffered=False)
+    next(iter(r.response))
+    r.close()
+    assert gated.active == 0
+    admin.get('/grades/class-report?class_name=8A')
+    assert gated.active == 0
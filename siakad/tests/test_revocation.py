@@ -0,0 +1,66 @@
+import pytest
+from flask_jwt_extended import decode_token
+
+from conftest import login
+from siakad_app.utils import revocation
+from siakad_app.utils.revocation import revocations
+from siakad_app.utils.tenancy import tenant_context
+
+BASE = 'http://sman1.test'
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_700_000_000.0]
+    monkeypatch.setattr(revocation.time, 'time', lambda: now[0])
+    return now
+
+
+def _login(client):
+    r = client.post('/auth/login', json={'username': 'admin', 'password': 'rahasia123'}, base_url=BASE)
+    return r.get_json()
+
+
+def test_forced_logout_revokes_tokens_issued_earlier_in_the_same_second(app, client, clock):
+    clock[0] = 1_700_000_000.2
+    before = _login(client)
+    clock[0] = 1_700_000_000.5
+    admin = {'Authorization': 'Bearer ' + before['access_token']}
+    assert client.post('/auth/users/1/logout', headers=admin, base_url=BASE).status_code == 200
+
+    assert client.get('/auth/me', headers=admin, base_url=BASE).status_code == 401
+    refresh = {'Authorization': 'Bearer ' + before['refresh_token']}
+    assert client.post('/auth/refresh', headers=refresh, base_url=BASE).status_code == 401
+
+    clock[0] = 1_700_000_000.8
+    after = {'Authorization': 'Bearer ' + _login(client)['access_token']}
+    assert client.get('/auth/me', headers=after, base_url=BASE).status_code == 200
+
+
+def test_tokens_carry_their_issue_time_in_milliseconds(app, client, clock):
+    clock[0] = 1_700_000_000.123
+    token = _login(client)['access_token']
+    with app.app_context():
+        assert decode_token(token)['iat_ms'] == 1_700_000_000_123
+
+
+def test_tokens_without_iat_ms_are_revoked_for_the_whole_second(app, clock):
+    clock[0] = 1_700_000_000.5
+    with app.app_context(), tenant_context('sman1'):
+        revocations.revoke_user(42)
+        assert revocations.is_revoked({'sub': '42', 'iat': 1_700_000_000})
+        assert not revocations.is_revoked({'sub': '42', 'iat': 1_700_000_001})
+        assert revocations.is_revoked({'sub': '42', 'iat': 1_700_000_000, 'iat_ms': 1_700_000_000_499})
+        assert not revocations.is_revoked({'sub': '42', 'iat': 1_700_000_000, 'iat_ms': 1_700_000_000_501})
+        assert not revocations.is_revoked({'sub': '43', 'iat': 1_700_000_000, 'iat_ms': 1_700_000_000_000})
+
+
+def test_logout_revokes_access_and_refresh_token(client):
+    tokens = _login(client)
+    access = {'Authorization': 'Bearer ' + tokens['access_token']}
+    r = client.post('/auth/logout', json={'refresh_token': tokens['refresh_token']}, headers=access, base_url=BASE)
+    assert r.status_code == 200
+    assert client.get('/auth/me', headers=access, base_url=BASE).status_code == 401
+    refresh = {'Authorization': 'Bearer ' + tokens['refresh_token']}
+    assert client.post('/auth/refresh', headers=refresh, base_url=BASE).status_code == 401
+    assert client.get('/auth/me', headers=login(client, 'sman1'), base_url=BASE).status_code == 200
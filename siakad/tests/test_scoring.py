@@ -0,0 +1,93 @@
+import pytest
+from sqlalchemy import select
+
+from conftest import OLD_TERM, add_subject, login, put_grade
+from siakad_app.extensions import db
+from siakad_app.models import Grade, ScoringPolicy
+from siakad_app.utils import scoring
+from siakad_app.utils.scoring import CompiledPolicy, Weights, grade_point, parse_weights, scoring_policy
+from siakad_app.utils.tenancy import tenant_context
+
+TERM = '2024/2025-1'
+
+
+def _policy():
+    return CompiledPolicy([
+        ScoringPolicy(1, 1, 2, subject_id=1, term=TERM),
+        ScoringPolicy(0, 0, 1, subject_id=1),
+        ScoringPolicy(1, 0, 0, term=OLD_TERM),
+        ScoringPolicy(3, 3, 4),
+    ], Weights(1, 1, 1))
+
+
+def test_most_specific_policy_wins():
+    policy = _policy()
+    assert policy.weights_for(1, TERM) == (1, 1, 2)
+    assert policy.weights_for(1, OLD_TERM) == (0, 0, 1)
+    assert policy.weights_for(2, OLD_TERM) == (1, 0, 0)
+    assert policy.weights_for(2, TERM) == (3, 3, 4)
+    assert policy.score(1, TERM, 60, 70, 80) == 72.5
+
+
+@pytest.mark.parametrize('vectorized', [True, False])
+def test_batch_and_sql_finals_agree_with_score(app, admin, monkeypatch, vectorized):
+    if not vectorized:
+        monkeypatch.setattr(scoring, 'np', None)
+    add_subject(admin, 'MAT101'), add_subject(admin, 'BIO101')
+    policy = _policy()
+    rows = [(1, TERM, 60, 70, 80), (1, OLD_TERM, 60, 70, 80), (2, OLD_TERM, 60, 70, 80), (2, TERM, 61, 77, 83)]
+    expected = [policy.score(*row) for row in rows]
+    assert policy.evaluate(*zip(*rows)) == expected == [72.5, 80.0, 60.0, 74.6]
+    with app.app_context(), tenant_context('sman1'):
+        for sid, term, *values in rows:
+            db.session.add(Grade(student_id=1, subject_id=sid, term=term, tugas=values[0], uts=values[1],
+                                 uas=values[2]))
+        db.session.commit()
+        got = db.session.execute(select(policy.sql_final(Grade)).order_by(Grade.id)).scalars().all()
+    assert got == expected
+
+
+def test_weights_and_grade_points():
+    assert parse_weights('30, 30, 40') == (30.0, 30.0, 40.0)
+    for bad in ('30,70', '0,0,0', '-1,1,1', 'a,b,c'):
+        with pytest.raises(ValueError):
+            parse_weights(bad)
+    assert [grade_point(f) for f in (85, 84.99, 55, 39.9)] == [('A', 4.0), ('B', 3.0), ('C', 2.0), ('E', 0.0)]
+
+
+def test_policy_changes_apply_without_recomputing_grades(client, admin):
+    sid = add_subject(admin)
+    put_grade(admin, 1, sid, 60)
+    admin.patch('/grades/1', json={'uas': 90})
+    assert admin.get('/grades/transcript/1').get_json()['grades'][0]['final'] == 70.0
+
+    r = admin.put('/scoring/policies', json={'subject_id': sid, 'tugas': 20, 'uts': 30, 'uas': 50})
+    assert r.status_code == 201
+    transcript = admin.get('/grades/transcript/1').get_json()
+    assert transcript['grades'][0]['final'] == 75.0 and transcript['grades'][0]['letter'] == 'B'
+    assert [(g['tugas'], g['uas']) for g in admin.get('/grades/student/1').get_json()] == [(60.0, 90.0)]
+
+    r = admin.put('/scoring/policies', json={'subject_id': sid, 'tugas': 0, 'uts': 0, 'uas': 1})
+    assert r.status_code == 200 and r.get_json()['id'] == 1
+    assert admin.get('/grades/transcript/1').get_json()['grades'][0]['final'] == 90.0
+    assert admin.put('/scoring/policies', json={'tugas': 0, 'uts': 0, 'uas': 0}).status_code == 400
+    assert admin.put('/scoring/policies', json={'subject_id': 99, 'tugas': 1, 'uts': 1, 'uas': 1}).status_code == 400
+
+    # Policies are per school
+    other = login(client, 'smpn2')
+    assert client.get('/scoring/policies', headers=other, base_url='http://smpn2.test').get_json()['items'] == []
+
+    assert admin.delete('/scoring/policies/1').status_code == 200
+    assert admin.get('/grades/transcript/1').get_json()['grades'][0]['final'] == 70.0
+
+
+def test_edits_from_other_workers_are_picked_up_after_the_ttl(app, admin):
+    app.config['SCORING_POLICY_TTL'] = 3600
+    with app.app_context(), tenant_context('sman1'):
+        assert scoring_policy().default == (1, 1, 1)
+        # Written behind this worker's back: no local invalidation
+        db.session.add(ScoringPolicy(1, 1, 2))
+        db.session.commit()
+        assert scoring_policy().default == (1, 1, 1)
+        app.config['SCORING_POLICY_TTL'] = 0
+        assert scoring_policy().default == (1, 1, 2)
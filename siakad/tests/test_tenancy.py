@@ -0,0 +1,66 @@
+import pytest
+
+from conftest import login
+from siakad_app.extensions import db
+from siakad_app.utils import index_advisor
+from siakad_app.utils.ratelimit import limiter
+from siakad_app.utils.tenancy import DEFAULT_TENANT, current_tenant, tenancy, tenant_context
+
+
+def _names(r):
+    return [s['name'] for s in r.get_json()['items']]
+
+
+def test_each_tenant_sees_only_its_rows(client):
+    for tenant in ('sman1', 'smpn2'):
+        r = client.get('/students/', headers=login(client, tenant), base_url=f'http://{tenant}.test')
+        assert _names(r) == [f'Siswa {tenant}']
+
+
+def test_token_is_bound_to_its_tenant(client):
+    headers = login(client, 'sman1')
+    # Another school's host rejects it; without a school host the claim decides
+    assert client.get('/students/', headers=headers, base_url='http://smpn2.test').status_code == 400
+    assert _names(client.get('/students/', headers=headers)) == ['Siswa sman1']
+    assert client.get('/students/2', headers=headers).status_code == 404
+
+
+def test_claim_tenant_and_database_key(app):
+    with app.app_context():
+        assert tenancy.claim_tenant({'tenant': 'smpn2'}) == 'smpn2'
+        assert tenancy.claim_tenant({'tenant': 'unknown'}) is None
+        assert tenancy.claim_tenant({}) == DEFAULT_TENANT
+        # No TENANT_DATABASES here: every tenant shares the configured database
+        assert tenancy.database_key('smpn2') is None
+
+
+def test_rate_limit_buckets_are_per_tenant(app, monkeypatch):
+    monkeypatch.setattr(limiter, 'enabled', True)
+    with app.test_request_context():
+        with tenant_context('sman1'):
+            assert [limiter.check_role('x', 'ADMIN', 1, '2/minute') for _ in range(2)] == [None, None]
+            assert limiter.check_role('x', 'ADMIN', 1, '2/minute') is not None
+        with tenant_context('smpn2'):
+            assert current_tenant() == 'smpn2'
+            assert limiter.check_role('x', 'ADMIN', 1, '2/minute') is None
+
+
+@pytest.mark.parametrize('tenant', ['sman1', 'smpn2'])
+def test_login_is_scoped_to_the_host_tenant(client, tenant):
+    other = 'smpn2' if tenant == 'sman1' else 'sman1'
+    r = client.post('/auth/login', json={'username': 'admin', 'password': 'rahasia123'},
+                    base_url=f'http://{tenant}.test')
+    token = r.get_json()['access_token']
+    me = client.get('/auth/me', headers={'Authorization': f'Bearer {token}'}, base_url=f'http://{tenant}.test')
+    assert me.status_code == 200
+    r = client.get('/auth/me', headers={'Authorization': f'Bearer {token}'}, base_url=f'http://{other}.test')
+    assert r.status_code == 400
+
+
+def test_index_advisor_runs_as_the_current_tenant(app):
+    with app.app_context(), tenant_context('smpn2'):
+        with index_advisor.QueryCapture(db.engine) as capture:
+            visited = index_advisor.exercise_routes(app, capture)
+    statuses = {endpoint: status for endpoint, _, query, status in visited if not query}
+    assert statuses['grades.transcript'] == 200 and statuses['students.get_student'] == 200
+    assert not [v for v in visited if v[3] >= 500]
@@ -0,0 +1,55 @@
+from datetime import date
+
+import pytest
+
+from conftest import OLD_TERM, add_subject, put_grade
+from siakad_app.utils.archive import archive_term
+from siakad_app.utils.tenancy import tenant_context
+from siakad_app.utils.terms import term_for_date, validate_term
+
+
+def _archive(app, term=OLD_TERM):
+    with app.app_context(), tenant_context('sman1'):
+        return archive_term(term)
+
+
+def test_term_validation_and_dates():
+    assert validate_term(' 2024/2025-2 ') == '2024/2025-2'
+    for bad in ('2024/2026-1', '2024-2025-1', '2024/2025-3', ''):
+        with pytest.raises(ValueError):
+            validate_term(bad)
+    assert term_for_date(date(2024, 7, 1)) == '2024/2025-1'
+    assert term_for_date(date(2025, 6, 30)) == '2024/2025-2'
+
+
+def test_grades_default_to_the_active_term(admin):
+    sid = add_subject(admin)
+    assert put_grade(admin, 1, sid, 80)['term'] == '2024/2025-1'
+    put_grade(admin, 1, sid, 60, term=OLD_TERM)
+    assert [g['term'] for g in admin.get('/grades/student/1').get_json()] == ['2024/2025-1']
+    assert len(admin.get('/grades/student/1?term=all').get_json()) == 2
+    assert admin.get('/grades/student/1?term=bad').status_code == 400
+
+
+def test_archived_term_reads_from_the_archive(app, admin):
+    sid = add_subject(admin)
+    put_grade(admin, 1, sid, 60, term=OLD_TERM)
+    put_grade(admin, 1, sid, 90)
+    assert _archive(app) == 1
+    with pytest.raises(ValueError):
+        _archive(app, '2024/2025-1')
+
+    transcript = admin.get(f'/grades/transcript/1?term={OLD_TERM}').get_json()
+    assert [g['tugas'] for g in transcript['grades']] == [60.0]
+    assert [g['term'] for g in admin.get('/grades/student/1?term=all').get_json()] == [OLD_TERM, '2024/2025-1']
+
+
+def test_late_write_into_an_archived_term_wins(app, admin):
+    sid = add_subject(admin)
+    put_grade(admin, 1, sid, 60, term=OLD_TERM)
+    _archive(app)
+    put_grade(admin, 1, sid, 70, term=OLD_TERM)
+    assert [g['tugas'] for g in admin.get(f'/grades/subject/{sid}?term={OLD_TERM}').get_json()] == [70.0]
+    # Archiving again replaces the archived row instead of colliding with it
+    assert _archive(app) == 1
+    assert [g['tugas'] for g in admin.get(f'/grades/subject/{sid}?term={OLD_TERM}').get_json()] == [70.0]
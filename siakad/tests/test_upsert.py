@@ -0,0 +1,94 @@
+import hashlib
+import json
+from datetime import datetime
+
+from sqlalchemy import select
+
+from conftest import add_subject, login, put_grade
+from siakad_app.extensions import db
+from siakad_app.models import Grade
+from siakad_app.utils.idempotency import idempotency
+from siakad_app.utils.tenancy import tenant_context
+from siakad_app.utils.upsert import upsert
+
+
+def _actions(api):
+    return [i['action'] for i in api.get('/grades/history?student_id=1').get_json()['items']]
+
+
+def test_grade_post_is_an_upsert(admin):
+    sid = add_subject(admin)
+    first = put_grade(admin, 1, sid, 70)
+    second = put_grade(admin, 1, sid, 80)
+    assert second['id'] == first['id'] and second['tugas'] == 80.0
+    # Same scores again: nothing is written
+    assert put_grade(admin, 1, sid, 80) == second
+    assert _actions(admin) == ['UPDATE', 'CREATE']
+    assert len(admin.get('/grades/student/1').get_json()) == 1
+
+
+def test_upsert_statement(app, admin):
+    sid = add_subject(admin)
+    row = {'student_id': 1, 'subject_id': sid, 'term': '2024/2025-1', 'tenant_id': 'sman1',
+           'tugas': 1, 'uts': 2, 'uas': 3, 'updated_at': datetime(2024, 8, 1)}
+    with app.app_context(), tenant_context('sman1'):
+        upsert(Grade.__table__, [row], keys=('student_id', 'subject_id', 'term'), update=('tugas',))
+        upsert(Grade.__table__, [{**row, 'tugas': 9, 'uts': 9}], keys=('student_id', 'subject_id', 'term'),
+               update=('tugas',))
+        db.session.commit()
+        assert db.session.execute(select(Grade.tugas, Grade.uts)).all() == [(9.0, 2.0)]
+        assert upsert(Grade.__table__, [], keys=(), update=()) == 0
+
+
+def test_retry_with_the_same_key_is_replayed(admin):
+    sid = add_subject(admin)
+    body = {'student_id': 1, 'subject_id': sid, 'tugas': 70, 'uts': 70, 'uas': 70}
+    key = {'Idempotency-Key': 'nilai-1'}
+    first = admin.post('/grades/', json=body, headers=key)
+    assert first.status_code == 201 and 'Idempotent-Replayed' not in first.headers
+    admin.patch('/grades/1', json={'tugas': 10})
+
+    retry = admin.post('/grades/', json=body, headers=key)
+    assert retry.status_code == 201 and retry.headers['Idempotent-Replayed'] == 'true'
+    assert retry.get_json() == first.get_json()
+    assert admin.get('/grades/student/1').get_json()[0]['tugas'] == 10.0
+    assert _actions(admin) == ['UPDATE', 'CREATE']
+
+    assert admin.post('/grades/', json={**body, 'tugas': 90}, headers=key).status_code == 422
+    assert admin.post('/grades/', json=body, headers={'Idempotency-Key': 'x' * 129}).status_code == 400
+    # Without a key every request runs
+    assert admin.post('/grades/', json=body).get_json()['tugas'] == 70.0
+
+
+def test_keys_are_scoped_to_user_and_path(client, admin):
+    sid = add_subject(admin)
+    body = {'student_id': 1, 'subject_id': sid, 'tugas': 70, 'uts': 70, 'uas': 70}
+    key = {'Idempotency-Key': 'k'}
+    assert admin.post('/grades/', json=body, headers=key).status_code == 201
+    assert 'Idempotent-Replayed' not in admin.patch('/grades/1', json={'uas': 80}, headers=key).headers
+    other = login(client, 'smpn2')
+    r = client.post('/grades/', json=body, headers={**other, **key}, base_url='http://smpn2.test')
+    assert r.status_code == 400 and 'Idempotent-Replayed' not in r.headers
+
+
+def test_client_errors_are_replayed_too(admin):
+    body = {'student_id': 1, 'subject_id': 99, 'tugas': 70, 'uts': 70, 'uas': 70}
+    key = {'Idempotency-Key': 'k'}
+    assert admin.post('/grades/', json=body, headers=key).status_code == 400
+    r = admin.post('/grades/', json=body, headers=key)
+    assert r.status_code == 400 and r.headers['Idempotent-Replayed'] == 'true'
+
+
+def test_retry_while_the_first_attempt_runs(admin, monkeypatch):
+    monkeypatch.setattr(idempotency, 'wait', 0.01)
+    raw = json.dumps({'student_id': 1, 'subject_id': add_subject(admin), 'tugas': 1, 'uts': 1, 'uas': 1}).encode()
+    # The first attempt is still running on another thread of this worker
+    scope = ('sman1', '1', 'POST', '/grades/', 'k')
+    entry, owner = idempotency.begin(scope, hashlib.sha256(raw).hexdigest())
+    assert owner
+    r = admin.post('/grades/', data=raw, content_type='application/json', headers={'Idempotency-Key': 'k'})
+    assert r.status_code == 409 and r.headers['Retry-After'] == '1'
+    # It failed without a stored response: the retry runs the request itself
+    idempotency.finish(scope, entry, None)
+    r = admin.post('/grades/', data=raw, content_type='application/json', headers={'Idempotency-Key': 'k'})
+    assert r.status_code == 201 and 'Idempotent-Replayed' not in r.headers
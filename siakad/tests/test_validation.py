@@ -0,0 +1,67 @@
+import pytest
+
+from conftest import login
+from siakad_app.utils import validation
+
+STUDENT = {'nis': '2023000099', 'name': 'Ani Lestari', 'birth_date': '2010-01-01', 'gender': 'P',
+           'class_name': '7A', 'parent_phone': '081234567890'}
+
+TEXT_FIELDS = [validation.NIS, validation.NIP, validation.PARENT_PHONE, validation.PHONE, validation.SUBJECT_CODE,
+               validation.PERSON_NAME, validation.SUBJECT_NAME, validation.GENDER, validation.CLASS_NAME,
+               validation.ADDRESS]
+
+
+@pytest.mark.parametrize('field', TEXT_FIELDS)
+@pytest.mark.parametrize('value', [12345, 3.5, True, ['L'], {'a': 1}])
+def test_text_fields_reject_non_strings(field, value):
+    with pytest.raises(ValueError):
+        field(value)
+    cleaned, errors = field.column(['x', value])
+    assert 1 in errors and cleaned[1] is None
+
+
+@pytest.mark.parametrize('field', [validation.BIRTH_DATE, validation.SKS, validation.SCORE])
+@pytest.mark.parametrize('value', [['1'], {'a': 1}, 'abc'])
+def test_typed_fields_reject_other_values(field, value):
+    with pytest.raises(ValueError):
+        field(value)
+
+
+@pytest.mark.parametrize('value', ['NaN', 'inf', '-inf', float('nan'), float('inf'), -1, 100.5])
+def test_score_rejects_non_finite_and_out_of_range(value):
+    with pytest.raises(ValueError):
+        validation.SCORE(value)
+
+
+def test_text_fields_normalize_strings():
+    assert validation.GENDER(' l ') == 'L'
+    assert validation.PHONE('0812 3456 7890') == '081234567890'
+    assert validation.ADDRESS(None) == ''
+    assert validation.SCORE('87.456') == 87.46
+
+
+@pytest.mark.parametrize('field, value', [('name', 12345), ('gender', ['L']), ('class_name', 7), ('nis', 2023000099)])
+def test_create_student_rejects_non_string_with_400(client, field, value):
+    r = client.post('/students/', json={**STUDENT, field: value}, headers=login(client, 'sman1'),
+                    base_url='http://sman1.test')
+    assert r.status_code == 400
+    assert field in r.get_json()['messages']
+
+
+def test_import_rejects_non_string_with_400(client):
+    rows = [STUDENT, {**STUDENT, 'nis': '2023000098', 'name': 12345}]
+    r = client.post('/students/import', json={'rows': rows}, headers=login(client, 'sman1'),
+                    base_url='http://sman1.test')
+    assert r.status_code == 400
+    assert r.get_json()['errors'] == [{'row': 1, 'field': 'name', 'error': 'Nilai harus berupa teks'}]
+
+
+@pytest.mark.parametrize('score', ['NaN', 'Infinity', '-inf'])
+def test_grade_rejects_non_finite_score_with_400(client, score):
+    headers = login(client, 'sman1')
+    subject = client.post('/subjects/', json={'code': 'MAT101', 'name': 'Matematika', 'sks': 2}, headers=headers,
+                          base_url='http://sman1.test').get_json()
+    r = client.post('/grades/', json={'student_id': 1, 'subject_id': subject['id'], 'tugas': score, 'uts': 80,
+                                      'uas': 80}, headers=headers, base_url='http://sman1.test')
+    assert r.status_code == 400
+    assert 'tugas' in r.get_json()['messages']
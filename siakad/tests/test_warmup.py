@@ -0,0 +1,50 @@
+import gc
+
+import pytest
+
+from conftest import add_subject
+from siakad_app.extensions import db
+from siakad_app.utils import warmup
+from siakad_app.utils.refdata import reference_data
+from siakad_app.utils.scoring import _cache as scoring_cache
+from siakad_app.utils.tenancy import current_tenant
+
+
+@pytest.fixture
+def disposals(app, monkeypatch):
+    # The in-memory test database lives on its single connection: record disposals instead
+    calls = []
+    with app.app_context():
+        monkeypatch.setattr(db.engine, 'dispose', lambda close=True: calls.append(close))
+    yield calls
+    gc.unfreeze()
+    for entries in (reference_data._entries, scoring_cache._entries):
+        entries.clear()
+
+
+def test_prefork_warms_every_tenant_and_freezes(app, admin, disposals):
+    add_subject(admin)
+    reference_data._entries.clear()
+    scoring_cache._entries.clear()
+    stats = warmup.prefork(app)
+    assert stats['tenants'] == ['default (0 subjects)', 'sman1 (1 subjects)', 'smpn2 (0 subjects)']
+    assert set(reference_data._entries) == set(scoring_cache._entries) == {'default', 'sman1', 'smpn2'}
+    assert stats['frozen_objects'] > 0 and gc.get_freeze_count() == stats['frozen_objects']
+    assert disposals == [True]
+    assert {name for _, name in app.jinja_env.cache.keys()} >= set(warmup.TEMPLATES)
+
+
+def test_a_failing_tenant_does_not_stop_the_others(app, disposals, monkeypatch):
+    real = warmup.refdata
+
+    def refdata():
+        if current_tenant() == 'smpn2':
+            raise RuntimeError('database down')
+        return real()
+    monkeypatch.setattr(warmup, 'refdata', refdata)
+    assert [t.split()[0] for t in warmup.prefork(app)['tenants']] == ['default', 'sman1']
+
+
+def test_postfork_forgets_the_masters_connections(app, disposals):
+    warmup.postfork(app)
+    assert disposals == [False]
@@ -0,0 +1,65 @@
+from conftest import add_subject, add_teacher, put_grade, seed_students
+from siakad_app.utils.refdata import reference_data
+from siakad_app.utils.workload import workload_cache
+
+
+def test_workload_counts_and_averages(app, admin):
+    teacher_id, teacher = add_teacher(admin, username='guru1')
+    mat = add_subject(admin, 'MAT101', teacher_id)
+    bio = add_subject(admin, 'BIO101', teacher_id)
+    add_subject(admin, 'FIS101')
+    ids = seed_students(app, 3)
+    put_grade(admin, ids[0], mat, 80)
+    put_grade(admin, ids[1], mat, 60)
+    put_grade(admin, 1, mat, 90)  # class 7A, one student
+
+    body = teacher.get('/teachers/me/workload').get_json()
+    assert body['teacher']['id'] == teacher_id and body['term'] == '2024/2025-1'
+    by_code = {s['code']: s for s in body['subjects']}
+    assert set(by_code) == {'MAT101', 'BIO101'}
+    assert by_code['MAT101']['classes'] == [{'class_name': '7A', 'enrolled': 1, 'graded': 1},
+                                            {'class_name': '8A', 'enrolled': 3, 'graded': 2}]
+    assert by_code['MAT101']['completeness'] == 0.75
+    assert by_code['MAT101']['averages'] == {'tugas': 76.67, 'uts': 76.67, 'uas': 76.67, 'final': 76.67}
+    assert by_code['BIO101']['enrolled'] == 0 and by_code['BIO101']['completeness'] is None
+    assert body['totals'] == {'subjects': 2, 'enrolled': 4, 'graded': 3, 'completeness': 0.75}
+    assert teacher.get('/teachers/me/workload?term=2023/2024-2').get_json()['totals']['graded'] == 0
+    assert admin.get('/teachers/me/workload').status_code == 403
+
+
+def test_grade_writes_and_policy_changes_refresh_the_cache(app, admin):
+    teacher_id, teacher = add_teacher(admin, username='guru1')
+    mat = add_subject(admin, 'MAT101', teacher_id)
+    put_grade(admin, 1, mat, 80)
+    assert teacher.get('/teachers/me/workload').get_json()['totals']['graded'] == 1
+    assert len(workload_cache._entries) == 1
+
+    grade = put_grade(admin, 1, mat, 40)
+    assert not workload_cache._entries
+    assert teacher.get('/teachers/me/workload').get_json()['subjects'][0]['averages']['final'] == 40.0
+    admin.patch(f'/grades/{grade["id"]}', json={'uas': 100})
+    assert teacher.get('/teachers/me/workload').get_json()['subjects'][0]['averages']['final'] == 60.0
+    admin.put('/scoring/policies', json={'subject_id': mat, 'tugas': 0, 'uts': 0, 'uas': 1})
+    assert teacher.get('/teachers/me/workload').get_json()['subjects'][0]['averages']['final'] == 100.0
+
+    # New students change the class sizes
+    seed_students(app, 1, class_name='7A')
+    assert teacher.get('/teachers/me/workload').get_json()['totals']['enrolled'] == 2
+
+
+def test_ownership_is_read_live(admin, monkeypatch):
+    teacher_id, teacher = add_teacher(admin, username='guru1')
+    mat = add_subject(admin, 'MAT101', teacher_id)
+    put_grade(teacher, 1, mat, 80)
+    assert [s['id'] for s in teacher.get('/teachers/me').get_json()['subjects']] == [mat]
+    teacher.get('/teachers/me/workload')
+
+    # Reassigned on another worker: this worker's snapshot is not dropped
+    monkeypatch.setattr(reference_data, 'invalidate', lambda: None)
+    monkeypatch.setattr(reference_data, 'ttl', 3600)
+    assert admin.patch(f'/subjects/{mat}', json={'teacher_id': None}).status_code == 200
+    assert teacher.get('/teachers/me').get_json()['subjects'] == []
+    assert teacher.get('/teachers/me/workload').get_json()['subjects'] == []
+    assert teacher.post('/grades/', json={'student_id': 1, 'subject_id': mat, 'tugas': 1, 'uts': 1,
+                                          'uas': 1}).status_code == 403
+    assert teacher.get(f'/events/stream?subject_id={mat}').status_code == 403